@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+一時ファイル + rename によるアトミックなファイル書き込み
+
+書き込み途中でクラッシュしても、読み手は常に旧版か新版のどちらかを見る。
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+
+def write_bytes_atomic(path: Path, data: bytes):
+    """同じディレクトリの一時ファイルに書いてから置き換える"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def write_text_atomic(path: Path, text: str):
+    write_bytes_atomic(path, text.encode("utf-8"))
+
+
+def write_json_atomic(path: Path, data, indent: int | None = 2):
+    write_text_atomic(path, json.dumps(data, ensure_ascii=False, indent=indent))
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+スライド処理のマイクロベンチマーク
+
+合成デッキ（synthetic.py）をスライド数を変えて作り、ステージごとに処理速度と
+ピークメモリを計測する。結果は JSON に書き出し、ベースラインと比べて遅くなった
+（またはメモリが増えた）ステージを報告する。
+
+ステージ:
+  parse       slide_parser.parse_markdown_slides()（ファイルから全スライドを抽出）
+  notes       notes_renderer.render_notes()（全スライドのスピーカーノート）
+  fix-one     fix-slides.py の apply_font_class_to_slide()（1枚にクラスを付けて書き戻す）
+  fix-batch   fix-slides.py の set_font_classes()（5枚に1枚のクラスをまとめて付ける）
+
+時間は timeit と同じく GC を止めて、1回の計測が MIN_SAMPLE 秒以上になるよう回数を調整し、
+繰り返しの最小値を使う。ピークメモリは tracemalloc を有効にした別の1回で測る。
+
+使い方（プロジェクトルートで実行）:
+  python benchmarks/bench.py                          # 10〜10000枚で全ステージを計測
+  python benchmarks/bench.py --sizes 100 1000 --stages parse notes
+  python benchmarks/bench.py --save-baseline          # 今回の結果をベースラインにする
+  python benchmarks/bench.py --baseline old.json      # 指定したベースラインと比べる
+
+ベースラインより遅くなったステージがあれば終了コード 1 を返す。
+"""
+
+import argparse
+import gc
+import importlib.util
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from atomic_io import write_json_atomic  # noqa: E402
+from notes_renderer import render_notes  # noqa: E402
+from slide_parser import parse_markdown_slides  # noqa: E402
+from synthetic import make_deck  # noqa: E402
+
+RESULTS_DIR = Path(".cache/benchmarks")
+BASELINE_PATH = RESULTS_DIR / "baseline.json"
+RESULTS_VERSION = 1
+
+SIZES = [10, 100, 1000, 10000]
+REPEAT = 5
+MIN_SAMPLE = 0.05  # 1回の計測の最短時間（秒）
+
+# これを超えて悪くなったら劣化とみなす（割合）
+TIME_THRESHOLD = 0.15
+MEMORY_THRESHOLD = 0.20
+
+FONT_CLASSES = ["font-small", "font-xsmall"]
+
+
+def load_fix_slides():
+    """scripts/fix-slides.py をモジュールとして読み込む（ファイル名にハイフンがあるため）"""
+    spec = importlib.util.spec_from_file_location("fix_slides", ROOT / "scripts" / "fix-slides.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def prepare_parse(deck: Path, slides: int):
+    return lambda: parse_markdown_slides(deck)
+
+
+def prepare_notes(deck: Path, slides: int):
+    parsed = parse_markdown_slides(deck)
+    return lambda: [render_notes(slide) for slide in parsed]
+
+
+def prepare_fix_one(deck: Path, slides: int):
+    fix_slides = load_fix_slides()
+    target = slides // 2 + 1
+    calls = 0
+
+    def run():
+        # 毎回クラスを入れ替えて、必ず書き戻しが起きるようにする
+        nonlocal calls
+        calls += 1
+        return fix_slides.apply_font_class_to_slide(deck, target, FONT_CLASSES[calls % 2])
+    return run
+
+
+def prepare_fix_batch(deck: Path, slides: int):
+    fix_slides = load_fix_slides()
+    content = deck.read_text(encoding="utf-8")
+    classes = {number: "font-small" for number in range(2, slides + 1, 5)}
+    return lambda: fix_slides.set_font_classes(content, classes)
+
+
+STAGES = {
+    "parse": prepare_parse,
+    "notes": prepare_notes,
+    "fix-one": prepare_fix_one,
+    "fix-batch": prepare_fix_batch,
+}
+
+
+def measure(run, repeat: int) -> list[float]:
+    """1回あたりの秒数を repeat 個返す"""
+    number = 1
+    while True:
+        elapsed = timed(run, number)
+        if elapsed >= MIN_SAMPLE or number >= 1 << 16:
+            break
+        number *= 2
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        samples.append(timed(run, number) / number)
+    return samples
+
+
+def timed(run, number: int) -> float:
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(number):
+            run()
+        return time.perf_counter() - started
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def peak_memory(run) -> int:
+    """1回の実行で確保したメモリのピーク（バイト）"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(sizes: list[int], stages: list[str], repeat: int, quiet: bool = False) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="slides-bench-") as tmp:
+        for slides in sizes:
+            text = make_deck(slides)
+            size = len(text.encode("utf-8"))
+            for stage in stages:
+                # fix-one はファイルを書き換えるので、ステージごとに作り直す
+                deck = Path(tmp) / f"deck-{slides}.md"
+                deck.write_text(text, encoding="utf-8")
+                run = STAGES[stage](deck, slides)
+                samples = measure(run, repeat)
+                best = min(samples)
+                results[f"{stage}/{slides}"] = {
+                    "stage": stage,
+                    "slides": slides,
+                    "bytes": size,
+                    "seconds": best,
+                    "median": statistics.median(samples),
+                    "slides_per_second": slides / best,
+                    "mb_per_second": size / best / 1024 / 1024,
+                    "peak_bytes": peak_memory(run),
+                }
+                if not quiet:
+                    print_result(results[f"{stage}/{slides}"])
+    return results
+
+
+def print_result(result: dict):
+    print(f"  {result['stage']:<10} {result['slides']:>6}枚 "
+          f"{result['seconds'] * 1000:10.3f}ms "
+          f"{result['slides_per_second']:12,.0f}枚/秒 "
+          f"{result['mb_per_second']:8.1f}MB/秒 "
+          f"ピーク {result['peak_bytes'] / 1024:10,.0f}KB")
+
+
+def compare(current: dict, baseline: dict, time_threshold: float, memory_threshold: float) -> list[str]:
+    """ベースラインとの差を表示し、劣化したキーの一覧を返す"""
+    regressions = []
+    print(f"\nベースラインとの比較（劣化の閾値: 時間 +{time_threshold:.0%}, メモリ +{memory_threshold:.0%}）")
+    for key, result in current.items():
+        before = baseline.get(key)
+        if before is None:
+            print(f"    {key:<16} （ベースラインなし）")
+            continue
+        time_delta = result["seconds"] / before["seconds"] - 1
+        memory_delta = result["peak_bytes"] / before["peak_bytes"] - 1 if before["peak_bytes"] else 0
+        regressed = time_delta > time_threshold or memory_delta > memory_threshold
+        if regressed:
+            regressions.append(key)
+        mark = "✗" if regressed else "✓"
+        print(f"  {mark} {key:<16} 時間 {time_delta:+7.1%}  メモリ {memory_delta:+7.1%}")
+    return regressions
+
+
+def load_results(path: Path) -> dict:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if data.get("version") != RESULTS_VERSION:
+        raise ValueError(f"結果の形式が違います: {path}")
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スライド処理のベンチマークを実行する")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help=f"デッキのスライド数（デフォルト: {' '.join(map(str, SIZES))}）")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES),
+                        help="計測するステージ（デフォルト: すべて）")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help=f"繰り返し回数（デフォルト: {REPEAT}）")
+    parser.add_argument("--output", type=Path,
+                        help=f"結果の JSON（デフォルト: {RESULTS_DIR}/<日時>.json）")
+    parser.add_argument("--baseline", type=Path,
+                        help=f"比較するベースライン（デフォルト: {BASELINE_PATH} があれば使う）")
+    parser.add_argument("--save-baseline", action="store_true", help="今回の結果をベースラインとして保存する")
+    parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD,
+                        help=f"時間の劣化とみなす増加率（デフォルト: {TIME_THRESHOLD}）")
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD,
+                        help=f"メモリの劣化とみなす増加率（デフォルト: {MEMORY_THRESHOLD}）")
+    parser.add_argument("-q", "--quiet", action="store_true", help="ステージごとの結果を表示しない")
+    args = parser.parse_args()
+
+    print(f"ベンチマーク: {', '.join(args.stages)} × {', '.join(map(str, args.sizes))}枚（繰り返し {args.repeat} 回）")
+    results = run_benchmarks(args.sizes, args.stages, max(1, args.repeat), args.quiet)
+
+    data = {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    write_json_atomic(output, data)
+    print(f"✓ 結果: {output}")
+    if args.save_baseline:
+        write_json_atomic(BASELINE_PATH, data)
+        print(f"✓ ベースラインを保存しました: {BASELINE_PATH}")
+        return
+
+    baseline_path = args.baseline or (BASELINE_PATH if BASELINE_PATH.exists() else None)
+    if baseline_path is None:
+        print("ベースラインがないので比較しません（--save-baseline で保存できます）")
+        return
+    baseline = load_results(baseline_path)
+    if baseline["python"] != data["python"]:
+        print(f"  ⚠️ ベースラインの Python は {baseline['python']} です（今回は {data['python']}）")
+    regressions = compare(results, baseline["results"], args.time_threshold, args.memory_threshold)
+    if regressions:
+        print(f"\n✗ {len(regressions)} 件のステージが劣化しました: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n✓ 劣化はありません")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク用の合成 Marp デッキ
+
+実際のデッキ（src/*.md）と同じ構成要素を、スライド数を指定して決まった内容で作る。
+- フロントマター（marp / theme / paginate）と <style> ブロック
+- セクション区切りのスライド（# 見出しだけ）
+- ディレクティブコメント（_class / _paginate）と複数行のノートコメント
+- 入れ子の箇条書き・番号付きリスト、太字だけの行、表、コードブロック
+
+同じ (スライド数, シード) からは常に同じテキストができるので、実行どうしを比較できる。
+
+使い方:
+  python benchmarks/synthetic.py 1000 > /tmp/deck.md
+"""
+
+import argparse
+import random
+
+FRONT_MATTER = """---
+marp: true
+theme: default
+paginate: true
+---
+
+<style>
+  section[data-class~="font-small"] {
+    font-size: 20px !important;
+    line-height: 1.35 !important;
+  }
+  section[data-class~="font-small"] h2 {
+    font-size: 32px !important;
+  }
+</style>
+
+"""
+
+WORDS = [
+    "要件定義", "受入基準", "ユーザーストーリー", "バックログ", "スプリント", "レトロスペクティブ",
+    "テスト自動化", "継続的インテグレーション", "デプロイ", "可観測性", "障害対応", "設計レビュー",
+    "API", "SLO", "latency", "throughput", "cache", "pipeline", "refactoring", "on-call",
+]
+
+SECTION_EVERY = 20  # このスライド数ごとにセクション区切りを入れる
+
+
+def sentence(rng: random.Random, words: int = 6) -> str:
+    return "の".join(rng.choice(WORDS) for _ in range(words // 2)) + " と " + " ".join(
+        rng.choice(WORDS) for _ in range(words - words // 2)
+    )
+
+
+def nested_list(rng: random.Random) -> list[str]:
+    lines = []
+    for _ in range(rng.randint(2, 4)):
+        lines.append(f"- **{rng.choice(WORDS)}**: {sentence(rng)}")
+        for j in range(rng.randint(0, 3)):
+            lines.append(f"  - {sentence(rng, 4)}")
+            if rng.random() < 0.3:
+                lines.append(f"    {j + 1}. `{rng.choice(WORDS)}` を確認する")
+    return lines
+
+
+def table(rng: random.Random) -> list[str]:
+    columns = rng.randint(2, 4)
+    lines = [
+        "| " + " | ".join(rng.choice(WORDS) for _ in range(columns)) + " |",
+        "|" + "|".join([":---"] + ["---"] * (columns - 1)) + "|",
+    ]
+    for _ in range(rng.randint(2, 5)):
+        lines.append("| " + " | ".join(sentence(rng, 2) for _ in range(columns)) + " |")
+    return lines
+
+
+def code_block(rng: random.Random) -> list[str]:
+    return [
+        "```python",
+        f"def {rng.choice(['fetch', 'retry', 'render'])}(items):",
+        "    # --- はコードブロック内なので区切りではない",
+        "    ---",
+        "    return [item for item in items if item]",
+        "```",
+    ]
+
+
+def slide(rng: random.Random, number: int) -> list[str]:
+    """1枚分の行（区切りの --- は含まない）"""
+    if number % SECTION_EVERY == 1:
+        return ["<!-- _class: lead -->", "<!-- _paginate: false -->", "",
+                f"# 第{number // SECTION_EVERY + 1}部 {rng.choice(WORDS)}"]
+
+    lines = []
+    if rng.random() < 0.2:
+        lines += [f"<!-- _class: {rng.choice(['font-medium', 'font-small'])} -->", ""]
+    lines += [f"## {number}. {sentence(rng, 3)}", ""]
+    kind = rng.random()
+    if kind < 0.5:
+        lines += nested_list(rng)
+    elif kind < 0.75:
+        lines += table(rng)
+    else:
+        lines += [f"**{rng.choice(WORDS)}**", "", sentence(rng, 8), ""] + code_block(rng)
+    if rng.random() < 0.4:
+        lines += ["", "<!--", f"ノート: {sentence(rng)}", sentence(rng, 4), "-->"]
+    return lines
+
+
+def make_deck(slides: int, seed: int = 0) -> str:
+    """スライド数 slides の Marp デッキのテキスト"""
+    rng = random.Random(seed)
+    parts = [FRONT_MATTER]
+    for number in range(1, slides + 1):
+        if number > 1:
+            parts.append("---\n")
+        parts.append("\n".join(slide(rng, number)) + "\n\n")
+    return "".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ベンチマーク用の合成デッキを標準出力に書き出す")
+    parser.add_argument("slides", type=int, help="スライド数")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード（デフォルト: 0）")
+    args = parser.parse_args()
+    print(make_deck(args.slides, args.seed), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+スライドのビルドパイプラインを依存グラフとして実行するツール
+
+  parse → css（共有テーマの適用）→ fix（オーバーフロー修正）→ html（Marp HTML + 共有 CSS）
+        → notes（スピーカーノート）→ images（画像生成）→ variants（WebP / AVIF）→ manifest
+        → publish（.gz / .br の事前圧縮）
+
+テーマの適用・HTML 変換はデッキごとのノードに分かれており、
+依存関係のないノードはワーカープールで並列に実行する。
+オーバーフロー修正は全デッキで1つのノードにして、計測用のブラウザを1つだけ起動する。
+各ノードは入力ファイルの内容と上流ノードのフィンガープリントから
+自分のフィンガープリントを計算し、前回成功時から変わったノードだけを再実行する。
+
+使い方:
+  python build.py                    # 古くなったノードだけ実行
+  python build.py html               # html ノード（と上流）だけ実行
+  python build.py -j 8 --force       # 全ノードを8並列で実行し直す
+  python build.py --skip fix images  # 種類を指定して除外
+  python build.py --dry-run          # 実行されるノードを表示するだけ
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable
+
+import build_html
+from atomic_io import write_json_atomic
+from decks import FILES
+from image_variants import IMAGES_DIR
+
+STATE_PATH = Path(".cache/build/state.json")
+SCRIPTS_DIR = Path("scripts")
+THEME_PATH = build_html.THEME_DIR / "slides.css"  # fix-slides.py theme が書き出す共有テーマ
+
+# 解析キャッシュを触るノード（parse / notes / manifest）は同じプロセス内で直列に実行する
+_cache_lock = threading.Lock()
+
+
+class Node:
+    """ビルドグラフの1ノード"""
+
+    def __init__(self, name: str, kind: str, action: Callable[[], None],
+                 deps: list[str] = (), inputs: list[Path] = (), outputs: list[Path] = (),
+                 config: str = "", input_globs: list[str] = ()):
+        self.name = name
+        self.kind = kind          # css / fix / html など（--skip の単位）
+        self.action = action
+        self.deps = list(deps)
+        self.inputs = [Path(p) for p in inputs]
+        self.input_globs = list(input_globs)  # 実行時に展開する入力（上流が作るファイルなど）
+        self.outputs = [Path(p) for p in outputs]
+        self.config = config      # フィンガープリントに含める設定値
+
+    def __repr__(self) -> str:
+        return f"Node({self.name})"
+
+
+# ========================================
+# アクション
+# ========================================
+
+def run_command(args: list[str]):
+    """外部コマンドを実行し、失敗したら出力を添えて例外にする"""
+    result = subprocess.run(args, capture_output=True, text=True)
+    if result.returncode != 0:
+        output = (result.stdout + result.stderr).strip()
+        raise RuntimeError(f"{' '.join(args)} が失敗しました (exit {result.returncode})\n{output[-2000:]}")
+
+
+def fix_slides(command: str, *srcs: str) -> Callable[[], None]:
+    return lambda: run_command([sys.executable, str(SCRIPTS_DIR / "fix-slides.py"), command, *srcs])
+
+
+def marp_html(src: str, output: Path) -> Callable[[], None]:
+    return lambda: build_html.render_deck(Path(src), output)
+
+
+def warm_parse_cache(src: str) -> Callable[[], None]:
+    def action():
+        from parse_cache import ParseCache
+        with _cache_lock:
+            cache = ParseCache()
+            cache.slides(src)
+            cache.save()
+    return action
+
+
+def update_notes():
+    from parse_cache import ParseCache
+    from slide_manifest import update_notes as update_deck_notes
+    with _cache_lock:
+        cache = ParseCache()
+        for file_info in FILES:
+            update_deck_notes(cache, file_info["src"])
+        cache.save()
+
+
+def generate_images():
+    run_command([sys.executable, "generate_all_slides.py"])
+
+
+def build_variants():
+    from image_variants import build_variants as build
+    build(os.cpu_count() or 4)
+
+
+def precompress_docs():
+    from precompress import ROOT, precompress
+    # html ノードがすべて終わってから、どのデッキも参照しなくなった CSS を消す
+    build_html.prune_styles()
+    precompress(ROOT, os.cpu_count() or 4)
+
+
+def write_manifest():
+    from parse_cache import ParseCache
+    from slide_manifest import build_manifest, write_manifest as write
+    with _cache_lock:
+        cache = ParseCache()
+        write(build_manifest(cache, verbose=False))
+        cache.save()
+
+
+# ========================================
+# グラフ定義
+# ========================================
+
+def build_graph() -> dict[str, Node]:
+    """パイプライン全体のノードを作る"""
+    fix_script = SCRIPTS_DIR / "fix-slides.py"
+    check_script = SCRIPTS_DIR / "check-slides.js"
+    sources = [Path(f["src"]) for f in FILES]
+    nodes = []
+
+    for file_info in FILES:
+        src = file_info["src"]
+        name = file_info["name"]
+        html = build_html.output_path(Path(src))
+        nodes += [
+            Node(f"parse:{name}", "parse", warm_parse_cache(src),
+                 inputs=[src, Path("slide_parser.py")]),
+            Node(f"css:{name}", "css", fix_slides("theme", src),
+                 deps=[f"parse:{name}"], inputs=[src, fix_script], outputs=[THEME_PATH]),
+            Node(f"html:{name}", "html", marp_html(src, html),
+                 deps=["fix"], inputs=[src, *build_html.css_inputs(Path(src)), Path("package-lock.json")],
+                 outputs=[html], config=" ".join(build_html.MARP_OPTIONS)),
+        ]
+
+    nodes += [
+        # ブラウザを1つだけ起動して全デッキをまとめて計測する（デッキごとに分けると並列に起動してしまう）
+        Node("fix", "fix", fix_slides("auto-font", *(f["src"] for f in FILES)),
+             deps=[f"css:{f['name']}" for f in FILES], inputs=sources + [fix_script, check_script]),
+        Node("notes", "notes", update_notes,
+             deps=["fix"], inputs=sources + [Path("notes_renderer.py"), Path("slide_parser.py"), Path("parse_cache.py")]),
+        Node("images", "images", generate_images,
+             deps=["notes"], inputs=sources + [Path("generate_all_slides.py")]),
+        # images をスキップしたときなど、グラフの外で作り直された PNG でも作り直す
+        Node("variants", "variants", build_variants,
+             deps=["images"], inputs=[Path("image_variants.py")],
+             input_globs=[f"{IMAGES_DIR}/*/slide_*.png"]),
+        Node("manifest", "manifest", write_manifest,
+             deps=["notes", "variants"], inputs=sources + [Path("slide_manifest.py"), Path("image_variants.py")],
+             outputs=[Path("docs/slide-viewer/manifest.json"), Path("docs/slide-viewer/manifest/index.json")]),
+        Node("publish", "publish", precompress_docs,
+             deps=[f"html:{f['name']}" for f in FILES] + ["manifest"],
+             inputs=[Path("precompress.py"), Path("docs/index.html"), Path("docs/slide-viewer/index.html")]),
+    ]
+    return {node.name: node for node in nodes}
+
+
+def select(graph: dict[str, Node], targets: list[str], skip: set[str]) -> dict[str, Node]:
+    """ターゲット（ノード名または種類）とその上流だけを残し、skip の種類を外す"""
+    if targets:
+        wanted = [n for n in graph.values() if n.name in targets or n.kind in targets]
+        unknown = set(targets) - {n.name for n in wanted} - {n.kind for n in wanted}
+        if unknown:
+            raise SystemExit(f"❌ 不明なターゲット: {', '.join(sorted(unknown))}")
+        keep: set[str] = set()
+        stack = [n.name for n in wanted]
+        while stack:
+            name = stack.pop()
+            if name not in keep:
+                keep.add(name)
+                stack.extend(graph[name].deps)
+    else:
+        keep = set(graph)
+
+    def resolve(deps: list[str]) -> list[str]:
+        # 除外したノードはその上流に付け替えて、実行順序を保つ
+        result = []
+        for dep in deps:
+            if graph[dep].kind in skip:
+                result.extend(d for d in resolve(graph[dep].deps) if d not in result)
+            elif dep not in result:
+                result.append(dep)
+        return result
+
+    selected = {}
+    for name in graph:
+        if name in keep and graph[name].kind not in skip:
+            node = graph[name]
+            node.deps = resolve(node.deps)
+            selected[name] = node
+    return selected
+
+
+# ========================================
+# 実行
+# ========================================
+
+def file_digest(path: Path) -> str:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return "missing"
+
+
+def fingerprint(node: Node, upstream: dict[str, str]) -> str:
+    """入力ファイルの内容・設定・上流ノードのフィンガープリントから計算する"""
+    digest = hashlib.sha256()
+    digest.update(node.config.encode("utf-8"))
+    globbed = [Path(path) for pattern in node.input_globs for path in glob.glob(pattern)]
+    for path in sorted(set(node.inputs + globbed)):
+        digest.update(f"{path}:{file_digest(path)}\n".encode("utf-8"))
+    for dep in sorted(node.deps):
+        digest.update(f"{dep}:{upstream.get(dep, '')}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def topological_order(graph: dict[str, Node]) -> list[str]:
+    order: list[str] = []
+    visited: set[str] = set()
+
+    def visit(name: str):
+        if name not in visited:
+            visited.add(name)
+            for dep in graph[name].deps:
+                visit(dep)
+            order.append(name)
+
+    for name in graph:
+        visit(name)
+    return order
+
+
+def load_state() -> dict[str, str]:
+    try:
+        return json.loads(STATE_PATH.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def run_graph(graph: dict[str, Node], jobs: int, force: bool = False, dry_run: bool = False) -> bool:
+    """依存順にノードを実行する（成功したら True）"""
+    state = load_state()
+    fingerprints: dict[str, str] = {}
+    waiting = {name: set(node.deps) for name, node in graph.items()}
+    failed: set[str] = set()
+    running: dict[Future, tuple[Node, float]] = {}
+    counts = {"run": 0, "skip": 0, "fail": 0}
+
+    def finish(name: str):
+        for other, deps in waiting.items():
+            deps.discard(name)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while waiting or running:
+            # 依存が揃ったノードを投入（最新ならスキップ）
+            for name in [n for n, deps in waiting.items() if not deps]:
+                node = graph[name]
+                del waiting[name]
+                if any(dep in failed for dep in node.deps):
+                    # 下流にも失敗として伝える（finish しないと下流が待ち続ける）
+                    failed.add(name)
+                    counts["fail"] += 1
+                    print(f"  - {name}: 上流が失敗したためスキップ")
+                    finish(name)
+                    continue
+                fp = fingerprint(node, fingerprints)
+                up_to_date = state.get(name) == fp and all(p.exists() for p in node.outputs)
+                if up_to_date and not force:
+                    fingerprints[name] = fp
+                    counts["skip"] += 1
+                    finish(name)
+                    continue
+                if dry_run:
+                    print(f"  ▶ {name}")
+                    fingerprints[name] = fp
+                    counts["run"] += 1
+                    finish(name)
+                    continue
+                print(f"  ▶ {name}")
+                running[pool.submit(node.action)] = (node, time.perf_counter())
+
+            if not running:
+                if waiting and all(waiting.values()):
+                    raise RuntimeError(f"依存関係が循環しています: {sorted(waiting)}")
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node, started = running.pop(future)
+                elapsed = time.perf_counter() - started
+                error = future.exception()
+                if error is None:
+                    # アクションが入力を書き換えることがあるので、実行後の内容で記録する
+                    fp = fingerprint(node, fingerprints)
+                    fingerprints[node.name] = state[node.name] = fp
+                    counts["run"] += 1
+                    print(f"  ✓ {node.name} ({elapsed:.1f}s)")
+                    write_json_atomic(STATE_PATH, state)
+                else:
+                    failed.add(node.name)
+                    state.pop(node.name, None)
+                    counts["fail"] += 1
+                    print(f"  ✗ {node.name} ({elapsed:.1f}s): {error}")
+                finish(node.name)
+
+    # 後段のノード（CSS 追加・フォント修正）は上流の入力であるソースを書き換えるので、
+    # 最終的なファイル内容で全ノードのフィンガープリントを計算し直して記録する
+    if not dry_run:
+        settled: dict[str, str] = {}
+        for name in topological_order(graph):
+            settled[name] = fingerprint(graph[name], settled)
+            if name not in failed and not any(dep in failed for dep in graph[name].deps):
+                state[name] = settled[name]
+        write_json_atomic(STATE_PATH, state)
+
+    print(f"\n実行 {counts['run']} / 最新のためスキップ {counts['skip']} / 失敗 {counts['fail']}")
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スライドのビルドパイプラインを実行する")
+    parser.add_argument("targets", nargs="*", help="実行するノード名または種類（省略時は全体）")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 4,
+                        help="並列に実行するノード数")
+    parser.add_argument("--force", action="store_true", help="最新のノードも実行し直す")
+    parser.add_argument("--skip", nargs="+", default=[], metavar="KIND",
+                        help="除外するノードの種類（css / fix / html / notes / images / variants / manifest / publish）")
+    parser.add_argument("--dry-run", action="store_true", help="実行されるノードを表示するだけ")
+    args = parser.parse_args()
+
+    skip = set(args.skip)
+    if "images" not in skip and not (os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")):
+        print("GOOGLE_API_KEY / GEMINI_API_KEY が未設定のため images をスキップします")
+        skip.add("images")
+
+    graph = select(build_graph(), args.targets, skip)
+    print(f"ノード数: {len(graph)}（並列数: {args.jobs}）\n")
+    if not run_graph(graph, args.jobs, args.force, args.dry_run):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
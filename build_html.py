@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Marp スライドを GitHub Pages 用の HTML に変換するスクリプト
+
+src/ のデッキを自動で見つけ、package-lock.json で固定したローカルの
+Marp CLI（node_modules/.bin/marp）で並列に変換する。
+ソースと CSS のフィンガープリントが前回と同じデッキは変換しない。
+
+Marp は CSS を HTML の <head> にインライン化するので、変換後にその <style> を
+内容ハッシュ付きの docs/themes/<名前>.<ハッシュ>.css に書き出して <link> で参照する。
+同じテーマのデッキは同じ CSS ファイルを共有し、ブラウザのキャッシュも効く。
+
+使い方:
+  python build_html.py                  # 変更のあったデッキだけ変換
+  python build_html.py src/01-intro.md  # 指定したデッキだけ
+  python build_html.py --force -j 8     # 全デッキを8並列で変換し直す
+
+事前に npm ci で Marp CLI をインストールしておくこと。
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from atomic_io import write_json_atomic, write_text_atomic
+
+SRC_DIR = Path("src")
+OUTPUT_DIR = Path("docs")
+STATE_PATH = Path(".cache/html/state.json")
+MARP_BIN = Path("node_modules/.bin/marp")
+MARP_PACKAGE = Path("node_modules/@marp-team/marp-cli/package.json")
+THEME_DIR = Path("themes")
+MARP_OPTIONS = ["--html", "--allow-local-files"]
+STYLE_DIR = OUTPUT_DIR / "themes"
+
+HEAD_STYLE = re.compile(r"<style>(.*?)</style>", re.DOTALL)
+# 相対パスの url() は CSS の置き場所が変わると指す先も変わるので、そのブロックはインラインのまま残す
+RELATIVE_URL = re.compile(r"url\(\s*(?!['\"]?(?:[a-z][a-z0-9+.-]*:|/|#))", re.IGNORECASE)
+STYLE_LINK = re.compile(r'<link rel="stylesheet" href="([^"]+)">')
+DATA_THEME = re.compile(r'data-theme="([\w-]+)"')
+
+# デッキとして扱わない Markdown
+EXCLUDED_PREFIXES = ("README", "CLAUDE")
+
+
+def discover_decks(src_dir: Path = SRC_DIR) -> list[Path]:
+    """src/ 直下のスライド Markdown"""
+    return sorted(
+        path for path in src_dir.glob("*.md")
+        if not path.name.startswith(EXCLUDED_PREFIXES)
+    )
+
+
+def output_path(src: Path) -> Path:
+    return OUTPUT_DIR / f"{src.stem}.html"
+
+
+def marp_version() -> str:
+    """インストール済みの Marp CLI のバージョン"""
+    if not MARP_BIN.exists() or not MARP_PACKAGE.exists():
+        raise FileNotFoundError(f"{MARP_BIN} が見つかりません（npm ci を実行してください）")
+    return json.loads(MARP_PACKAGE.read_text(encoding="utf-8"))["version"]
+
+
+def css_inputs(src: Path) -> list[Path]:
+    """デッキの見た目に影響する外部 CSS（ソース内の <style> はソースのハッシュに含まれる）
+
+    共有テーマ（themes/*.css）はすべてのデッキに登録するので、どれかが変われば全デッキを変換し直す。
+    """
+    return sorted(THEME_DIR.glob("*.css"))
+
+
+def marp_options() -> list[str]:
+    options = list(MARP_OPTIONS)
+    if THEME_DIR.is_dir():
+        options += ["--theme-set", str(THEME_DIR)]
+    return options
+
+
+def deck_fingerprint(src: Path, version: str) -> str:
+    """ソース・テーマの CSS・Marp のバージョンと実際に渡すオプションから計算する"""
+    digest = hashlib.sha256()
+    digest.update(f"marp-cli {version} {' '.join(marp_options())}\n".encode("utf-8"))
+    for path in [src, *css_inputs(src)]:
+        digest.update(f"{path}\n".encode("utf-8"))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def render_deck(src: Path, output: Path):
+    """1デッキを HTML に変換する（失敗したら RuntimeError）"""
+    output.parent.mkdir(parents=True, exist_ok=True)
+    result = subprocess.run(
+        [str(MARP_BIN), "--no-stdin", *marp_options(), str(src), "-o", str(output)],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0 or not output.exists():
+        message = (result.stderr or result.stdout).strip()
+        raise RuntimeError(f"{src} の変換に失敗しました (exit {result.returncode})\n{message[-2000:]}")
+    externalize_styles(output)
+
+
+def style_name(css: str, html: str) -> str:
+    """CSS ファイルの名前（スライドのテーマの CSS ならテーマ名、それ以外は Marp のテンプレート）"""
+    if "foreignObject>section" in css:
+        match = DATA_THEME.search(html)
+        return match.group(1) if match else "theme"
+    return "marp"
+
+
+def externalize_styles(output: Path) -> list[Path]:
+    """<head> の <style> を内容ハッシュ付きの CSS に書き出し、<link> に置き換える
+
+    書き出した（または既にあった）CSS のパスを返す。<style> がなければ何もしない。
+    """
+    html = output.read_text(encoding="utf-8")
+    end = html.find("</head>")
+    if end < 0:
+        return []
+    written = []
+
+    def replace(match: re.Match) -> str:
+        css = match.group(1)
+        if RELATIVE_URL.search(css):
+            return match.group(0)
+        if not css.isascii():
+            # 外部 CSS の文字コードは HTML の <meta charset> を引き継がないことがある
+            css = '@charset "UTF-8";\n' + css
+        digest = hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+        path = STYLE_DIR / f"{style_name(css, html)}.{digest}.css"
+        if not path.exists():
+            write_text_atomic(path, css)
+        written.append(path)
+        href = Path(os.path.relpath(path, output.parent)).as_posix()
+        return f'<link rel="stylesheet" href="{href}">'
+
+    head = HEAD_STYLE.sub(replace, html[:end])
+    if written:
+        write_text_atomic(output, head + html[end:])
+    return written
+
+
+def referenced_styles(html_dir: Path) -> set[Path]:
+    """HTML から <link> で参照されている docs/themes/ の CSS"""
+    styles = set()
+    for page in html_dir.glob("*.html"):
+        text = page.read_text(encoding="utf-8", errors="replace")
+        for href in STYLE_LINK.findall(text[:text.find("</head>")]):
+            styles.add(Path(os.path.normpath(page.parent / href)))
+    return styles
+
+
+def prune_styles() -> int:
+    """どの HTML からも参照されなくなった CSS を消す（消した数を返す）
+
+    変換と並行して呼ぶと、書き出したばかりの CSS を消しかねないので、変換がすべて終わってから呼ぶ。
+    """
+    if not STYLE_DIR.is_dir():
+        return 0
+    referenced = referenced_styles(OUTPUT_DIR)
+    removed = 0
+    for path in STYLE_DIR.glob("*.css"):
+        if Path(os.path.normpath(path)) not in referenced:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def styles_present(output: Path) -> bool:
+    """HTML が参照する CSS がすべてあるか（消されていたら変換し直す）"""
+    text = output.read_text(encoding="utf-8", errors="replace")
+    return all((output.parent / href).exists() for href in STYLE_LINK.findall(text[:text.find("</head>")]))
+
+
+def load_state() -> dict:
+    try:
+        return json.loads(STATE_PATH.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def build(decks: list[Path], jobs: int, force: bool = False) -> bool:
+    """変更のあったデッキを並列に変換する（すべて成功したら True）"""
+    version = marp_version()
+    state = load_state()
+    print(f"Marp CLI {version}（並列数: {jobs}）\n")
+
+    stale = []
+    for src in decks:
+        fingerprint = deck_fingerprint(src, version)
+        output = output_path(src)
+        if not force and state.get(str(src)) == fingerprint and output.exists() and styles_present(output):
+            print(f"  - {src.name}: 変更なし")
+            continue
+        stale.append((src, output, fingerprint))
+
+    def convert(job):
+        src, output, fingerprint = job
+        started = time.perf_counter()
+        try:
+            render_deck(src, output)
+            return job, time.perf_counter() - started, None
+        except (OSError, RuntimeError) as e:
+            return job, time.perf_counter() - started, e
+
+    started = time.perf_counter()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for (src, output, fingerprint), elapsed, error in pool.map(convert, stale):
+            if error is None:
+                state[str(src)] = fingerprint
+                size = output.stat().st_size / 1024
+                print(f"  ✓ {src.name} → {output}（{elapsed:.2f}秒, {size:.0f}KB）")
+            else:
+                failed += 1
+                state.pop(str(src), None)
+                print(f"  ✗ {src.name}（{elapsed:.2f}秒）: {error}")
+
+    write_json_atomic(STATE_PATH, state)
+    removed = prune_styles()
+    if removed:
+        print(f"  - 使われなくなった CSS を {removed} 件削除しました")
+    print(f"\n=== HTML変換完了: 成功 {len(stale) - failed} / 失敗 {failed} / "
+          f"スキップ {len(decks) - len(stale)}（{time.perf_counter() - started:.2f}秒） ===")
+    return failed == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Marp スライドを HTML に変換する")
+    parser.add_argument("decks", nargs="*", type=Path, help="変換するデッキ（省略時は src/*.md）")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 4,
+                        help="並列に変換するデッキ数")
+    parser.add_argument("--force", action="store_true", help="変更がなくても変換し直す")
+    args = parser.parse_args()
+
+    decks = args.decks or discover_decks()
+    if not decks:
+        print("対象のデッキがありません")
+        return
+
+    try:
+        ok = build(decks, max(1, args.jobs), args.force)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
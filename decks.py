@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+"""
+処理対象のスライドデッキ一覧（全スクリプト共通）
+"""
+
+# src: Markdown ソース / name: 出力ディレクトリ名 / title: セクション名
+FILES = [
+    {"src": "src/01-intro.md", "name": "01-intro", "title": "入門編"},
+    {"src": "src/02-design.md", "name": "02-design", "title": "設計編"},
+    {"src": "src/03-implementation-refactoring.md", "name": "03-implementation", "title": "実装編"},
+]
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+負荷試験用のローカル Gemini 互換サーバー（asyncio）
+
+generateContent（POST /v1beta/models/<モデル>:generateContent）に、Gemini API と同じ形式の
+JSON で PNG を返す。google-genai のクライアントを http_options の base_url でここに向ければ、
+クォータを使わずに generate_all_slides.py の同時実行数・再試行の設定を試せる。
+
+- 応答の PNG の大きさ（--size）とファイルサイズ（--png-bytes、ancillary チャンクで水増し）
+- 応答までの待ち時間の分布（--latency: fixed / uniform / normal / lognormal / exp）
+- 一定割合の 500 / 503（--error-rate）
+- 429 RESOURCE_EXHAUSTED の集中（--burst-every 秒ごとに --burst-length 秒間すべて 429）
+  と、1分あたりの受付数の上限（--quota-rpm）。429 には RetryInfo の retryDelay を付ける
+- GET /stats で受け付けたリクエスト数を JSON で返す
+
+使い方:
+  python fake_gemini_server.py                                   # http://127.0.0.1:8090
+  python fake_gemini_server.py --latency lognormal:8,0.4 --error-rate 0.05
+  python fake_gemini_server.py --burst-every 60 --burst-length 10 --quota-rpm 30
+  python generate_all_slides.py --backend-url http://127.0.0.1:8090
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import random
+import re
+import struct
+import time
+import zlib
+from collections import deque
+from functools import lru_cache
+
+from preview_server import read_request
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8090
+DEFAULT_SIZE = "1376x768"  # Nano Banana Pro の 16:9（1K）
+DEFAULT_LATENCY = "lognormal:2,0.5"
+
+GENERATE_RE = re.compile(r"^/v1(?:beta|alpha)?/models/([^/:]+):generateContent$")
+
+STATUS_TEXT = {200: "OK", 404: "Not Found", 429: "Too Many Requests",
+               500: "Internal Server Error", 503: "Service Unavailable"}
+
+# 5xx のときに返すエラー（どれも rate_limiter で再試行される）
+SERVER_ERRORS = [
+    (500, "INTERNAL", "An internal error has occurred."),
+    (503, "UNAVAILABLE", "The model is overloaded. Please try again later."),
+]
+
+
+def png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+@lru_cache(maxsize=8)
+def make_png(width: int, height: int, size: int = 0) -> bytes:
+    """縦グラデーションの RGB PNG（size を指定すればそのバイト数まで水増しする）"""
+    rows = []
+    for y in range(height):
+        shade = 40 + y * 120 // max(1, height - 1)
+        rows.append(b"\x00" + bytes((shade // 3, shade // 2, shade)) * width)
+    header = png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+    body = png_chunk(b"IDAT", zlib.compress(b"".join(rows), 6))
+    end = png_chunk(b"IEND", b"")
+    png = b"\x89PNG\r\n\x1a\n" + header + body
+    # 12バイトはチャンクの長さ・種類・CRC
+    padding = size - len(png) - len(end) - 12
+    if padding > 0:
+        # 小文字始まりの独自チャンク（デコーダーは読み飛ばす）
+        png += png_chunk(b"fkPd", bytes(padding))
+    return png + end
+
+
+def parse_size(value: str) -> tuple[int, int]:
+    try:
+        width, height = (int(v) for v in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"WxH の形式で指定してください: {value}")
+    return width, height
+
+
+def latency_sampler(spec: str):
+    """待ち時間の分布の指定から、秒数を返す関数 sample(rng) を作る
+
+      fixed:S / uniform:MIN,MAX / normal:MEAN,SD / lognormal:MEDIAN,SIGMA / exp:MEAN
+    """
+    kind, _, params = spec.partition(":")
+    try:
+        values = [float(v) for v in params.split(",")] if params else []
+    except ValueError:
+        raise ValueError(f"待ち時間の指定が不正です: {spec}")
+    samplers = {
+        ("fixed", 1): lambda rng: values[0],
+        ("uniform", 2): lambda rng: rng.uniform(values[0], values[1]),
+        ("normal", 2): lambda rng: max(0.0, rng.gauss(values[0], values[1])),
+        ("lognormal", 2): lambda rng: rng.lognormvariate(math.log(values[0]), values[1]),
+        ("exp", 1): lambda rng: rng.expovariate(1 / values[0]),
+    }
+    sampler = samplers.get((kind, len(values)))
+    if sampler is None:
+        raise ValueError(f"待ち時間の指定が不正です: {spec}")
+    return sampler
+
+
+def latency_spec(value: str) -> str:
+    """argparse 用: 分布の指定を検証する"""
+    try:
+        latency_sampler(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def error_body(code: int, status: str, message: str, retry_delay: float = 0.0) -> dict:
+    error = {"code": code, "message": message, "status": status}
+    if retry_delay > 0:
+        error["details"] = [{
+            "@type": "type.googleapis.com/google.rpc.RetryInfo",
+            "retryDelay": f"{retry_delay:g}s",
+        }]
+    return {"error": error}
+
+
+class FakeGeminiServer:
+    """generateContent だけを持つ Gemini 互換サーバー"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.width, self.height = args.size
+        self.sample_latency = latency_sampler(args.latency)
+        self.rng = random.Random(args.seed)
+        self.started = time.monotonic()
+        self.accepted: deque[float] = deque()  # --quota-rpm 用（受け付けた時刻）
+        self.stats = {"requests": 0, "ok": 0, "throttled": 0, "errors": 0}
+        self.quiet = args.quiet
+
+    def png(self) -> bytes:
+        return make_png(self.width, self.height, self.args.png_bytes)
+
+    def in_burst(self, now: float) -> bool:
+        every = self.args.burst_every
+        return every > 0 and (now - self.started) % every < self.args.burst_length
+
+    def over_quota(self, now: float) -> bool:
+        if self.args.quota_rpm <= 0:
+            return False
+        while self.accepted and now - self.accepted[0] >= 60:
+            self.accepted.popleft()
+        if len(self.accepted) >= self.args.quota_rpm:
+            return True
+        self.accepted.append(now)
+        return False
+
+    # ---- 接続 ----
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except ValueError:
+                    break
+                if request is None:
+                    break
+                length = int(request.headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.respond(request.method, request.path, body)
+                data = json.dumps(payload).encode("utf-8")
+                head = [
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}",
+                    "Content-Type: application/json; charset=UTF-8",
+                    f"Content-Length: {len(data)}",
+                ]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, method: str, path: str, body: bytes) -> tuple[int, dict]:
+        if method == "GET" and path == "/stats":
+            return 200, {**self.stats, "uptime": time.monotonic() - self.started}
+        match = GENERATE_RE.match(path)
+        if method != "POST" or match is None:
+            return 404, error_body(404, "NOT_FOUND", f"{method} {path} is not found.")
+
+        self.stats["requests"] += 1
+        started = time.perf_counter()
+        now = time.monotonic()
+        if self.in_burst(now) or self.over_quota(now):
+            # クォータ超過はすぐに返る
+            self.stats["throttled"] += 1
+            self.log(429, match.group(1), started)
+            return 429, error_body(429, "RESOURCE_EXHAUSTED",
+                                   "Resource has been exhausted (e.g. check quota).", self.args.retry_delay)
+
+        await asyncio.sleep(self.sample_latency(self.rng))
+        if self.rng.random() < self.args.error_rate:
+            code, status, message = self.rng.choice(SERVER_ERRORS)
+            self.stats["errors"] += 1
+            self.log(code, match.group(1), started)
+            return code, error_body(code, status, message)
+
+        self.stats["ok"] += 1
+        self.log(200, match.group(1), started)
+        return 200, {
+            "candidates": [{
+                "content": {
+                    "role": "model",
+                    "parts": [{"inlineData": {
+                        "mimeType": "image/png",
+                        "data": base64.b64encode(self.png()).decode("ascii"),
+                    }}],
+                },
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "modelVersion": match.group(1),
+        }
+
+    def log(self, status: int, model: str, started: float):
+        if not self.quiet:
+            print(f"  {status} {model}（{time.perf_counter() - started:.2f}秒）")
+
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    """応答の振る舞いのオプション（load_test.py と共通）"""
+    parser.add_argument("--size", type=parse_size, default=parse_size(DEFAULT_SIZE),
+                        help=f"PNG の大きさ WxH（デフォルト: {DEFAULT_SIZE}）")
+    parser.add_argument("--png-bytes", type=int, default=0,
+                        help="PNG をこのバイト数まで水増しする（デフォルト: 水増ししない）")
+    parser.add_argument("--latency", type=latency_spec, default=DEFAULT_LATENCY,
+                        help="応答までの秒数の分布 fixed:S / uniform:MIN,MAX / normal:MEAN,SD / "
+                             f"lognormal:MEDIAN,SIGMA / exp:MEAN（デフォルト: {DEFAULT_LATENCY}）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 / 503 を返す割合（0〜1）")
+    parser.add_argument("--burst-every", type=float, default=0.0,
+                        help="この秒数ごとに 429 を集中させる（0 なら集中させない）")
+    parser.add_argument("--burst-length", type=float, default=5.0, help="429 を返し続ける秒数（デフォルト: 5）")
+    parser.add_argument("--quota-rpm", type=float, default=0.0,
+                        help="1分あたりに受け付けるリクエスト数（超えたら 429。0 なら無制限）")
+    parser.add_argument("--retry-delay", type=float, default=2.0,
+                        help="429 の RetryInfo に入れる秒数（0 なら付けない。デフォルト: 2）")
+    parser.add_argument("--seed", type=int, help="待ち時間とエラーの乱数のシード")
+
+
+async def start(args: argparse.Namespace) -> tuple[FakeGeminiServer, asyncio.Server]:
+    server = FakeGeminiServer(args)
+    tcp = await asyncio.start_server(server.handle, args.host, args.port)
+    return server, tcp
+
+
+async def serve(args: argparse.Namespace):
+    server, tcp = await start(args)
+    print(f"Gemini 互換サーバー: http://{args.host}:{args.port}"
+          f"（{server.width}x{server.height} PNG {len(server.png()) / 1024:.0f}KB, 待ち時間 {args.latency}）")
+    async with tcp:
+        await tcp.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="負荷試験用の Gemini 互換サーバー")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("-q", "--quiet", action="store_true", help="リクエストごとのログを出さない")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\nサーバーを終了しました")
+
+
+if __name__ == "__main__":
+    main()
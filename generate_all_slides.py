@@ -3,82 +3,43 @@
 01, 02, 03 の全スライドを Nano Banana Pro で生成するスクリプト
 """
 
-import os
-import io
-import re
-import json
-import time
+import sys
+import asyncio
+import argparse
 from pathlib import Path
-from google import genai
 from google.genai import types
-from PIL import Image
 
-# API キー
-API_KEY = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
-if not API_KEY:
-    raise ValueError("GOOGLE_API_KEY または GEMINI_API_KEY を設定してください")
+from decks import FILES
+from generation_engine import DEFAULT_CONCURRENCY, run_bounded
+from generation_journal import (
+    DONE, FAILED, IN_FLIGHT, PENDING, GenerationJournal, file_hash, latest_journal, replay,
+)
+from image_backend import ImageBackend, create_backend
+from image_cache import DEFAULT_MAX_AGE_DAYS, DEFAULT_MAX_BYTES, ImageCache, cache_key
+from image_writer import PngOptimizer, write_image
+from parse_cache import ParseCache
+from rate_limiter import DEFAULT_RPM, AdaptiveLimiter, call_with_retry
+from slide_manifest import MANIFEST_PATH, build_manifest, slide_id, write_manifest
+from slide_parser import Slide
 
-client = genai.Client(api_key=API_KEY)
 MODEL_NAME = "gemini-3-pro-image-preview"
 
-# 処理するファイル
-FILES = [
-    {"src": "src/01-intro.md", "name": "01-intro", "title": "入門編"},
-    {"src": "src/02-design.md", "name": "02-design", "title": "設計編"},
-    {"src": "src/03-implementation-refactoring.md", "name": "03-implementation", "title": "実装編"},
-]
+# 生成設定（キャッシュキーにも含まれる）
+GENERATE_CONFIG = types.GenerateContentConfig(
+    response_modalities=["IMAGE"],
+)
 
 OUTPUT_DIR = Path("docs/slide-viewer/images")
 
 
-def parse_markdown_slides(filepath: str) -> list[dict]:
-    """Markdownファイルからスライドを抽出する"""
-    with open(filepath, "r", encoding="utf-8") as f:
-        content = f.read()
+def build_prompt(slide: Slide, file_title: str) -> str:
+    """スライドの画像生成プロンプトを組み立てる"""
 
-    # フロントマターを除去
-    content = re.sub(r"^---\nmarp:.*?---\n", "", content, flags=re.DOTALL)
-
-    # スタイルブロックを除去
-    content = re.sub(r"<style>.*?</style>", "", content, flags=re.DOTALL)
-
-    # スライドを分割
-    slides = content.split("\n---\n")
-
-    parsed_slides = []
-    for i, slide in enumerate(slides):
-        # コメントを除去
-        slide_clean = re.sub(r"<!--.*?-->", "", slide, flags=re.DOTALL)
-        slide_clean = slide_clean.strip()
-
-        if not slide_clean:
-            continue
-
-        # タイトルを抽出
-        title_match = re.search(r"^#{1,3}\s+(.+)$", slide_clean, re.MULTILINE)
-        title = title_match.group(1) if title_match else f"スライド {len(parsed_slides)+1}"
-
-        # セクションタイトル判定（# または ## で始まる短いスライド）
-        is_section = bool(re.match(r"^#{1,2}\s+", slide_clean)) and len(slide_clean.split("\n")) < 5
-
-        parsed_slides.append({
-            "index": len(parsed_slides) + 1,
-            "title": title,
-            "content": slide_clean,
-            "is_section": is_section
-        })
-
-    return parsed_slides
-
-
-def generate_slide_image(slide: dict, output_path: Path, file_title: str) -> bool:
-    """スライドの画像を生成"""
-
-    if slide["is_section"]:
+    if slide.is_section:
         # セクションタイトル用のプロンプト
         prompt = f"""プロフェッショナルなセクションタイトルスライドを生成してください。
 
-タイトル: {slide['title']}
+タイトル: {slide.title}
 
 デザイン要件:
 - 16:9のアスペクト比
@@ -93,10 +54,10 @@ def generate_slide_image(slide: dict, output_path: Path, file_title: str) -> boo
         prompt = f"""プロフェッショナルなプレゼンテーションスライドを生成してください。
 
 セクション: {file_title}
-タイトル: {slide['title']}
+タイトル: {slide.title}
 
 内容:
-{slide['content'][:1500]}
+{slide.body[:1500]}
 
 デザイン要件:
 - 16:9のアスペクト比
@@ -107,97 +68,284 @@ def generate_slide_image(slide: dict, output_path: Path, file_title: str) -> boo
 - シンプルで洗練されたビジネススライド
 - 表がある場合は見やすく整理
 """
+    return prompt
+
 
+async def generate_slide_image(prompt: str, output_path: Path, limiter: AdaptiveLimiter,
+                               backend: ImageBackend) -> bool:
+    """スライドの画像を生成"""
     try:
-        response = client.models.generate_content(
-            model=MODEL_NAME,
-            contents=[prompt],
-            config=types.GenerateContentConfig(
-                response_modalities=["IMAGE"],
-            )
+        image = await call_with_retry(
+            limiter,
+            backend.generate,
+            prompt,
+            MODEL_NAME,
+            GENERATE_CONFIG,
+            label=str(output_path),
         )
+        if image is None:
+            return False
 
-        for part in response.candidates[0].content.parts:
-            if part.inline_data is not None:
-                pil_image = Image.open(io.BytesIO(part.inline_data.data))
-                pil_image.save(output_path)
-                return True
-
-        return False
+        # PNG ならデコードせずに書き込む（書き込みはイベントループを止めないようスレッドで行う）
+        await asyncio.to_thread(write_image, image.data, output_path, image.mime_type)
+        return True
 
     except Exception as e:
-        print(f"    エラー: {e}")
+        print(f"    エラー: {output_path}: {e}")
         return False
 
 
-def main():
-    all_slides_data = []
-
-    for file_info in FILES:
+def job_output_path(job: dict) -> Path:
+    return OUTPUT_DIR / job["name"] / f"slide_{job['slide'].index:03d}.png"
+
+
+def job_id(job: dict) -> str:
+    """ジャーナル上のスライドID（例: 01-intro/003）"""
+    return slide_id(job["name"], job["slide"].index)
+
+
+async def generate_slide_job(job: dict, cache: ImageCache, key_locks: dict,
+                             limiter: AdaptiveLimiter, journal: GenerationJournal, backend: ImageBackend,
+                             optimizer: PngOptimizer | None = None, quiet: bool = False):
+    """1スライド分の生成ジョブを実行し、job["status"] を更新する"""
+    slide = job["slide"]
+    key = job["key"]
+    label = f"{job['name']} [{slide.index:3d}/{job['total']}]"
+    output_path = job_output_path(job)
+
+    async def finish(message: str):
+        digest = await asyncio.to_thread(file_hash, output_path)
+        journal.record(job_id(job), DONE, key=key, hash=digest)
+        await journal.sync()
+        job["status"] = DONE
+        print(f"  {label} {message}")
+
+    # 同じプロンプトのスライドは1回だけ生成する
+    async with key_locks.setdefault(key, asyncio.Lock()):
+        # 出力済みの画像が同じキーで生成されたものならスキップ
+        if cache.is_current(output_path, key):
+            job["status"] = DONE
+            if not quiet:
+                print(f"  {label} スキップ（変更なし）: {slide.title[:30]}")
+            return
+
+        # キャッシュにあればコピーするだけ
+        if await asyncio.to_thread(cache.materialize, key, output_path):
+            await finish(f"キャッシュから復元: {slide.title[:30]}")
+            return
+
+        print(f"  {label} 生成中: {slide.title[:30]}...")
+        journal.record(job_id(job), IN_FLIGHT, key=key)
+        await journal.sync()
+
+        ok = await generate_slide_image(job["prompt"], output_path, limiter, backend)
+
+        if ok and optimizer is not None:
+            # キャッシュ・ジャーナルには最適化後の内容を記録する
+            try:
+                await optimizer.optimize(output_path)
+            except Exception as e:
+                print(f"  {label} ⚠️ PNG 最適化に失敗しました（未最適化のまま保存）: {e}")
+
+        if ok:
+            await asyncio.to_thread(cache.put, key, output_path)
+            cache.record_output(output_path, key)
+            await finish("✓ 完了")
+            return
+        journal.record(job_id(job), FAILED, key=key)
+        await journal.sync()
+        job["status"] = FAILED
+        print(f"  {label} ✗ 失敗")
+
+
+def adopt_existing_images(jobs: list[dict], cache: ImageCache) -> int:
+    """キャッシュ導入前に生成済みの画像を、現在のプロンプトの結果として登録する"""
+    adopted = 0
+    for job in jobs:
+        output_path = job_output_path(job)
+        if output_path.exists() and str(output_path) not in cache.outputs:
+            if cache.get(job["key"]) is None:
+                cache.put(job["key"], output_path)
+            cache.record_output(output_path, job["key"])
+            adopted += 1
+    return adopted
+
+
+def resume_from_journal(journal_path: Path, jobs: list[dict], cache: ImageCache) -> int:
+    """中断した実行のジャーナルを再生し、完了済みで内容が一致する画像を登録する"""
+    states = replay(journal_path)
+    resumed = 0
+    for job in jobs:
+        event = states.get(job_id(job))
+        if not event or event["state"] != DONE or event.get("key") != job["key"]:
+            continue
+        output_path = job_output_path(job)
+        if output_path.exists() and file_hash(output_path) == event.get("hash"):
+            if cache.get(job["key"]) is None:
+                cache.put(job["key"], output_path)
+            cache.record_output(output_path, job["key"])
+            resumed += 1
+    return resumed
+
+
+def build_jobs(parse_cache: ParseCache, files: list[dict] = FILES,
+               verbose: bool = True) -> list[dict]:
+    """デッキのスライドを1つのジョブ列にまとめる（ファイルをまたいで並列実行するため）"""
+    jobs = []
+    for file_info in files:
         src_path = file_info["src"]
         name = file_info["name"]
-        title = file_info["title"]
 
-        print(f"\n{'='*60}")
-        print(f"処理中: {src_path} ({title})")
-        print(f"{'='*60}")
+        if verbose:
+            print(f"\n{'='*60}")
+            print(f"解析中: {src_path} ({file_info['title']})")
+            print(f"{'='*60}")
 
         # 出力ディレクトリ
-        output_dir = OUTPUT_DIR / name
-        output_dir.mkdir(parents=True, exist_ok=True)
+        (OUTPUT_DIR / name).mkdir(parents=True, exist_ok=True)
 
         # スライドを解析
-        slides = parse_markdown_slides(src_path)
-        print(f"スライド数: {len(slides)}")
-
-        file_slides = []
+        slides = parse_cache.slides(src_path)
+        if verbose:
+            print(f"スライド数: {len(slides)}")
 
         for slide in slides:
-            output_path = output_dir / f"slide_{slide['index']:03d}.png"
-
-            # 既存ファイルがあればスキップ
-            if output_path.exists():
-                print(f"  [{slide['index']:3d}/{len(slides)}] スキップ（既存）: {slide['title'][:30]}")
-                file_slides.append({
-                    "index": slide["index"],
-                    "title": slide["title"],
-                    "image": f"images/{name}/slide_{slide['index']:03d}.png",
-                    "is_section": slide["is_section"]
-                })
-                continue
-
-            print(f"  [{slide['index']:3d}/{len(slides)}] 生成中: {slide['title'][:30]}...")
-
-            if generate_slide_image(slide, output_path, title):
-                print(f"    ✓ 完了")
-                file_slides.append({
-                    "index": slide["index"],
-                    "title": slide["title"],
-                    "image": f"images/{name}/slide_{slide['index']:03d}.png",
-                    "is_section": slide["is_section"]
-                })
-            else:
-                print(f"    ✗ 失敗")
-
-            # レート制限対策
-            time.sleep(1)
-
-        all_slides_data.append({
-            "name": name,
-            "title": title,
-            "slides": file_slides
-        })
-
-    # マニフェストJSONを生成
-    manifest_path = Path("docs/slide-viewer/manifest.json")
-    with open(manifest_path, "w", encoding="utf-8") as f:
-        json.dump(all_slides_data, f, ensure_ascii=False, indent=2)
-
-    print(f"\n✓ マニフェスト生成: {manifest_path}")
+            prompt = build_prompt(slide, file_info["title"])
+            jobs.append({
+                "name": name,
+                "slide": slide,
+                "total": len(slides),
+                "prompt": prompt,
+                "key": cache_key(prompt, MODEL_NAME, GENERATE_CONFIG),
+            })
+    return jobs
+
+
+async def generate_images(jobs: list[dict], args: argparse.Namespace, cache: ImageCache,
+                          journal_path: Path | None = None, quiet: bool = False,
+                          backend: ImageBackend | None = None) -> AdaptiveLimiter:
+    """ジョブを並列に実行し、各ジョブの status を更新する
+
+    backend を省略すると args.backend_url（なければ Gemini API）のバックエンドを使う。
+    再試行の回数を参照できるよう、使ったリミッターを返す。
+    """
+    owned = backend is None
+    if owned:
+        backend = create_backend(args.backend_url)
+    journal = GenerationJournal(journal_path)
+    for job in jobs:
+        if not cache.is_current(job_output_path(job), job["key"]):
+            journal.record(job_id(job), PENDING, key=job["key"])
+    await journal.sync()
+
+    if not quiet:
+        print(f"\n生成開始: {len(jobs)} スライド（同時実行数: {args.concurrency}）")
+        print(f"ジャーナル: {journal.path}")
+
+    key_locks: dict[str, asyncio.Lock] = {}
+    limiter = AdaptiveLimiter(args.rpm, max_concurrency=args.concurrency)
+    optimizer = PngOptimizer() if args.optimize_png else None
+    try:
+        await run_bounded(
+            jobs,
+            lambda job: generate_slide_job(job, cache, key_locks, limiter, journal, backend, optimizer, quiet),
+            args.concurrency,
+        )
+    finally:
+        journal.close()
+        if owned:
+            await backend.close()
+        if optimizer is not None:
+            optimizer.close()
+            if optimizer.before:
+                print(f"\n{optimizer.summary()}")
+        evicted = cache.evict(args.cache_max_age_days, args.cache_max_mb * 1024 * 1024)
+        if evicted:
+            print(f"\nキャッシュから {evicted} 件を削除")
+        cache.save()
+        if limiter.retries:
+            print(f"\n再試行: {limiter.retries} 回（うちクォータ超過 {limiter.throttled} 回）")
+    return limiter
+
+
+async def run(args: argparse.Namespace):
+    # API キーがなければ何も書き換えずに終了する
+    backend = create_backend(args.backend_url)
+    parse_cache = ParseCache()
+    jobs = build_jobs(parse_cache)
+
+    cache = ImageCache()
+    if args.adopt_existing:
+        print(f"\n既存画像を登録: {adopt_existing_images(jobs, cache)} 件")
+
+    journal_path = None
+    if args.resume:
+        journal_path = latest_journal() if args.resume == "latest" else Path(args.resume)
+        if journal_path is None or not journal_path.exists():
+            print("\n⚠️ 再開するジャーナルがありません。最初から実行します")
+            journal_path = None
+        else:
+            resumed = resume_from_journal(journal_path, jobs, cache)
+            print(f"\n再開: {journal_path}（完了済み {resumed} 件）")
+
+    try:
+        await generate_images(jobs, args, cache, journal_path, backend=backend)
+    finally:
+        # 中断・クラッシュ時もここまでの結果でマニフェストを書き出す（失敗・未処理のスライドも含める）
+        statuses = {job_id(job): job.get("status", PENDING) for job in jobs}
+        write_manifest(build_manifest(parse_cache, statuses, verbose=False))
+        parse_cache.save()
+        await backend.close()
+        print(f"\n✓ マニフェスト生成: {MANIFEST_PATH}")
 
     # 統計
-    total_slides = sum(len(f["slides"]) for f in all_slides_data)
-    print(f"\n合計スライド数: {total_slides}")
+    counts = [job.get("status", PENDING) for job in jobs]
+    print(f"\n合計スライド数: {len(counts)}（完了 {counts.count(DONE)} / 失敗 {counts.count(FAILED)}）")
+    if counts.count(FAILED):
+        print("失敗したスライドは --resume で再実行できます")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全スライドの画像を生成する")
+    parser.add_argument(
+        "-j", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+        help=f"同時に実行する生成リクエスト数の上限（デフォルト: {DEFAULT_CONCURRENCY}）"
+    )
+    parser.add_argument(
+        "--rpm", type=float, default=DEFAULT_RPM,
+        help=f"1分あたりの最大リクエスト数（デフォルト: {DEFAULT_RPM}）"
+    )
+    parser.add_argument(
+        "--resume", nargs="?", const="latest", metavar="JOURNAL",
+        help="中断した実行を再開する（省略時は最新のジャーナル）"
+    )
+    parser.add_argument(
+        "--adopt-existing", action="store_true",
+        help="キャッシュ未登録の既存画像を、現在の内容で生成済みとして登録する"
+    )
+    parser.add_argument(
+        "--optimize-png", action="store_true",
+        help="生成した PNG を可逆に再圧縮する（別プロセスで並列に実行）"
+    )
+    parser.add_argument(
+        "--backend-url", metavar="URL",
+        help="Gemini API の代わりに使う互換サーバー（例: fake_gemini_server.py の http://127.0.0.1:8090）"
+    )
+    parser.add_argument(
+        "--cache-max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS,
+        help=f"この日数使われなかったキャッシュを削除（デフォルト: {DEFAULT_MAX_AGE_DAYS}）"
+    )
+    parser.add_argument(
+        "--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="キャッシュの最大サイズ（MB）"
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("\n中断しました。--resume で続きから再開できます")
+        sys.exit(130)
 
 
 if __name__ == "__main__":
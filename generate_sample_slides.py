@@ -4,11 +4,12 @@
 """
 
 import os
-import io
 from pathlib import Path
 from google import genai
 from google.genai import types
-from PIL import Image
+
+from image_writer import write_image
+from rate_limiter import AdaptiveLimiter, call_with_retry_sync
 
 # API キー
 API_KEY = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
@@ -18,6 +19,9 @@ if not API_KEY:
 client = genai.Client(api_key=API_KEY)
 MODEL_NAME = "gemini-3-pro-image-preview"
 
+# レート制限（逐次実行なので同時実行数は1）
+limiter = AdaptiveLimiter(max_concurrency=1)
+
 # 生成するスライド
 SLIDES = [
     {
@@ -139,7 +143,10 @@ SLIDES = [
 def generate_image(prompt: str, output_path: Path) -> bool:
     """画像を生成して保存（Gemini 3 Pro Image / Nano Banana Pro）"""
     try:
-        response = client.models.generate_content(
+        response = call_with_retry_sync(
+            limiter,
+            client.models.generate_content,
+            label=str(output_path),
             model=MODEL_NAME,
             contents=[prompt],
             config=types.GenerateContentConfig(
@@ -149,8 +156,7 @@ def generate_image(prompt: str, output_path: Path) -> bool:
 
         for part in response.candidates[0].content.parts:
             if part.inline_data is not None:
-                pil_image = Image.open(io.BytesIO(part.inline_data.data))
-                pil_image.save(output_path)
+                write_image(part.inline_data.data, output_path, part.inline_data.mime_type)
                 print(f"✓ 生成完了: {output_path}")
                 return True
 
@@ -11,12 +11,13 @@ Nano Banana Pro (Gemini 3 Pro Image) を使ってスライド画像を生成す
 """
 
 import os
-import re
 from pathlib import Path
 from google import genai
 from google.genai import types
-from PIL import Image
-import io
+
+from image_writer import write_image
+from rate_limiter import AdaptiveLimiter, call_with_retry_sync
+from slide_parser import Slide, parse_markdown_slides
 
 # API キーの設定
 API_KEY = os.environ.get("GOOGLE_API_KEY", "YOUR_API_KEY_HERE")
@@ -26,53 +27,20 @@ client = genai.Client(api_key=API_KEY)
 # Nano Banana Pro (Gemini 3 Pro Image) モデル
 MODEL_NAME = "gemini-3-pro-image-preview"
 
-
-def parse_markdown_slides(filepath: str) -> list[dict]:
-    """Markdownファイルからスライドを抽出する"""
-    with open(filepath, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    # フロントマターを除去
-    content = re.sub(r"^---\nmarp:.*?---\n", "", content, flags=re.DOTALL)
-
-    # スタイルブロックを除去
-    content = re.sub(r"<style>.*?</style>", "", content, flags=re.DOTALL)
-
-    # スライドを分割
-    slides = content.split("\n---\n")
-
-    parsed_slides = []
-    for i, slide in enumerate(slides):
-        # コメントを除去
-        slide = re.sub(r"<!--.*?-->", "", slide, flags=re.DOTALL)
-        slide = slide.strip()
-
-        if not slide:
-            continue
-
-        # タイトルを抽出
-        title_match = re.search(r"^#{1,3}\s+(.+)$", slide, re.MULTILINE)
-        title = title_match.group(1) if title_match else f"スライド {i+1}"
-
-        parsed_slides.append({
-            "index": len(parsed_slides) + 1,
-            "title": title,
-            "content": slide
-        })
-
-    return parsed_slides
+# レート制限（逐次実行なので同時実行数は1）
+limiter = AdaptiveLimiter(max_concurrency=1)
 
 
-def generate_slide_image(slide: dict, output_dir: Path) -> str:
+def generate_slide_image(slide: Slide, output_dir: Path) -> str:
     """スライドの内容を元に画像を生成する"""
 
     prompt = f"""あなたはプレゼンテーションスライドのデザイナーです。
 以下の内容を元に、プロフェッショナルなスライド画像を生成してください。
 
-タイトル: {slide['title']}
+タイトル: {slide.title}
 
 内容:
-{slide['content']}
+{slide.body}
 
 要件:
 - 16:9のアスペクト比
@@ -84,7 +52,10 @@ def generate_slide_image(slide: dict, output_dir: Path) -> str:
 """
 
     try:
-        response = client.models.generate_content(
+        response = call_with_retry_sync(
+            limiter,
+            client.models.generate_content,
+            label=slide.title,
             model=MODEL_NAME,
             contents=[prompt],
             config=types.GenerateContentConfig(
@@ -99,17 +70,16 @@ def generate_slide_image(slide: dict, output_dir: Path) -> str:
         # 画像を保存
         for part in response.parts:
             if part.inline_data is not None:
-                image = Image.open(io.BytesIO(part.inline_data.data))
-                output_path = output_dir / f"slide_{slide['index']:03d}.png"
-                image.save(output_path)
+                output_path = output_dir / f"slide_{slide.index:03d}.png"
+                write_image(part.inline_data.data, output_path, part.inline_data.mime_type)
                 print(f"✓ 生成完了: {output_path}")
                 return str(output_path)
 
-        print(f"✗ 画像なし: {slide['title']}")
+        print(f"✗ 画像なし: {slide.title}")
         return ""
 
     except Exception as e:
-        print(f"✗ エラー: {slide['title']} - {e}")
+        print(f"✗ エラー: {slide.title} - {e}")
         return ""
 
 
@@ -142,12 +112,12 @@ def main():
         file_output_dir.mkdir(exist_ok=True)
 
         # スライドを解析
-        slides = parse_markdown_slides(str(filepath))
+        slides = parse_markdown_slides(filepath)
         print(f"スライド数: {len(slides)}")
 
         # 各スライドの画像を生成
         for slide in slides:
-            print(f"\n[{slide['index']}/{len(slides)}] {slide['title']}")
+            print(f"\n[{slide.index}/{len(slides)}] {slide.title}")
             generate_slide_image(slide, file_output_dir)
 
 
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+スライド画像生成の並列実行エンジン
+
+N 個のワーカーがキューからジョブを取り出し、常に最大 N 件の
+generate_content 呼び出しが実行中になるようにする。結果は入力順で返す。
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# 同時実行数のデフォルト
+DEFAULT_CONCURRENCY = 4
+
+
+async def run_bounded(
+    items: Iterable[T],
+    worker: Callable[[T], Awaitable[R]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> list[R]:
+    """同時実行数を制限して worker を実行し、入力順の結果リストを返す"""
+    jobs = list(items)
+    results: list = [None] * len(jobs)
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for i, item in enumerate(jobs):
+        queue.put_nowait((i, item))
+
+    async def consume():
+        while True:
+            try:
+                i, item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            results[i] = await worker(item)
+
+    workers = max(1, min(concurrency, len(jobs)))
+    await asyncio.gather(*(consume() for _ in range(workers)))
+    return results
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+画像生成の実行ジャーナル（JSONL）
+
+1行1イベントで各スライドの状態（pending / in-flight / done / failed）を追記する。
+中断後は --resume で最後の状態を再生し、完了済みのスライドを再生成しない。
+fsync はイベントループの外で、その時点までに追記した行をまとめて1回だけ行う。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+JOURNAL_DIR = Path(".cache/journal")
+
+# スライドの状態
+PENDING = "pending"
+IN_FLIGHT = "in-flight"
+DONE = "done"
+FAILED = "failed"
+
+
+def file_hash(path: Path) -> str:
+    """ファイル内容の SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def latest_journal(journal_dir: Path = JOURNAL_DIR) -> Path | None:
+    """最新の実行ジャーナルを返す"""
+    journals = sorted(journal_dir.glob("run-*.jsonl"))
+    return journals[-1] if journals else None
+
+
+def replay(path: Path) -> dict[str, dict]:
+    """ジャーナルを先頭から再生し、スライドごとの最後の状態を返す"""
+    states: dict[str, dict] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                # クラッシュで途中までしか書かれなかった行は無視
+                continue
+            states[event["slide"]] = event
+    return states
+
+
+class GenerationJournal:
+    """追記専用の実行ジャーナル"""
+
+    def __init__(self, path: Path | None = None, journal_dir: Path = JOURNAL_DIR):
+        if path is None:
+            journal_dir.mkdir(parents=True, exist_ok=True)
+            path = journal_dir / f"run-{time.strftime('%Y%m%d-%H%M%S')}.jsonl"
+        self.path = Path(path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._unsynced = False
+        self._sync_lock = asyncio.Lock()
+
+    def record(self, slide_id: str, state: str, **fields):
+        """状態遷移を1行追記する（ディスクまでの書き出しは sync() でまとめて行う）"""
+        event = {"ts": time.time(), "slide": slide_id, "state": state, **fields}
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        # プロセスが落ちても残るよう OS には渡しておく
+        self._file.flush()
+        self._unsynced = True
+
+    async def sync(self):
+        """ここまでに追記した行をディスクまで書き出す
+
+        fsync 中に追記された行は、待っている次の sync() がまとめて書き出す。
+        """
+        async with self._sync_lock:
+            if not self._unsynced:
+                return
+            self._unsynced = False
+            await asyncio.to_thread(os.fsync, self._file.fileno())
+
+    def close(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+        self._file.close()
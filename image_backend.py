@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+画像生成のバックエンド
+
+generate_all_slides.py はこのインターフェースを通して画像を生成する。
+バックエンドは generate() で (プロンプト, モデル, 設定) から画像を1枚返す。
+
+- GeminiBackend: google-genai の client.aio.models.generate_content
+  base_url を指定すると、同じ API を話す別のサーバー（fake_gemini_server.py など）に向けられる
+- 他の画像生成サービスを使うときは ImageBackend を継承して generate() を実装する
+
+エラーは各バックエンドの例外をそのまま送出する。例外に code / status 属性があれば、
+rate_limiter.call_with_retry が再試行やクォータ超過の判断に使う。
+"""
+
+import os
+from abc import ABC, abstractmethod
+
+# base_url を指定したときに API キーがなければ使うダミーのキー
+LOCAL_API_KEY = "local"
+
+
+class GeneratedImage:
+    """生成された画像のバイト列と、API が申告した MIME タイプ"""
+
+    __slots__ = ("data", "mime_type")
+
+    def __init__(self, data: bytes, mime_type: str | None = None):
+        self.data = data
+        self.mime_type = mime_type
+
+
+class ImageBackend(ABC):
+    """画像生成バックエンドのインターフェース"""
+
+    name = "base"
+
+    @abstractmethod
+    async def generate(self, prompt: str, model: str, config) -> GeneratedImage | None:
+        """画像を1枚生成する（応答に画像が含まれなければ None）"""
+
+    async def close(self):
+        """接続などを閉じる"""
+
+
+class GeminiBackend(ImageBackend):
+    """google-genai の非同期クライアントで生成する"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, base_url: str | None = None):
+        from google import genai
+        from google.genai import types
+
+        http_options = types.HttpOptions(base_url=base_url) if base_url else None
+        self.client = genai.Client(api_key=api_key, http_options=http_options)
+        self.base_url = base_url
+
+    async def generate(self, prompt: str, model: str, config) -> GeneratedImage | None:
+        response = await self.client.aio.models.generate_content(
+            model=model,
+            contents=[prompt],
+            config=config,
+        )
+        for part in response.candidates[0].content.parts:
+            if part.inline_data is not None:
+                return GeneratedImage(part.inline_data.data, part.inline_data.mime_type)
+        return None
+
+    async def close(self):
+        await self.client.aio.aclose()
+
+
+def create_backend(base_url: str | None = None) -> ImageBackend:
+    """環境変数の API キーでバックエンドを作る（base_url ならローカルのサーバーに向ける）"""
+    api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        if not base_url:
+            raise ValueError("GOOGLE_API_KEY または GEMINI_API_KEY を設定してください")
+        api_key = LOCAL_API_KEY
+    return GeminiBackend(api_key, base_url)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+スライド画像のコンテンツアドレス型キャッシュ
+
+最終プロンプト・モデル名・GenerateContentConfig のハッシュをキーに、
+生成済み画像を .cache/slide-images/objects/ に保存する。
+index.json がハッシュ→画像ファイルの対応と、出力先→ハッシュの対応を持つ。
+"""
+
+import hashlib
+import json
+import shutil
+import time
+from pathlib import Path
+
+from atomic_io import write_json_atomic
+
+CACHE_DIR = Path(".cache/slide-images")
+
+# 退避（eviction）のデフォルト
+DEFAULT_MAX_AGE_DAYS = 90
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1GB
+
+
+def cache_key(prompt: str, model: str, config) -> str:
+    """プロンプト・モデル・生成設定からキャッシュキーを計算"""
+    if hasattr(config, "model_dump"):
+        config = config.model_dump(mode="json", exclude_none=True)
+    payload = json.dumps(
+        {"prompt": prompt, "model": model, "config": config},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ImageCache:
+    """ハッシュ→画像ファイルのキャッシュ"""
+
+    def __init__(self, root: Path = CACHE_DIR):
+        self.root = Path(root)
+        self.index_path = self.root / "index.json"
+        self.entries: dict[str, dict] = {}
+        self.outputs: dict[str, str] = {}
+        self._load()
+
+    def _load(self):
+        if not self.index_path.exists():
+            return
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"  ⚠️ キャッシュインデックスを読み込めません（作り直します）: {e}")
+            return
+        self.entries = data.get("entries", {})
+        self.outputs = data.get("outputs", {})
+
+    def save(self):
+        """インデックスを書き出す"""
+        write_json_atomic(
+            self.index_path,
+            {"version": 1, "entries": self.entries, "outputs": self.outputs},
+        )
+
+    def object_path(self, key: str) -> Path:
+        return self.root / "objects" / key[:2] / f"{key}.png"
+
+    def get(self, key: str) -> Path | None:
+        """キャッシュ済み画像のパスを返す（なければ None）"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        path = self.object_path(key)
+        if not path.exists():
+            del self.entries[key]
+            return None
+        entry["last_used"] = time.time()
+        return path
+
+    def put(self, key: str, image_path: Path) -> Path:
+        """生成済み画像をキャッシュに登録"""
+        path = self.object_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(image_path, path)
+        now = time.time()
+        self.entries[key] = {
+            "size": path.stat().st_size,
+            "created": now,
+            "last_used": now,
+        }
+        return path
+
+    def is_current(self, output_path: Path, key: str) -> bool:
+        """出力先の画像がこのキーで生成されたものか"""
+        return output_path.exists() and self.outputs.get(str(output_path)) == key
+
+    def materialize(self, key: str, output_path: Path) -> bool:
+        """キャッシュ済み画像を出力先にコピー"""
+        path = self.get(key)
+        if path is None:
+            return False
+        shutil.copyfile(path, output_path)
+        self.record_output(output_path, key)
+        return True
+
+    def record_output(self, output_path: Path, key: str):
+        self.outputs[str(output_path)] = key
+
+    def evict(self, max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+              max_bytes: int = DEFAULT_MAX_BYTES) -> int:
+        """古いエントリと容量超過分を最終利用の古い順に削除し、削除件数を返す"""
+        now = time.time()
+        expired = [
+            key for key, entry in self.entries.items()
+            if now - entry["last_used"] > max_age_days * 86400
+        ]
+
+        by_last_used = sorted(
+            (key for key in self.entries if key not in expired),
+            key=lambda k: self.entries[k]["last_used"],
+        )
+        total = sum(self.entries[k]["size"] for k in by_last_used)
+        for key in by_last_used:
+            if total <= max_bytes:
+                break
+            total -= self.entries[key]["size"]
+            expired.append(key)
+
+        for key in expired:
+            self.object_path(key).unlink(missing_ok=True)
+            del self.entries[key]
+        return len(expired)
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+スライド画像（PNG）から WebP / AVIF の派生画像とサムネイルを作るスクリプト
+
+各 PNG の隣に、幅ごとの派生画像とサムネイルを書き出す。
+  images/01-intro/slide_001.png
+  images/01-intro/slide_001-w480.avif, -w960.avif, -w1376.avif（WebP も同様）
+  images/01-intro/slide_001-thumb.webp
+  images/01-intro/sprite.webp, sprite.json（セクションのサムネイルを並べたスプライトと座標）
+
+変換はプロセスプールで並列に行い、今の PNG から作った派生画像があるスライドはスキップする。
+どの PNG から作ったかはセクションごとの variants.json に PNG の内容ハッシュで記録する
+（派生画像もコミットするので、チェックアウトで変わるファイルの更新時刻は使わない）。
+派生画像の一覧とバイト数は manifest.json の variants / thumb に記録され、
+ビューアは <picture> の srcset で画面幅と対応形式に合った画像を選ぶ。
+スプライトの座標と、インラインで埋め込む極小のプレースホルダー（LQIP）もマニフェストに載せ、
+目次はセクションごとに1リクエストでサムネイルを表示し、スライドは読み込み前からぼかし画像を表示する。
+マニフェストに載せる画像の URL には内容ハッシュ（?v=）を付け、マニフェスト以外は永続的にキャッシュできるようにする。
+docs/ はリポジトリからそのまま公開するので、派生画像もマニフェストと一緒にコミットする。
+
+使い方:
+  python image_variants.py              # 古くなった派生画像だけ作る
+  python image_variants.py -j 8 --force # 全スライドを8並列で作り直す
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from pathlib import Path
+
+from atomic_io import write_bytes_atomic, write_json_atomic
+
+VIEWER_DIR = Path("docs/slide-viewer")
+IMAGES_DIR = VIEWER_DIR / "images"
+
+# 派生画像の幅（元画像より大きい幅は作らない。元画像の幅は常に含める）
+WIDTHS = (480, 960, 1376)
+THUMB_WIDTH = 240
+
+# 形式ごとのエンコード設定（ビューアは上から順に対応形式を選ぶ）
+FORMATS = {
+    "avif": {"quality": 50, "speed": 6},
+    "webp": {"quality": 80, "method": 4},
+}
+THUMB_FORMAT = "webp"
+THUMB_OPTIONS = {"quality": 70, "method": 4}
+
+# セクションごとのサムネイルスプライト
+SPRITE_NAME = "sprite.webp"
+SPRITE_INDEX = "sprite.json"
+SPRITE_COLUMNS = 10
+SPRITE_OPTIONS = {"quality": 70, "method": 4}
+
+# 派生画像とサムネイルを作った元の PNG の内容ハッシュ {PNG のファイル名: ハッシュ}
+VARIANTS_INDEX = "variants.json"
+
+# マニフェストに data URI で埋め込むプレースホルダー（16:9）
+LQIP_SIZE = (32, 18)
+LQIP_OPTIONS = {"quality": 30}
+
+# URL に付ける内容ハッシュの桁数
+VERSION_LENGTH = 16
+
+# 内容ハッシュの記録 {パス: [mtime_ns, サイズ, ハッシュ]}（プロセスをまたいで画像を読み直さないため）
+HASH_CACHE_PATH = Path(".cache/variants/hashes.json")
+
+VARIANT_NAME = re.compile(r"-w(\d+)$")
+
+
+def variant_path(png: Path, fmt: str, width: int) -> Path:
+    return png.with_name(f"{png.stem}-w{width}.{fmt}")
+
+
+def thumb_path(png: Path) -> Path:
+    return png.with_name(f"{png.stem}-thumb.{THUMB_FORMAT}")
+
+
+def target_widths(source_width: int) -> list[int]:
+    widths = [w for w in WIDTHS if w < source_width]
+    if source_width <= max(WIDTHS):
+        widths.append(source_width)
+    return widths
+
+
+def read_variants_index(section_dir: Path) -> dict[str, str]:
+    path = section_dir / VARIANTS_INDEX
+    try:
+        return _read_json(str(path), path.stat().st_mtime_ns)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def record_sources(section_dir: Path, sources: dict[str, str]):
+    """派生画像を作った PNG の内容ハッシュを記録する（PNG がなくなったスライドの記録は消す）"""
+    recorded = read_variants_index(section_dir)
+    index = {
+        name: digest for name, digest in sorted({**recorded, **sources}.items())
+        if (section_dir / name).exists()
+    }
+    if index != recorded or not (section_dir / VARIANTS_INDEX).exists():
+        write_json_atomic(section_dir / VARIANTS_INDEX, index)
+
+
+def derived_from(png: Path) -> bool:
+    """派生画像とサムネイルが今の PNG から作られたものか"""
+    recorded = read_variants_index(png.parent).get(png.name)
+    if recorded is None:
+        return False
+    try:
+        return content_hash(png) == recorded
+    except FileNotFoundError:
+        return False
+
+
+def existing_variants(png: Path, fmt: str) -> list[tuple[int, Path]]:
+    """今の PNG から作った派生画像 [(幅, パス)]（幅の昇順）"""
+    if not derived_from(png):
+        return []
+    found = []
+    for path in png.parent.glob(f"{png.stem}-w*.{fmt}"):
+        match = VARIANT_NAME.search(path.stem)
+        if match:
+            found.append((int(match.group(1)), path))
+    return sorted(found)
+
+
+def is_current(png: Path) -> bool:
+    """今の PNG から作った派生画像とサムネイルが揃っているか"""
+    if not thumb_path(png).exists():
+        return False
+    return all(existing_variants(png, fmt) for fmt in FORMATS)
+
+
+def encode(image, fmt: str, options: dict) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt.upper(), **options)
+    return buffer.getvalue()
+
+
+def resize(image, width: int):
+    from PIL import Image
+
+    if width == image.width:
+        return image
+    height = round(image.height * width / image.width)
+    return image.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def make_variants(png_path: str) -> tuple[str, str, dict[str, int], float]:
+    """1枚分の派生画像を作る（ワーカープロセスで実行）
+
+    (PNG のパス, PNG の内容ハッシュ, {形式: 最大幅のバイト数}, 所要秒数) を返す。
+    """
+    from PIL import Image
+
+    started = time.perf_counter()
+    png = Path(png_path)
+    # ハッシュの記録はメインプロセスだけが持つので、ワーカーでは直接計算する
+    digest = _hash_file(png)
+    with Image.open(png) as source:
+        image = source.convert("RGB")
+
+    written = set()
+    largest = {}
+    for width in target_widths(image.width):
+        resized = resize(image, width)
+        for fmt, options in FORMATS.items():
+            path = variant_path(png, fmt, width)
+            data = encode(resized, fmt, options)
+            write_bytes_atomic(path, data)
+            written.add(path)
+            largest[fmt] = len(data)
+
+    write_bytes_atomic(thumb_path(png), encode(resize(image, THUMB_WIDTH), THUMB_FORMAT, THUMB_OPTIONS))
+
+    # 設定変更などで不要になった幅の派生画像を消す
+    for fmt in FORMATS:
+        for path in png.parent.glob(f"{png.stem}-w*.{fmt}"):
+            if path not in written:
+                path.unlink(missing_ok=True)
+
+    return png_path, digest, largest, time.perf_counter() - started
+
+
+def build_sprite(section_dir: Path, force: bool = False) -> bool:
+    """セクションのサムネイルを1枚のスプライトにまとめ、LQIP と一緒に sprite.json に書く
+
+    サムネイルが前回から変わっていなければ何もしない（作り直したら True）。
+    """
+    from PIL import Image
+
+    thumbs = [
+        (png, thumb_path(png)) for png in sorted(section_dir.glob("slide_*.png"))
+        if thumb_path(png).exists()
+    ]
+    # チェックアウトで更新時刻が変わっても作り直さないよう、サムネイルの内容ハッシュで比べる
+    sources = {png.name: content_hash(thumb) for png, thumb in thumbs}
+    index = read_sprite_index(section_dir)
+    if not force and index is not None and (section_dir / SPRITE_NAME).exists():
+        if {name: item.get("thumb_hash") for name, item in index["slides"].items()} == sources:
+            return False
+    if not thumbs:
+        return False
+
+    images = []
+    for _, thumb in thumbs:
+        with Image.open(thumb) as image:
+            images.append(image.convert("RGB"))
+    tile_width = max(image.width for image in images)
+    tile_height = max(image.height for image in images)
+    columns = min(SPRITE_COLUMNS, len(images))
+    rows = (len(images) + columns - 1) // columns
+    sheet = Image.new("RGB", (columns * tile_width, rows * tile_height))
+
+    slides = {}
+    for i, ((png, _), image) in enumerate(zip(thumbs, images)):
+        x, y = i % columns * tile_width, i // columns * tile_height
+        sheet.paste(image, (x, y))
+        lqip = encode(image.resize(LQIP_SIZE, Image.Resampling.BOX), "webp", LQIP_OPTIONS)
+        slides[png.name] = {
+            "x": x,
+            "y": y,
+            "thumb_hash": sources[png.name],
+            "lqip": "data:image/webp;base64," + base64.b64encode(lqip).decode("ascii"),
+        }
+
+    write_bytes_atomic(section_dir / SPRITE_NAME, encode(sheet, "webp", SPRITE_OPTIONS))
+    write_json_atomic(section_dir / SPRITE_INDEX, {
+        "src": SPRITE_NAME,
+        "width": sheet.width,
+        "height": sheet.height,
+        "tile_width": tile_width,
+        "tile_height": tile_height,
+        "slides": slides,
+    })
+    return True
+
+
+def read_sprite_index(section_dir: Path) -> dict | None:
+    path = section_dir / SPRITE_INDEX
+    try:
+        return _read_json(str(path), path.stat().st_mtime_ns)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+@lru_cache(maxsize=32)
+def _read_json(path: str, mtime_ns: int) -> dict:
+    # マニフェストやプレビューサーバーはスライドごとに参照するので、更新されるまで読み込み結果を使い回す
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+class HashCache:
+    """(mtime_ns, サイズ) が変わっていないファイルの内容ハッシュを .cache に記録して使い回す"""
+
+    def __init__(self, path: Path = HASH_CACHE_PATH):
+        self.path = Path(path)
+        self.entries: dict[str, list] | None = None
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def _load(self) -> dict[str, list]:
+        if self.entries is None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self.entries = data if isinstance(data, dict) else {}
+            except (OSError, json.JSONDecodeError):
+                self.entries = {}
+        return self.entries
+
+    def get(self, path: Path) -> str:
+        stat = path.stat()
+        key = str(path)
+        with self.lock:
+            entry = self._load().get(key)
+        if entry and entry[:2] == [stat.st_mtime_ns, stat.st_size]:
+            return entry[2]
+        digest = _hash_file(path)
+        with self.lock:
+            self._load()[key] = [stat.st_mtime_ns, stat.st_size, digest]
+            self.dirty = True
+        return digest
+
+    def save(self):
+        """記録が増えたときだけ書き出す（なくなったファイルの記録は消す）"""
+        with self.lock:
+            if not self.dirty:
+                return
+            entries = {key: entry for key, entry in sorted(self._load().items()) if Path(key).exists()}
+            self.entries = entries
+            self.dirty = False
+        write_json_atomic(self.path, entries)
+
+
+_hashes = HashCache()
+
+
+def content_hash(path: Path) -> str:
+    """ファイル内容のハッシュ（先頭 VERSION_LENGTH 桁）"""
+    # watch.py やビルドのたびに作るマニフェストで、変更のない画像を読み直さない
+    return _hashes.get(path)
+
+
+def save_hashes():
+    """内容ハッシュの記録を .cache に書き出す"""
+    _hashes.save()
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:VERSION_LENGTH]
+
+
+def versioned(path: Path) -> str:
+    """ビューアからの相対 URL に内容ハッシュを付ける（例: images/01-intro/slide_001-w480.avif?v=…）"""
+    return f"{path.relative_to(VIEWER_DIR).as_posix()}?v={content_hash(path)}"
+
+
+def sprite_fields(name: str) -> dict:
+    """マニフェストのセクションに追加する sprite（スプライトがなければ空）"""
+    section_dir = IMAGES_DIR / name
+    index = read_sprite_index(section_dir)
+    if index is None or not (section_dir / index["src"]).exists():
+        return {}
+    return {
+        "sprite": {
+            "src": versioned(section_dir / index["src"]),
+            **{key: index[key] for key in ("width", "height", "tile_width", "tile_height")},
+        }
+    }
+
+
+def manifest_fields(image: str) -> dict:
+    """マニフェストのスライドに追加する variants / thumb / sprite_position / lqip（派生画像か PNG がなければ空）
+
+    image はビューアからの相対パス（例: images/01-intro/slide_001.png）。
+    """
+    png = VIEWER_DIR / image
+    if not derived_from(png):
+        # PNG が作り直された（または消された）スライドの派生画像は古いので載せない
+        return {}
+    fields = {}
+    variants = {}
+    for fmt in FORMATS:
+        found = existing_variants(png, fmt)
+        if found:
+            variants[fmt] = [
+                {
+                    "width": width,
+                    "src": versioned(path),
+                    "bytes": path.stat().st_size,
+                }
+                for width, path in found
+            ]
+    if variants:
+        fields["variants"] = variants
+    thumb = thumb_path(png)
+    if thumb.exists():
+        fields["thumb"] = {
+            "src": versioned(thumb),
+            "width": THUMB_WIDTH,
+            "bytes": thumb.stat().st_size,
+        }
+        # スプライトはサムネイルから作るので、同じサムネイルから作ったときだけ載せる
+        index = read_sprite_index(png.parent)
+        item = index["slides"].get(png.name) if index else None
+        if item and item.get("thumb_hash") == content_hash(thumb):
+            fields["sprite_position"] = [item["x"], item["y"]]
+            fields["lqip"] = item["lqip"]
+    return fields
+
+
+def build_variants(jobs: int, force: bool = False) -> int:
+    """古くなった派生画像とスプライトを作り、派生画像を作った枚数を返す"""
+    sources = sorted(IMAGES_DIR.glob("*/slide_*.png"))
+    stale = [png for png in sources if force or not is_current(png)]
+    print(f"スライド画像: {len(sources)} 枚（派生画像の作成: {len(stale)} 枚, 並列数: {jobs}）")
+    made = convert_variants(stale, jobs) if stale else {}
+
+    for section_dir in sorted({png.parent for png in sources}):
+        record_sources(section_dir, {png.name: digest for png, digest in made.items() if png.parent == section_dir})
+        if build_sprite(section_dir, force):
+            sheet = section_dir / SPRITE_NAME
+            print(f"  ✓ スプライト: {sheet.relative_to(IMAGES_DIR)}（{sheet.stat().st_size // 1024}KB）")
+    save_hashes()
+    return len(made)
+
+
+def convert_variants(stale: list[Path], jobs: int) -> dict[Path, str]:
+    """派生画像をプロセスプールで作り、サイズの比較を表示する（{作った PNG: 内容ハッシュ} を返す）"""
+    started = time.perf_counter()
+    totals = {"png": 0, **{fmt: 0 for fmt in FORMATS}}
+    made = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(make_variants, str(png)) for png in stale]
+        for future in as_completed(futures):
+            try:
+                png_path, digest, largest, elapsed = future.result()
+            except Exception as e:
+                print(f"  ✗ 派生画像の作成に失敗しました: {e}")
+                continue
+            png = Path(png_path)
+            made[png] = digest
+            totals["png"] += png.stat().st_size
+            for fmt, size in largest.items():
+                totals[fmt] += size
+            sizes = " / ".join(f"{fmt} {size // 1024}KB" for fmt, size in largest.items())
+            print(f"  ✓ [{len(made)}/{len(stale)}] {png.relative_to(IMAGES_DIR)}: "
+                  f"png {png.stat().st_size // 1024}KB → {sizes}（{elapsed:.1f}秒）")
+
+    print(f"\n最大幅の合計: png {totals['png'] / 1024 / 1024:.1f}MB", end="")
+    for fmt in FORMATS:
+        ratio = totals[fmt] / totals["png"] * 100 if totals["png"] else 0
+        print(f" / {fmt} {totals[fmt] / 1024 / 1024:.1f}MB（{ratio:.0f}%）", end="")
+    print(f"\n所要時間: {time.perf_counter() - started:.1f}秒")
+    return made
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スライド画像の WebP / AVIF 派生画像を作る")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 4,
+                        help="並列に変換する画像数")
+    parser.add_argument("--force", action="store_true", help="新しい派生画像があっても作り直す")
+    args = parser.parse_args()
+
+    build_variants(max(1, args.jobs), args.force)
+
+    # 派生画像の一覧をマニフェストに反映する
+    from parse_cache import ParseCache
+    from slide_manifest import MANIFEST_PATH, build_manifest, write_manifest
+
+    cache = ParseCache()
+    if write_manifest(build_manifest(cache, verbose=False)):
+        print(f"✓ マニフェスト更新: {MANIFEST_PATH}")
+    cache.save()
+
+
+if __name__ == "__main__":
+    main()
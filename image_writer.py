@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+生成された画像データの書き込み
+
+API が返すバイト列の形式を先頭のシグネチャで判定し、出力先の拡張子と同じ形式なら
+デコードせずにそのまま（アトミックに）書き込む。形式が違うときだけ Pillow で変換する。
+
+PNG の可逆最適化（optimize=True で再圧縮し、小さくなったときだけ置き換える）は
+CPU を使うので、PngOptimizer でプロセスプールに回す。
+"""
+
+import asyncio
+import io
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+from atomic_io import write_bytes_atomic
+
+# 拡張子 → MIME タイプ
+EXTENSION_MIME = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+    ".gif": "image/gif",
+}
+
+# MIME タイプ → Pillow のフォーマット名
+PIL_FORMATS = {
+    "image/png": "PNG",
+    "image/jpeg": "JPEG",
+    "image/webp": "WEBP",
+    "image/gif": "GIF",
+}
+
+
+def sniff_mime(data: bytes) -> str | None:
+    """先頭のシグネチャから画像の MIME タイプを判定する（不明なら None）"""
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return None
+
+
+def write_image(data: bytes, output_path: Path, mime_type: str | None = None) -> bool:
+    """画像データを出力先の拡張子の形式で保存する
+
+    形式が一致すればデコードせずに書き込み True を返す。変換した場合は False。
+    mime_type は API が申告した形式で、シグネチャで判定できないときに使う。
+    """
+    output_path = Path(output_path)
+    actual = sniff_mime(data) or mime_type
+    wanted = EXTENSION_MIME.get(output_path.suffix.lower())
+    if wanted is None or actual == wanted:
+        write_bytes_atomic(output_path, data)
+        return True
+
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    with Image.open(io.BytesIO(data)) as image:
+        if wanted == "image/jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(buffer, format=PIL_FORMATS[wanted])
+    write_bytes_atomic(output_path, buffer.getvalue())
+    return False
+
+
+def optimize_png(path: str) -> tuple[int, int]:
+    """PNG を可逆に再圧縮し、小さくなれば置き換える（ワーカープロセスで実行）
+
+    (元のバイト数, 最適化後のバイト数) を返す。
+    """
+    from PIL import Image
+
+    png = Path(path)
+    before = png.stat().st_size
+    buffer = io.BytesIO()
+    with Image.open(png) as image:
+        image.save(buffer, format="PNG", optimize=True)
+    if buffer.tell() >= before:
+        return before, before
+    write_bytes_atomic(png, buffer.getvalue())
+    return before, buffer.tell()
+
+
+class PngOptimizer:
+    """PNG 最適化のプロセスプール（最初の依頼でプールを起動する）"""
+
+    def __init__(self, workers: int | None = None):
+        self.workers = workers
+        self.pool: ProcessPoolExecutor | None = None
+        self.before = 0
+        self.after = 0
+
+    def submit(self, path: Path) -> Future:
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        future = self.pool.submit(optimize_png, str(path))
+        future.add_done_callback(self._count)
+        return future
+
+    async def optimize(self, path: Path) -> tuple[int, int]:
+        """イベントループを止めずに最適化の完了を待つ"""
+        return await asyncio.wrap_future(self.submit(path))
+
+    def _count(self, future: Future):
+        if not future.cancelled() and future.exception() is None:
+            before, after = future.result()
+            self.before += before
+            self.after += after
+
+    def close(self):
+        """実行中の最適化が終わるのを待ってプールを閉じる"""
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+    def summary(self) -> str:
+        saved = self.before - self.after
+        ratio = saved / self.before * 100 if self.before else 0
+        return f"PNG 最適化: {self.before / 1024 / 1024:.1f}MB → {self.after / 1024 / 1024:.1f}MB（{ratio:.1f}% 削減）"
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+generate_all_slides.py の負荷試験
+
+3デッキの全スライドを、ローカルの Gemini 互換サーバー（fake_gemini_server.py）に向けて
+generate_images() でそのまま生成し、同時実行数・レート・再試行の設定の効果を測る。
+画像・キャッシュ・ジャーナルは一時ディレクトリに書くので、docs/ や .cache/ は変わらない。
+
+報告する値:
+- 枚/分（全スライドの生成にかかった時間から）
+- リクエストごとの応答時間の p50 / p99（失敗した試行も含む）
+- スライドごとの所要時間の p50 / p99（最初の送信から画像を受け取るまで。再試行の待ちを含む）
+- 再試行の回数（うちクォータ超過）と、サーバーが返した 429 / 5xx の数
+
+使い方:
+  python load_test.py                                        # サーバーを同じプロセスで起動して実行
+  python load_test.py -j 8 --rpm 120 --latency lognormal:8,0.4
+  python load_test.py --burst-every 30 --burst-length 5 --error-rate 0.05
+  python load_test.py --url http://127.0.0.1:8090            # 起動済みのサーバーを使う
+  python load_test.py --report load.json                     # 結果を JSON でも書き出す
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+from pathlib import Path
+
+import fake_gemini_server
+from atomic_io import write_json_atomic
+from decks import FILES
+from generate_all_slides import build_jobs, generate_images
+from generation_engine import DEFAULT_CONCURRENCY
+from generation_journal import DONE, FAILED
+from image_backend import ImageBackend, create_backend
+from image_cache import DEFAULT_MAX_AGE_DAYS, DEFAULT_MAX_BYTES, ImageCache
+from parse_cache import ParseCache
+from rate_limiter import DEFAULT_RPM
+
+ROOT = Path(__file__).resolve().parent
+
+
+class TimedBackend(ImageBackend):
+    """試行ごとの応答時間と、スライドごとの所要時間を記録するラッパー"""
+
+    def __init__(self, backend: ImageBackend):
+        self.backend = backend
+        self.name = backend.name
+        self.attempts: list[tuple[float, str]] = []  # (秒, 結果: ok / HTTP ステータス / 例外名)
+        self.first_sent: dict[str, float] = {}
+        self.slide_seconds: list[float] = []
+
+    async def generate(self, prompt: str, model: str, config):
+        started = time.perf_counter()
+        self.first_sent.setdefault(prompt, started)
+        try:
+            image = await self.backend.generate(prompt, model, config)
+        except Exception as e:
+            outcome = str(getattr(e, "code", None) or type(e).__name__)
+            self.attempts.append((time.perf_counter() - started, outcome))
+            raise
+        finished = time.perf_counter()
+        self.attempts.append((finished - started, "ok"))
+        self.slide_seconds.append(finished - self.first_sent[prompt])
+        return image
+
+    async def close(self):
+        await self.backend.close()
+
+
+def percentile(values: list[float], q: float) -> float:
+    """最近傍順位法のパーセンタイル（空なら 0）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def fetch_stats(url: str) -> dict:
+    with urllib.request.urlopen(url.rstrip("/") + "/stats", timeout=10) as response:
+        return json.loads(response.read())
+
+
+async def run_load_test(args: argparse.Namespace) -> dict:
+    # デッキは元の場所から読み、出力先（相対パス）は一時ディレクトリに向ける
+    files = [{**file_info, "src": str(ROOT / file_info["src"])} for file_info in FILES]
+
+    server = tcp = None
+    url = args.url
+    if url is None:
+        server_args = argparse.Namespace(**{**vars(args), "port": 0, "quiet": True})
+        server, tcp = await fake_gemini_server.start(server_args)
+        url = f"http://{args.host}:{tcp.sockets[0].getsockname()[1]}"
+    before = server.stats.copy() if server else await asyncio.to_thread(fetch_stats, url)
+
+    backend = TimedBackend(create_backend(url))
+    with tempfile.TemporaryDirectory(prefix="slides-load-") as workdir:
+        os.chdir(workdir)
+        try:
+            jobs = build_jobs(ParseCache(), files, verbose=False)
+            print(f"負荷試験: {len(jobs)} スライド → {url}"
+                  f"（同時実行数 {args.concurrency}, {args.rpm:g} リクエスト/分）")
+            output = io.StringIO() if args.quiet else sys.stdout
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(output):
+                limiter = await generate_images(jobs, args, ImageCache(), quiet=True, backend=backend)
+            elapsed = time.perf_counter() - started
+        finally:
+            os.chdir(ROOT)
+            await backend.close()
+            if tcp is not None:
+                tcp.close()
+                await tcp.wait_closed()
+
+    after = server.stats if server else await asyncio.to_thread(fetch_stats, url)
+    statuses = [job.get("status") for job in jobs]
+    latencies = [seconds for seconds, _ in backend.attempts]
+    done = statuses.count(DONE)
+    return {
+        "url": url,
+        "slides": len(jobs),
+        "done": done,
+        "failed": statuses.count(FAILED),
+        "seconds": elapsed,
+        "slides_per_minute": done / elapsed * 60 if elapsed else 0.0,
+        "requests": len(backend.attempts),
+        "latency": {"p50": percentile(latencies, 50), "p99": percentile(latencies, 99),
+                    "max": max(latencies, default=0.0)},
+        "slide_latency": {"p50": percentile(backend.slide_seconds, 50),
+                          "p99": percentile(backend.slide_seconds, 99)},
+        "outcomes": dict(Counter(outcome for _, outcome in backend.attempts)),
+        "retries": limiter.retries,
+        "throttled": limiter.throttled,
+        "final_concurrency": limiter.concurrency,
+        "server": {key: after[key] - before.get(key, 0) for key in ("requests", "ok", "throttled", "errors")},
+        "settings": {
+            "concurrency": args.concurrency,
+            "rpm": args.rpm,
+            **({} if args.url else {
+                "latency": args.latency,
+                "error_rate": args.error_rate,
+                "burst_every": args.burst_every,
+                "burst_length": args.burst_length,
+                "quota_rpm": args.quota_rpm,
+                "size": "x".join(map(str, args.size)),
+            }),
+        },
+    }
+
+
+def print_report(report: dict):
+    latency, slide = report["latency"], report["slide_latency"]
+    outcomes = ", ".join(f"{name} {count}" for name, count in sorted(report["outcomes"].items()))
+    server = report["server"]
+    print(f"\n  完了         {report['done']}/{report['slides']} スライド（失敗 {report['failed']}）"
+          f"  {report['seconds']:.1f}秒")
+    print(f"  スループット {report['slides_per_minute']:.1f} 枚/分")
+    print(f"  応答時間     p50 {latency['p50']:.2f}秒  p99 {latency['p99']:.2f}秒  最大 {latency['max']:.2f}秒"
+          f"（{report['requests']} リクエスト: {outcomes}）")
+    print(f"  スライドごと p50 {slide['p50']:.2f}秒  p99 {slide['p99']:.2f}秒（再試行の待ちを含む）")
+    print(f"  再試行       {report['retries']} 回（うちクォータ超過 {report['throttled']} 回）"
+          f"  終了時の同時実行数 {report['final_concurrency']}")
+    print(f"  サーバー     429 {server['throttled']} 件 / 5xx {server['errors']} 件 / 成功 {server['ok']} 件")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ローカルの Gemini 互換サーバーで全スライドの生成を負荷試験する")
+    parser.add_argument("-j", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"同時に実行する生成リクエスト数の上限（デフォルト: {DEFAULT_CONCURRENCY}）")
+    parser.add_argument("--rpm", type=float, default=DEFAULT_RPM,
+                        help=f"1分あたりの最大リクエスト数（デフォルト: {DEFAULT_RPM}）")
+    parser.add_argument("--optimize-png", action="store_true", help="生成した PNG を可逆に再圧縮する")
+    parser.add_argument("--url", help="起動済みの互換サーバー（省略時は同じプロセスで起動する）")
+    parser.add_argument("--host", default=fake_gemini_server.DEFAULT_HOST, help="同じプロセスで起動するサーバーのホスト")
+    parser.add_argument("--report", type=Path, help="結果を書き出す JSON")
+    parser.add_argument("-q", "--quiet", action="store_true", help="スライドごとの進捗を表示しない")
+    fake_gemini_server.add_server_arguments(parser)
+    parser.set_defaults(
+        cache_max_age_days=DEFAULT_MAX_AGE_DAYS,
+        cache_max_mb=DEFAULT_MAX_BYTES // (1024 * 1024),
+    )
+    args = parser.parse_args()
+    if args.report:
+        args.report = args.report.resolve()
+
+    try:
+        report = asyncio.run(run_load_test(args))
+    except KeyboardInterrupt:
+        print("\n中断しました")
+        sys.exit(130)
+    print_report(report)
+    if args.report:
+        write_json_atomic(args.report, report)
+        print(f"\n✓ 結果: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+スライド本文からスピーカーノートのテキストを作る
+
+本文を1回だけ走査し、各行の元のインデントをそのまま使って変換する。
+- 見出し（#〜###）は除く（タイトルは別に表示される）
+- 箇条書き・番号付きリストは入れ子の深さに応じて字下げし「・」を付ける
+- 太字だけの行は【】で囲み、行内の強調記号やインラインコードの ` は外す
+- 表は区切り行を除き、セルを「 / 」でつなげる
+- コードブロックは中身をそのまま残す
+- `<!-- notes: ... -->` で書かれたノートコメントは先頭に置く
+"""
+
+import re
+
+from slide_parser import Slide
+
+# 変換ルールを変えたら上げる（解析キャッシュの記録を無効にするため）
+RENDERER_VERSION = 3
+
+HEADING_RE = re.compile(r"^#{1,3}\s+.+$")
+BULLET_RE = re.compile(r"^([-*+])\s+(.*)$")
+ORDERED_RE = re.compile(r"^(\d+[.)])\s+(.*)$")
+FENCE_RE = re.compile(r"^(`{3,}|~{3,})")
+TABLE_SEPARATOR_RE = re.compile(r"^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?$")
+HTML_TAG_RE = re.compile(r"</?[A-Za-z][^>]*>")
+
+INLINE_RULES = [
+    (re.compile(r"\*\*(.+?)\*\*"), r"\1"),
+    (re.compile(r"__(.+?)__"), r"\1"),
+    (re.compile(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])"), r"\1"),
+    (re.compile(r"`([^`]+)`"), r"\1"),
+    (re.compile(r"!?\[([^\]]*)\]\([^)]*\)"), r"\1"),
+]
+
+
+def render_inline(text: str) -> str:
+    """行内の Markdown 記法（強調・コード・リンク・HTMLタグ）を外す"""
+    text = HTML_TAG_RE.sub("", text)
+    for pattern, replacement in INLINE_RULES:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def indent_prefix(indent: int) -> str:
+    """元のインデント（半角スペース2つで1段）に応じた字下げ"""
+    return "  " * (indent // 2)
+
+
+def render_body(body: str) -> list[str]:
+    """スライド本文をノートの行リストに変換する"""
+    lines = []
+    fence = None
+
+    for raw in body.split("\n"):
+        expanded = raw.expandtabs(4)
+        stripped = expanded.strip()
+        indent = len(expanded) - len(expanded.lstrip())
+
+        # コードブロック
+        if fence is not None:
+            if stripped.startswith(fence) and not stripped.lstrip(fence[0]):
+                fence = None
+            else:
+                lines.append(expanded.rstrip())
+            continue
+        match = FENCE_RE.match(stripped)
+        if match:
+            fence = match.group(1)
+            continue
+
+        if not stripped or HEADING_RE.match(stripped):
+            continue
+
+        # 表
+        if stripped.startswith("|"):
+            if TABLE_SEPARATOR_RE.match(stripped):
+                continue
+            cells = [render_inline(c) for c in stripped.strip("|").split("|")]
+            lines.append(" / ".join(c for c in cells if c))
+            continue
+
+        match = BULLET_RE.match(stripped)
+        if match:
+            lines.append(indent_prefix(indent) + "・" + render_inline(match.group(2)))
+            continue
+
+        match = ORDERED_RE.match(stripped)
+        if match:
+            lines.append(indent_prefix(indent) + match.group(1) + " " + render_inline(match.group(2)))
+            continue
+
+        if (stripped.startswith("**") and stripped.endswith("**")
+                and len(stripped) > 4 and "**" not in stripped[2:-2]):
+            lines.append("【" + render_inline(stripped[2:-2]) + "】")
+            continue
+
+        text = render_inline(stripped)
+        if text:
+            lines.append(text)
+
+    return lines
+
+
+def render_notes(slide: Slide) -> str:
+    """スライドのスピーカーノート"""
+    lines = list(slide.notes)
+    if lines:
+        lines.append("")
+    lines.extend(render_body(slide.body))
+
+    notes = "\n".join(lines).strip()
+    return notes if notes else f"（{slide.title}）"
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+スライド解析結果の永続キャッシュ
+
+ファイルごとに mtime・サイズ・内容ハッシュと解析済みスライドを保存し、
+変更のないファイルは読み込み・解析をせずに返す。
+さらに後段の処理（ノート抽出・画像生成・マニフェスト作成など）ごとに
+処理済みスライドのハッシュと結果を記録し、変更されたスライドだけを返す。
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from atomic_io import write_json_atomic
+from slide_parser import Slide, parse_slides_text
+
+CACHE_PATH = Path(".cache/parse/index.json")
+CACHE_VERSION = 2
+
+
+def slide_hash(slide: Slide) -> str:
+    """スライド内容のハッシュ（番号・行範囲は含めない）"""
+    payload = json.dumps(
+        [slide.title, slide.body, slide.directives, slide.notes, slide.is_section],
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ParseCache:
+    """ファイル単位・スライド単位の解析キャッシュ"""
+
+    def __init__(self, path: Path = CACHE_PATH):
+        self.path = Path(path)
+        self.files: dict[str, dict] = {}
+        self.dirty = False
+        self._slides: dict[str, list[Slide]] = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"  ⚠️ 解析キャッシュを読み込めません（作り直します）: {e}")
+            return
+        if data.get("version") == CACHE_VERSION:
+            self.files = data.get("files", {})
+
+    def save(self):
+        """変更があればキャッシュを書き出す"""
+        if self.dirty:
+            write_json_atomic(self.path, {"version": CACHE_VERSION, "files": self.files}, indent=None)
+            self.dirty = False
+
+    def slides(self, src: str | Path) -> list[Slide]:
+        """ファイルのスライド一覧（変更がなければキャッシュから返す）"""
+        key = str(src)
+        if key in self._slides:
+            return self._slides[key]
+
+        stat = os.stat(src)
+        entry = self.files.get(key)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            slides = [Slide.from_dict(d) for d in entry["slides"]]
+        else:
+            raw = Path(src).read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+            if entry and entry["sha256"] == digest:
+                # touch されただけで内容は同じ
+                slides = [Slide.from_dict(d) for d in entry["slides"]]
+            else:
+                slides = parse_slides_text(raw.decode("utf-8"))
+                entry = {
+                    "sha256": digest,
+                    "slides": [s.to_dict() for s in slides],
+                    "hashes": [slide_hash(s) for s in slides],
+                    "stages": (entry or {}).get("stages", {}),
+                }
+            entry["mtime_ns"] = stat.st_mtime_ns
+            entry["size"] = stat.st_size
+            self.files[key] = entry
+            self.dirty = True
+
+        self._slides[key] = slides
+        return slides
+
+    def forget(self, src: str | Path):
+        """メモリ上の解析結果を捨てる（次回 slides() でファイルを確認し直す）"""
+        self._slides.pop(str(src), None)
+
+    def _stage(self, src: str | Path, stage: str) -> dict:
+        self.slides(src)
+        return self.files[str(src)]["stages"].setdefault(stage, {})
+
+    def changed(self, src: str | Path, stage: str) -> list[Slide]:
+        """stage で前回処理したときから内容が変わった（または新しい）スライド"""
+        slides = self.slides(src)
+        hashes = self.files[str(src)]["hashes"]
+        done = self._stage(src, stage)
+        return [
+            slide for slide, digest in zip(slides, hashes)
+            if done.get(str(slide.index), {}).get("hash") != digest
+        ]
+
+    def results(self, src: str | Path, stage: str) -> dict[int, Any]:
+        """stage で記録したスライドごとの結果 {index: result}"""
+        return {int(i): item.get("result") for i, item in self._stage(src, stage).items()}
+
+    def record(self, src: str | Path, stage: str, results: dict[int, Any]):
+        """stage の処理結果を記録し、削除されたスライドの記録を捨てる"""
+        slides = self.slides(src)
+        hashes = self.files[str(src)]["hashes"]
+        done = self._stage(src, stage)
+        for slide, digest in zip(slides, hashes):
+            if slide.index in results:
+                done[str(slide.index)] = {"hash": digest, "result": results[slide.index]}
+        for index in list(done):
+            if int(index) > len(slides):
+                del done[index]
+        self.dirty = True
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+公開用の docs/ を事前に圧縮する（publish ステージ）
+
+HTML / JSON / CSS / JS / SVG の隣に .gz（と brotli パッケージがあれば .br）を書き出す。
+圧縮は最大の圧縮率でプロセスプールに並列に回し、前回から内容ハッシュが変わっていない
+ファイルは圧縮し直さない。ファイルごとの元のサイズと圧縮後のサイズを表示し、
+--report を指定すれば JSON でも書き出す（ペイロードの増加を追うため）。
+
+gzip_static などで事前圧縮ファイルを返せるサーバー（preview_server.py を含む）で使う。
+圧縮ファイルはビルドの生成物なのでコミットしない（.gitignore）。
+1ファイルでも圧縮に失敗したら RuntimeError を送出する（コマンドは終了コード 1）。
+
+使い方:
+  python precompress.py                        # 変更のあったファイルだけ圧縮
+  python precompress.py --force -j 8           # 全ファイルを8並列で圧縮し直す
+  python precompress.py --report sizes.json    # サイズの一覧を JSON でも書き出す
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # 任意の依存
+    brotli = None
+
+from atomic_io import write_bytes_atomic, write_json_atomic
+
+ROOT = Path("docs")
+STATE_PATH = Path(".cache/precompress/state.json")
+
+EXTENSIONS = {".html", ".json", ".css", ".js", ".svg"}
+MIN_BYTES = 1024  # これより小さいファイルは圧縮しても得がない
+
+SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+
+def encodings() -> list[str]:
+    return ["gzip", "br"] if brotli is not None else ["gzip"]
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def sibling(path: Path, encoding: str) -> Path:
+    return path.with_name(path.name + SUFFIXES[encoding])
+
+
+def discover(root: Path = ROOT) -> list[Path]:
+    """圧縮する公開ファイル"""
+    return sorted(
+        path for path in root.rglob("*")
+        if path.suffix in EXTENSIONS and path.is_file() and path.stat().st_size >= MIN_BYTES
+    )
+
+
+def compress_file(path: str, wanted: list[str]) -> tuple[str, str, dict[str, int], float]:
+    """1ファイルを圧縮して隣に書き出す（ワーカープロセスで実行）
+
+    (パス, 内容ハッシュ, {形式: バイト数}, 所要秒数) を返す。
+    """
+    started = time.perf_counter()
+    source = Path(path)
+    data = source.read_bytes()
+    sizes = {}
+    for encoding in wanted:
+        compressed = compress(data, encoding)
+        write_bytes_atomic(sibling(source, encoding), compressed)
+        sizes[encoding] = len(compressed)
+    return path, hashlib.sha256(data).hexdigest(), sizes, time.perf_counter() - started
+
+
+def load_state() -> dict:
+    try:
+        return json.loads(STATE_PATH.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def is_current(path: Path, entry: dict | None, wanted: list[str]) -> bool:
+    """前回と同じ内容で、必要な圧縮ファイルが揃っているか"""
+    if entry is None or any(encoding not in entry["sizes"] for encoding in wanted):
+        return False
+    if any(not sibling(path, encoding).exists() for encoding in wanted):
+        return False
+    return hashlib.sha256(path.read_bytes()).hexdigest() == entry["sha256"]
+
+
+def remove_orphans(root: Path) -> int:
+    """元のファイルがなくなった .gz / .br を消す"""
+    removed = 0
+    for suffix in SUFFIXES.values():
+        for path in root.rglob(f"*{suffix}"):
+            source = path.with_name(path.name[:-len(suffix)])
+            if source.suffix in EXTENSIONS and not source.exists():
+                path.unlink()
+                removed += 1
+    return removed
+
+
+def precompress(root: Path, jobs: int, force: bool = False) -> dict:
+    """変更のあったファイルを圧縮し、全ファイルのサイズ一覧 {パス: {...}} を返す"""
+    wanted = encodings()
+    state = load_state()
+    files = discover(root)
+
+    stale = []
+    for path in files:
+        entry = state.get(str(path))
+        if not force and is_current(path, entry, wanted):
+            # 内容は同じで書き直されただけなら、圧縮ファイルを元のファイルより新しくしておく
+            for encoding in wanted:
+                compressed = sibling(path, encoding)
+                if compressed.stat().st_mtime_ns < path.stat().st_mtime_ns:
+                    os.utime(compressed)
+            continue
+        stale.append(path)
+
+    print(f"対象: {len(files)} ファイル（圧縮: {len(stale)}, 形式: {' / '.join(wanted)}, 並列数: {jobs}）")
+    if brotli is None:
+        print("  ⚠️ brotli パッケージがないため .br は作りません")
+
+    started = time.perf_counter()
+    failures = []
+    if stale:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(compress_file, str(path), wanted): path for path in stale}
+            for future, source in futures.items():
+                try:
+                    path, digest, sizes, elapsed = future.result()
+                except Exception as e:
+                    # 記録を消して、次回は内容が同じでも圧縮し直す
+                    print(f"  ✗ {source}: 圧縮に失敗しました: {e}")
+                    failures.append(str(source))
+                    state.pop(str(source), None)
+                    continue
+                state[path] = {"sha256": digest, "size": Path(path).stat().st_size, "sizes": sizes}
+
+    removed = remove_orphans(root)
+    # なくなったファイルの記録を捨てる
+    current = {str(path) for path in files}
+    state = {path: entry for path, entry in state.items() if path in current}
+    write_json_atomic(STATE_PATH, state)
+
+    print_report(state, {str(path) for path in stale})
+    print(f"所要時間: {time.perf_counter() - started:.1f}秒"
+          + (f"（古い圧縮ファイルを {removed} 件削除）" if removed else ""))
+    if failures:
+        raise RuntimeError(f"{len(failures)} ファイルの圧縮に失敗しました: {', '.join(failures)}")
+    return state
+
+
+def print_report(state: dict, updated: set[str]):
+    """ファイルごとのサイズと削減率（圧縮し直したファイルには * を付ける）"""
+    wanted = encodings()
+    width = max((len(path) for path in state), default=10)
+    # 全角の見出しは2桁分の幅になるので、その分を詰める
+    header = f"  {'ファイル':<{width - 4}} {'元':>8}" + "".join(f" {encoding:>17}" for encoding in wanted)
+    print(f"\n{header}")
+    totals = {"size": 0, **{encoding: 0 for encoding in wanted}}
+    for path, entry in sorted(state.items(), key=lambda item: -item[1]["size"]):
+        size = entry["size"]
+        totals["size"] += size
+        columns = ""
+        for encoding in wanted:
+            compressed = entry["sizes"].get(encoding, size)
+            totals[encoding] += compressed
+            columns += f" {compressed / 1024:8.1f}KB ({compressed / size * 100:3.0f}%)"
+        mark = "*" if path in updated else " "
+        print(f"{mark} {path:<{width}} {size / 1024:7.1f}KB{columns}")
+    if totals["size"]:
+        columns = "".join(
+            f" {totals[e] / 1024:8.1f}KB ({totals[e] / totals['size'] * 100:3.0f}%)" for e in wanted
+        )
+        print(f"  {'合計':<{width - 2}} {totals['size'] / 1024:7.1f}KB{columns}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="公開ファイルの .gz / .br を作る")
+    parser.add_argument("--root", type=Path, default=ROOT, help=f"公開するディレクトリ（デフォルト: {ROOT}）")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 4,
+                        help="並列に圧縮するファイル数")
+    parser.add_argument("--force", action="store_true", help="内容が変わっていなくても圧縮し直す")
+    parser.add_argument("--report", type=Path, help="ファイルごとのサイズを書き出す JSON")
+    args = parser.parse_args()
+
+    try:
+        state = precompress(args.root, max(1, args.jobs), args.force)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if args.report:
+        write_json_atomic(args.report, {
+            path: {"size": entry["size"], **entry["sizes"]} for path, entry in sorted(state.items())
+        })
+        print(f"✓ サイズ一覧: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
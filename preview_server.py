@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+docs/ をローカルで確認するためのプレビューサーバー（asyncio）
+
+- ETag / Last-Modified による再検証（304）と Range リクエスト（206）
+- HTML / JSON / CSS / JS は gzip / brotli で圧縮して返す（新しい .gz / .br があればそれを使う）
+- スライド画像の PNG は、WebP の派生画像があり Accept が対応していれば WebP を返す
+- ?v= 付きの URL と、ファイル名に内容ハッシュを含む CSS（docs/themes/）は immutable としてキャッシュさせる
+- マニフェストや HTML が書き換わったら、開いているページに Server-Sent Events で知らせる
+  （ビューアは表示中のスライドのままマニフェストを読み直し、デッキの HTML は再読み込みする）
+
+使い方:
+  python preview_server.py                # http://localhost:8000/slide-viewer/
+  python preview_server.py --watch        # watch.py も同じプロセスで動かす
+  python preview_server.py --port 8080 --no-reload
+
+brotli パッケージがあれば brotli でも圧縮する（なければ .br があるときだけ brotli で返す）。
+"""
+
+import argparse
+import asyncio
+import email.utils
+import gzip
+import mimetypes
+import re
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+try:
+    import brotli
+except ImportError:  # 任意の依存
+    brotli = None
+
+from image_variants import existing_variants
+
+ROOT = Path("docs")
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+
+RELOAD_PATH = "/__reload"
+RELOAD_POLL_INTERVAL = 0.3
+KEEPALIVE_INTERVAL = 15
+
+# ?v= 付きの URL やファイル名に内容ハッシュを含む CSS（build_html.py）は、内容が変わると URL も変わる
+IMMUTABLE = "public, max-age=31536000, immutable"
+FINGERPRINTED = re.compile(r"\.[0-9a-f]{12}\.css$")
+REVALIDATE = "no-cache"
+
+COMPRESSIBLE_TYPES = {
+    "text/html", "text/css", "text/plain", "text/markdown", "text/javascript",
+    "application/javascript", "application/json", "image/svg+xml",
+}
+MIN_COMPRESS_BYTES = 1024
+COMPRESS_CACHE_ENTRIES = 256
+
+# 優先順（Accept-Encoding で両方受け付けるなら brotli）
+ENCODINGS = ["br", "gzip"]
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+STATUS_TEXT = {
+    200: "OK", 206: "Partial Content", 301: "Moved Permanently", 304: "Not Modified",
+    400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+    416: "Range Not Satisfiable",
+}
+
+# HTML に差し込む再読み込み用のスクリプト（ページが onPreviewReload を持っていればそちらに任せる）
+RELOAD_SNIPPET = f"""<script>
+new EventSource('{RELOAD_PATH}').onmessage = (e) => {{
+    if (window.onPreviewReload) return window.onPreviewReload(e.data);
+    const page = location.pathname.endsWith('/') ? location.pathname + 'index.html' : location.pathname;
+    if (e.data === page) location.reload();
+}};
+</script>
+""".encode("utf-8")
+
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("image/avif", ".avif")
+mimetypes.add_type("text/markdown", ".md")
+mimetypes.add_type("text/javascript", ".js")
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def can_compress(encoding: str) -> bool:
+    return encoding == "gzip" or brotli is not None
+
+
+class Request:
+    """HTTP リクエスト（ヘッダー名は小文字）"""
+
+    def __init__(self, method: str, target: str, version: str, headers: dict[str, str]):
+        self.method = method
+        self.target = target
+        self.version = version
+        self.headers = headers
+        url = urlsplit(target)
+        self.path = unquote(url.path)
+        self.query = url.query
+
+    @property
+    def versioned(self) -> bool:
+        """内容ハッシュの ?v= が付いているか（?dev=1 などは含まない）"""
+        return "v" in parse_qs(self.query)
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    def accepts(self, header: str, value: str) -> bool:
+        """Accept 系ヘッダーが value を q > 0 で含むか"""
+        for item in self.headers.get(header, "").split(","):
+            name, *params = [part.strip() for part in item.split(";")]
+            if name != value:
+                continue
+            quality = 1.0
+            for param in params:
+                key, _, number = param.partition("=")
+                if key.strip() == "q":
+                    try:
+                        quality = float(number)
+                    except ValueError:
+                        quality = 0.0
+            return quality > 0
+        return False
+
+
+async def read_request(reader: asyncio.StreamReader) -> Request | None:
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise ValueError(f"不正なリクエスト行: {line[:100]!r}")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return Request(method, target, version, headers)
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Range ヘッダー（単一範囲のみ）を (開始, 終了) に変換する。満たせなければ ValueError"""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None  # 複数範囲は全体を返す
+    start, _, end = spec.strip().partition("-")
+    if start:
+        first = int(start)
+        last = min(int(end), size - 1) if end else size - 1
+    else:
+        first = max(0, size - int(end))
+        last = size - 1
+    if first > last or first >= size:
+        raise ValueError(header)
+    return first, last
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def inject_reload(html: bytes) -> bytes:
+    index = html.lower().rfind(b"</body>")
+    if index < 0:
+        return html + RELOAD_SNIPPET
+    return html[:index] + RELOAD_SNIPPET + html[index:]
+
+
+class ReloadHub:
+    """ファイルの書き換えを監視し、接続中のページに変更された URL を送る"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.clients: set[asyncio.Queue] = set()
+
+    def watched(self) -> list[Path]:
+        viewer = self.root / "slide-viewer"
+        return [
+            viewer / "manifest" / "index.json",
+            viewer / "manifest.json",
+            *self.root.glob("*.html"),
+            *viewer.glob("*.html"),
+        ]
+
+    @staticmethod
+    def _mtime(path: Path) -> int | None:
+        try:
+            return path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    async def run(self):
+        mtimes = {path: self._mtime(path) for path in self.watched()}
+        while True:
+            await asyncio.sleep(RELOAD_POLL_INTERVAL)
+            for path in self.watched():
+                mtime = self._mtime(path)
+                if path in mtimes and mtime != mtimes[path]:
+                    self.broadcast("/" + path.relative_to(self.root).as_posix())
+                mtimes[path] = mtime
+
+    def broadcast(self, url: str):
+        if self.clients:
+            print(f"  ↻ {url}（{len(self.clients)} ページに通知）")
+        for queue in self.clients:
+            queue.put_nowait(url)
+
+
+class PreviewServer:
+    """静的ファイルを返す HTTP/1.1 サーバー"""
+
+    def __init__(self, root: Path, reload: bool = True, quiet: bool = False):
+        self.root = root.resolve()
+        self.hub = ReloadHub(root) if reload else None
+        self.quiet = quiet
+        self.compressed: OrderedDict[tuple, bytes] = OrderedDict()
+
+    # ---- 接続 ----
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except ValueError:
+                    await self.send_error(writer, 400)
+                    break
+                if request is None:
+                    break
+                started = time.perf_counter()
+                status, detail = await self.respond(request, writer)
+                if not self.quiet and request.path != RELOAD_PATH:
+                    elapsed = (time.perf_counter() - started) * 1000
+                    print(f"  {status} {request.method} {request.target}{detail}（{elapsed:.1f}ms）")
+                if not request.keep_alive or request.path == RELOAD_PATH:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def send_head(self, writer: asyncio.StreamWriter, status: int, headers: dict[str, str]):
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def send_error(self, writer: asyncio.StreamWriter, status: int,
+                         headers: dict[str, str] | None = None, request: Request | None = None) -> tuple[int, str]:
+        body = f"{status} {STATUS_TEXT[status]}\n".encode("utf-8")
+        self.send_head(writer, status, {
+            "Content-Type": "text/plain; charset=utf-8",
+            "Content-Length": str(len(body)),
+            **({"Connection": "close"} if request is None else {}),
+            **(headers or {}),
+        })
+        if request is None or request.method != "HEAD":
+            writer.write(body)
+        await writer.drain()
+        return status, ""
+
+    # ---- 応答 ----
+
+    def resolve(self, request: Request) -> Path | None:
+        """root 以下のパス（root の外なら None。NUL 文字を含むなどファイル名にならなければ ValueError）"""
+        path = (self.root / request.path.lstrip("/")).resolve()
+        if not path.is_relative_to(self.root):
+            return None
+        return path
+
+    async def respond(self, request: Request, writer: asyncio.StreamWriter) -> tuple[int, str]:
+        if request.method not in ("GET", "HEAD"):
+            return await self.send_error(writer, 405, {"Allow": "GET, HEAD"}, request)
+        if request.path == RELOAD_PATH and self.hub is not None:
+            await self.stream_reloads(writer)
+            return 200, ""
+
+        try:
+            path = self.resolve(request)
+        except ValueError:
+            return await self.send_error(writer, 400, request=request)
+        if path is None:
+            return await self.send_error(writer, 403, request=request)
+        try:
+            is_dir = path.is_dir()
+            if is_dir and request.path.endswith("/"):
+                path = path / "index.html"
+            found = path.is_file()
+        except OSError:
+            # 名前が長すぎるなど、stat できないパス
+            is_dir = found = False
+        if is_dir and not request.path.endswith("/"):
+            location = request.path + "/" + (f"?{request.query}" if request.query else "")
+            return await self.send_error(writer, 301, {"Location": location}, request)
+        if not found:
+            return await self.send_error(writer, 404, request=request)
+
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        headers = {
+            "Cache-Control": IMMUTABLE if request.versioned or FINGERPRINTED.search(path.name) else REVALIDATE,
+            "Accept-Ranges": "bytes",
+        }
+        detail = ""
+
+        # 派生画像があれば WebP を返す（Accept によって内容が変わる）
+        if path.suffix == ".png":
+            headers["Vary"] = "Accept"
+            variants = existing_variants(path, "webp")
+            if variants and request.accepts("accept", "image/webp"):
+                path = variants[-1][1]
+                content_type = "image/webp"
+                detail = " → webp"
+
+        stat = path.stat()
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        headers["ETag"] = etag
+        headers["Last-Modified"] = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        if content_type.startswith("text/") or content_type in ("application/json", "application/javascript"):
+            content_type += "; charset=utf-8"
+        headers["Content-Type"] = content_type
+
+        if self.not_modified(request, etag, stat.st_mtime):
+            self.send_head(writer, 304, {k: v for k, v in headers.items() if k != "Content-Type"})
+            await writer.drain()
+            return 304, detail
+
+        base_type = content_type.split(";")[0]
+        inject = self.hub is not None and base_type == "text/html"
+        compressible = base_type in COMPRESSIBLE_TYPES
+        if compressible:
+            headers["Vary"] = "Accept-Encoding"
+
+        # Range は圧縮しない本体に対して扱う
+        if "range" in request.headers and not inject and self.if_range_ok(request, etag, stat.st_mtime):
+            try:
+                byte_range = parse_range(request.headers["range"], stat.st_size)
+            except ValueError:
+                return await self.send_error(writer, 416, {"Content-Range": f"bytes */{stat.st_size}"}, request)
+            if byte_range is not None:
+                first, last = byte_range
+                headers["Content-Range"] = f"bytes {first}-{last}/{stat.st_size}"
+                await self.send_file(request, writer, 206, headers, path, first, last - first + 1)
+                return 206, f"{detail} bytes {first}-{last}"
+
+        if compressible and stat.st_size >= MIN_COMPRESS_BYTES:
+            for encoding in ENCODINGS:
+                if not request.accepts("accept-encoding", encoding):
+                    continue
+                precompressed = path.with_name(path.name + PRECOMPRESSED_SUFFIXES[encoding])
+                if not inject and self.is_fresh(precompressed, stat.st_mtime_ns):
+                    headers["Content-Encoding"] = encoding
+                    headers["ETag"] = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}-{encoding}"'
+                    size = precompressed.stat().st_size
+                    await self.send_file(request, writer, 200, headers, precompressed, 0, size)
+                    return 200, f"{detail} {encoding} {size // 1024}KB（事前圧縮）"
+                if can_compress(encoding):
+                    body = await self.compressed_body(path, stat.st_mtime_ns, encoding, inject)
+                    headers["Content-Encoding"] = encoding
+                    headers["ETag"] = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}-{encoding}"'
+                    await self.send_bytes(request, writer, headers, body)
+                    return 200, f"{detail} {encoding} {len(body) // 1024}KB"
+
+        if inject:
+            body = inject_reload(await asyncio.to_thread(path.read_bytes))
+            await self.send_bytes(request, writer, headers, body)
+            return 200, detail
+        await self.send_file(request, writer, 200, headers, path, 0, stat.st_size)
+        return 200, detail
+
+    @staticmethod
+    def not_modified(request: Request, etag: str, mtime: float) -> bool:
+        if "if-none-match" in request.headers:
+            # 圧縮版の ETag（"…-br" など）も同じ内容として扱う
+            tags = request.headers["if-none-match"]
+            return etag_matches(tags, etag) or any(
+                etag_matches(tags, f'{etag[:-1]}-{encoding}"') for encoding in ENCODINGS
+            )
+        since = request.headers.get("if-modified-since")
+        if since:
+            try:
+                return int(mtime) <= email.utils.parsedate_to_datetime(since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    @staticmethod
+    def if_range_ok(request: Request, etag: str, mtime: float) -> bool:
+        """If-Range が付いていれば、内容が変わっていないときだけ Range を使う"""
+        value = request.headers.get("if-range")
+        if value is None:
+            return True
+        if value.startswith(('"', "W/")):
+            return value == etag
+        try:
+            return int(mtime) <= email.utils.parsedate_to_datetime(value).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    @staticmethod
+    def is_fresh(path: Path, source_mtime_ns: int) -> bool:
+        try:
+            return path.stat().st_mtime_ns >= source_mtime_ns
+        except FileNotFoundError:
+            return False
+
+    async def compressed_body(self, path: Path, mtime_ns: int, encoding: str, inject: bool) -> bytes:
+        """圧縮した本体（ファイルが変わるまでメモリに保持する）"""
+        key = (path, mtime_ns, encoding, inject)
+        if key in self.compressed:
+            self.compressed.move_to_end(key)
+            return self.compressed[key]
+
+        def build() -> bytes:
+            data = path.read_bytes()
+            return compress(inject_reload(data) if inject else data, encoding)
+
+        body = await asyncio.to_thread(build)
+        self.compressed[key] = body
+        while len(self.compressed) > COMPRESS_CACHE_ENTRIES:
+            self.compressed.popitem(last=False)
+        return body
+
+    async def send_bytes(self, request: Request, writer: asyncio.StreamWriter,
+                         headers: dict[str, str], body: bytes):
+        headers["Content-Length"] = str(len(body))
+        self.send_head(writer, 200, headers)
+        if request.method == "GET":
+            writer.write(body)
+        await writer.drain()
+
+    async def send_file(self, request: Request, writer: asyncio.StreamWriter, status: int,
+                        headers: dict[str, str], path: Path, offset: int, count: int):
+        headers["Content-Length"] = str(count)
+        self.send_head(writer, status, headers)
+        await writer.drain()
+        if request.method == "GET" and count:
+            loop = asyncio.get_running_loop()
+            with open(path, "rb") as f:
+                await loop.sendfile(writer.transport, f, offset, count)
+
+    async def stream_reloads(self, writer: asyncio.StreamWriter):
+        """Server-Sent Events で変更された URL を送り続ける"""
+        self.send_head(writer, 200, {
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+        })
+        writer.write(b"retry: 1000\n\n")
+        await writer.drain()
+        queue: asyncio.Queue = asyncio.Queue()
+        self.hub.clients.add(queue)
+        try:
+            while True:
+                try:
+                    url = await asyncio.wait_for(queue.get(), KEEPALIVE_INTERVAL)
+                    writer.write(f"data: {url}\n\n".encode("utf-8"))
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                await writer.drain()
+        finally:
+            self.hub.clients.discard(queue)
+
+
+async def serve(args: argparse.Namespace):
+    server = PreviewServer(args.root, reload=not args.no_reload, quiet=args.quiet)
+    tcp = await asyncio.start_server(server.handle, args.host, args.port)
+    print(f"プレビュー: http://{args.host}:{args.port}/slide-viewer/（ルート: {args.root}）")
+    print(f"圧縮: {' / '.join(e for e in ENCODINGS if can_compress(e))}"
+          f"{'' if brotli else '（brotli は .br があるときだけ）'}")
+
+    tasks = []
+    if server.hub is not None:
+        tasks.append(asyncio.create_task(server.hub.run()))
+    if args.watch:
+        # watch.py を同じイベントループで動かし、マニフェストの更新をそのまま通知する
+        from watch import DEFAULT_DEBOUNCE, WatchDaemon
+        watch_args = argparse.Namespace(images=False, poll=False, debounce=DEFAULT_DEBOUNCE)
+        tasks.append(asyncio.create_task(WatchDaemon(watch_args).run()))
+    try:
+        async with tcp:
+            await tcp.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="docs/ をプレビューする HTTP サーバー")
+    parser.add_argument("--root", type=Path, default=ROOT, help=f"公開するディレクトリ（デフォルト: {ROOT}）")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--watch", action="store_true", help="src/*.md を監視してマニフェストを更新する")
+    parser.add_argument("--no-reload", action="store_true", help="変更時の自動再読み込みを無効にする")
+    parser.add_argument("-q", "--quiet", action="store_true", help="リクエストごとのログを出さない")
+    args = parser.parse_args()
+
+    if not args.root.is_dir():
+        print(f"❌ {args.root} が見つかりません")
+        sys.exit(1)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\nプレビューを終了しました")
+
+
+if __name__ == "__main__":
+    main()
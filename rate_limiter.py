@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+画像生成APIの適応型レートリミッター（全画像生成スクリプト共通）
+
+- トークンバケットでリクエスト数/分をクォータ内に抑える
+- 同時実行数は AIMD で調整（成功で +1/ウィンドウ、429 で半減）
+- 再試行可能なエラーはジッター付き指数バックオフで再試行する
+"""
+
+import asyncio
+import random
+import re
+import threading
+import time
+
+# デフォルト設定
+DEFAULT_RPM = 20
+DEFAULT_MAX_ATTEMPTS = 8
+BACKOFF_BASE = 2.0
+BACKOFF_CAP = 120.0
+
+# 再試行するHTTPステータスとAPIステータス
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_STATUSES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL"}
+THROTTLE_CODES = {429}
+
+
+class TokenBucket:
+    """リクエスト間隔を制御するトークンバケット（スレッドセーフ）"""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """トークンを1つ予約し、送信までに待つべき秒数を返す"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def pause(self, seconds: float):
+        """指定秒数ぶんトークンを差し引き、次の送信を遅らせる"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class AdaptiveLimiter:
+    """トークンバケット + AIMD による同時実行数制御"""
+
+    def __init__(self, requests_per_minute: float = DEFAULT_RPM,
+                 max_concurrency: int = 4, min_concurrency: int = 1):
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst=max(1, max_concurrency))
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.retries = 0
+        self.throttled = 0
+        self._cond: asyncio.Condition | None = None
+
+    @property
+    def concurrency(self) -> int:
+        return max(self.min_concurrency, int(self.limit))
+
+    def on_success(self):
+        """加算増加: limit 件成功するごとに同時実行数を +1"""
+        self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+
+    def on_throttle(self, delay: float = 0.0):
+        """乗算減少: 同時実行数を半減し、バケットを delay 秒止める"""
+        self.throttled += 1
+        self.limit = max(self.min_concurrency, self.limit / 2)
+        if delay > 0:
+            self.bucket.pause(delay)
+
+    async def __aenter__(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.concurrency)
+            self.in_flight += 1
+        try:
+            await asyncio.sleep(self.bucket.reserve())
+        except BaseException:
+            # 送信前に取り消されたら、__aexit__ は呼ばれないので枠をここで返す
+            await self._release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._release()
+
+    async def _release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+
+def is_retryable(error: Exception) -> bool:
+    """再試行すべきエラーか"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None)
+    status = getattr(error, "status", None)
+    return code in RETRYABLE_CODES or status in RETRYABLE_STATUSES
+
+
+def is_throttle(error: Exception) -> bool:
+    """クォータ超過（429 / RESOURCE_EXHAUSTED）か"""
+    return (getattr(error, "code", None) in THROTTLE_CODES
+            or getattr(error, "status", None) == "RESOURCE_EXHAUSTED")
+
+
+def retry_after(error: Exception) -> float | None:
+    """エラー詳細の RetryInfo.retryDelay（例: "32s"）を秒数で返す"""
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?([\d.]+)s", str(getattr(error, "details", "")))
+    return float(match.group(1)) if match else None
+
+
+def backoff_delay(attempt: int, error: Exception | None = None) -> float:
+    """フルジッター付き指数バックオフの待ち時間"""
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+    hinted = retry_after(error) if error is not None else None
+    return max(delay, hinted) if hinted else delay
+
+
+async def call_with_retry(limiter: AdaptiveLimiter, func, *args,
+                          max_attempts: int = DEFAULT_MAX_ATTEMPTS, label: str = "", **kwargs):
+    """リミッター経由で非同期関数を呼び、再試行可能なエラーはバックオフして再試行"""
+    for attempt in range(max_attempts):
+        try:
+            async with limiter:
+                result = await func(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e) or attempt == max_attempts - 1:
+                raise
+            delay = backoff_delay(attempt, e)
+            if is_throttle(e):
+                limiter.on_throttle(retry_after(e) or 0.0)
+            limiter.retries += 1
+            print(f"    ↻ 再試行 {attempt + 1}/{max_attempts - 1} ({delay:.1f}秒後, 同時実行数 {limiter.concurrency}) {label}: {e}")
+            await asyncio.sleep(delay)
+            continue
+        limiter.on_success()
+        return result
+
+
+def call_with_retry_sync(limiter: AdaptiveLimiter, func, *args,
+                         max_attempts: int = DEFAULT_MAX_ATTEMPTS, label: str = "", **kwargs):
+    """call_with_retry の同期版（逐次実行のスクリプト用）"""
+    for attempt in range(max_attempts):
+        time.sleep(limiter.bucket.reserve())
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e) or attempt == max_attempts - 1:
+                raise
+            delay = backoff_delay(attempt, e)
+            if is_throttle(e):
+                limiter.on_throttle(retry_after(e) or 0.0)
+            limiter.retries += 1
+            print(f"    ↻ 再試行 {attempt + 1}/{max_attempts - 1} ({delay:.1f}秒後) {label}: {e}")
+            time.sleep(delay)
+            continue
+        limiter.on_success()
+        return result
@@ -5,7 +5,9 @@
  *
  * 使い方:
  *   node scripts/check-slides.js overflow <file-or-dir>   # オーバーフロー検出
+ *   node scripts/check-slides.js overflow --json <file-or-dir>  # スライドごとの結果を JSON Lines で出力
  *   node scripts/check-slides.js links <dist-dir>          # リンク切れ検出
+ *   node scripts/check-slides.js serve [--pages N]         # 常駐モード（stdin/stdout で JSON をやり取り）
  *
  * 例:
  *   node scripts/check-slides.js overflow src/01-intro.md
@@ -17,6 +19,19 @@
  *   - Chromium
  *   - Microsoft Edge
  *   - Playwright Chromium (bunx playwright install chromium でインストール)
+ *
+ * 常駐モード:
+ *   ブラウザとページプールを起動したまま、1行1リクエストの JSON を受け付ける。
+ *   起動完了時に {"ready": true, ...} を1行出力する。
+ *   → {"id": 1, "files": ["src/01-intro.md", {"file": "x.md", "markdown": "..."}]}
+ *   ← {"id": 1, "results": [{"file": ..., "totalSlides": N, "overflows": [...], "report": [...]}, ...]}
+ *   stdin を閉じるとブラウザを終了する。ログは stderr に出力する。
+ *
+ * レポート形式（--json の各行、および results[].report の各要素）:
+ *   {"file": "src/01-intro.md", "slide": 5, "lines": [120, 148],
+ *    "overflowPx": 63, "overflowWidth": 0, "dataClass": "",
+ *    "boxes": [{"tag": "ul", "top": 96, "bottom": 783, "height": 687, "text": "..."}]}
+ *   lines はソース上の行範囲（1始まり、両端含む）。boxes はオーバーフローしたスライドの子要素の位置。
  */
 
 const fs = require('fs');
@@ -24,6 +39,9 @@ const fsp = require('fs').promises;
 const path = require('path');
 const { execSync } = require('child_process');
 const os = require('os');
+const readline = require('readline');
+
+const DEFAULT_PAGES = Math.max(1, Math.min(4, os.cpus().length));
 
 // ANSI カラーコード
 const colors = {
@@ -114,7 +132,8 @@ async function loadPuppeteer() {
   } catch (err) {
     log('puppeteer-core が見つかりません。インストールします...', 'yellow');
     try {
-      execSync('npm install --no-save puppeteer-core', { stdio: 'inherit' });
+      // 常駐モードでは stdout をプロトコルに使うので、出力は stderr に流す
+      execSync('npm install --no-save puppeteer-core', { stdio: ['inherit', 2, 2] });
       return require('puppeteer-core');
     } catch (installErr) {
       log('❌ puppeteer-core のインストールに失敗しました', 'red');
@@ -125,42 +144,189 @@ async function loadPuppeteer() {
 }
 
 /**
- * Marp CLI コマンドを検出
+ * Marp Core を読み込む（Marp CLI を毎回 npx で解決しないよう、同じプロセスで変換する）
  */
-function detectMarpCommand() {
-  // npx を使用（最も汎用的）
-  return 'npx --yes @marp-team/marp-cli';
+function loadMarp() {
+  try {
+    return require('@marp-team/marp-core').Marp;
+  } catch (err) {
+    log('❌ @marp-team/marp-core が見つかりません（npm install を実行してください）', 'red');
+    process.exit(1);
+  }
 }
 
 /**
- * 単一ファイルのオーバーフローをチェック
+ * 共有テーマ（カレントディレクトリの themes/*.css、fix-slides.py theme で作成）
  */
-async function checkOverflowSingle(markdownPath, browser) {
-  const tmpDir = await fsp.mkdtemp(path.join(os.tmpdir(), 'marp-check-'));
-  const tmpHtmlPath = path.join(tmpDir, 'output.html');
+let themeCache = null;
+function loadThemes() {
+  if (themeCache === null) {
+    const themeDir = path.resolve('themes');
+    themeCache = fs.existsSync(themeDir)
+      ? fs.readdirSync(themeDir).filter(f => f.endsWith('.css')).sort()
+        .map(f => fs.readFileSync(path.join(themeDir, f), 'utf-8'))
+      : [];
+  }
+  return themeCache;
+}
 
-  try {
-    const absoluteMarkdownPath = path.resolve(markdownPath);
-    const marpCommand = detectMarpCommand();
+/**
+ * Markdown を Marp で HTML に変換
+ */
+function renderMarkdown(Marp, markdown) {
+  const marp = new Marp({ html: true, script: false });
+  for (const css of loadThemes()) marp.themeSet.add(css);
+  const { html, css } = marp.render(markdown);
+  return `<!DOCTYPE html><html><head><meta charset="utf-8"><style>body{margin:0}${css}</style></head><body>${html}</body></html>`;
+}
+
+/**
+ * 各スライドのソース上の行範囲 [開始, 終了]（1始まり、両端含む。空のスライドも含む）
+ *
+ * slide_parser.py の slide_line_ranges() と同じ規則で区切る:
+ * フロントマター、コードフェンス（``` / ~~~ を3文字以上。閉じフェンスは同じ記号で同じ長さ以上、
+ * インデント可）、<style> ブロック、HTML コメントの中の --- は区切りとみなさない。
+ */
+function slideLineRanges(markdown) {
+  const lines = markdown.split('\n');
+  const ranges = [];
+  let fence = null;
+  let inComment = false;
+  let inStyle = false;
+  let inFrontMatter = false;
+  let start = 1;
+
+  lines.forEach((raw, index) => {
+    const lineno = index + 1;
+    let line = raw.replace(/\r+$/, '');
+
+    if (lineno === 1 && line.trim() === '---') {
+      inFrontMatter = true;
+      return;
+    }
+    if (inFrontMatter) {
+      if (line.trim() === '---') {
+        inFrontMatter = false;
+        start = lineno + 1;
+      }
+      return;
+    }
+
+    if (fence !== null) {
+      const stripped = line.trim();
+      if (stripped.startsWith(fence) && stripped.split(fence[0]).join('') === '') fence = null;
+      return;
+    }
+
+    if (inComment) {
+      const end = line.indexOf('-->');
+      if (end < 0) return;
+      inComment = false;
+      line = line.slice(end + 3);
+    }
+
+    if (inStyle) {
+      if (line.includes('</style>')) inStyle = false;
+      return;
+    }
+    if (line.trimStart().startsWith('<style')) {
+      inStyle = !line.includes('</style>');
+      return;
+    }
+
+    if (line.trim() === '---') {
+      ranges.push([start, lineno - 1]);
+      start = lineno + 1;
+      return;
+    }
+
+    const match = line.match(/^\s*(`{3,}|~{3,})/);
+    if (match) {
+      fence = match[1];
+      return;
+    }
 
-    // Marp CLI でビルド
+    // 閉じていないコメントは次の行へ持ち越す
+    while (line.includes('<!--')) {
+      const open = line.indexOf('<!--');
+      const close = line.indexOf('-->', open + 4);
+      if (close < 0) {
+        inComment = true;
+        break;
+      }
+      line = line.slice(0, open) + line.slice(close + 3);
+    }
+  });
+  ranges.push([start, lines.length]);
+  return ranges;
+}
+
+/**
+ * ブラウザのページを使い回すプール
+ */
+class PagePool {
+  constructor(browser, size) {
+    this.browser = browser;
+    this.size = size;
+    this.free = [];
+    this.waiters = [];
+  }
+
+  async init() {
+    for (let i = 0; i < this.size; i++) {
+      const page = await this.browser.newPage();
+      await page.setViewport({ width: 1280, height: 720 });
+      this.free.push(page);
+    }
+  }
+
+  acquire() {
+    if (this.free.length > 0) return Promise.resolve(this.free.pop());
+    return new Promise(resolve => this.waiters.push(resolve));
+  }
+
+  release(page) {
+    const waiter = this.waiters.shift();
+    if (waiter) waiter(page);
+    else this.free.push(page);
+  }
+
+  async run(fn) {
+    const page = await this.acquire();
     try {
-      execSync(
-        `${marpCommand} --no-stdin --html --allow-local-files "${absoluteMarkdownPath}" -o "${tmpHtmlPath}"`,
-        { stdio: 'pipe', encoding: 'utf-8' }
-      );
-    } catch (buildError) {
-      log(`❌ ビルドエラー: ${markdownPath}`, 'red');
-      return { file: markdownPath, error: buildError.message, overflows: [] };
+      return await fn(page);
+    } finally {
+      this.release(page);
     }
+  }
+}
+
+/**
+ * 単一ファイルのオーバーフローをチェック
+ *
+ * target はファイルパス、または {file, markdown}（保存前の内容を測る場合）
+ */
+async function checkOverflowSingle(target, pool, Marp) {
+  const file = typeof target === 'string' ? target : target.file;
 
-    const htmlContent = await fsp.readFile(tmpHtmlPath, 'utf-8');
+  let htmlContent;
+  let lineRanges;
+  try {
+    const markdown = typeof target === 'string' || target.markdown === undefined
+      ? await fsp.readFile(path.resolve(file), 'utf-8')
+      : target.markdown;
+    htmlContent = renderMarkdown(Marp, markdown);
+    lineRanges = slideLineRanges(markdown);
+  } catch (buildError) {
+    log(`❌ ビルドエラー: ${file}`, 'red');
+    return { file, error: buildError.message, overflows: [], report: [] };
+  }
 
-    const page = await browser.newPage();
-    await page.setViewport({ width: 1280, height: 720 });
-    await page.setContent(htmlContent, { waitUntil: 'networkidle0' });
+  const results = await pool.run(async page => {
+    await page.setContent(htmlContent, { waitUntil: 'load' });
+    await page.evaluate(() => document.fonts.ready);
 
-    const results = await page.evaluate(() => {
+    return page.evaluate(() => {
       const sections = Array.from(document.querySelectorAll('section'));
       return sections.map((section, index) => {
         const scrollHeight = section.scrollHeight;
@@ -172,6 +338,24 @@ async function checkOverflowSingle(markdownPath, browser) {
         const hasHorizontalOverflow = scrollWidth > clientWidth;
         const textContent = section.textContent.trim().substring(0, 50).replace(/\n/g, ' ');
 
+        // はみ出したスライドは、どの要素が下端を越えているか分かるよう子要素の位置を返す
+        let boxes = [];
+        if (hasVerticalOverflow || hasHorizontalOverflow) {
+          const origin = section.getBoundingClientRect().top - section.scrollTop;
+          boxes = Array.from(section.children)
+            .filter(el => !['STYLE', 'SCRIPT'].includes(el.tagName))
+            .map(el => {
+              const rect = el.getBoundingClientRect();
+              return {
+                tag: el.tagName.toLowerCase(),
+                top: Math.round(rect.top - origin),
+                bottom: Math.round(rect.bottom - origin),
+                height: Math.round(rect.height),
+                text: el.textContent.trim().substring(0, 30).replace(/\n/g, ' ')
+              };
+            });
+        }
+
         return {
           slideNumber: index + 1,
           hasOverflow: hasVerticalOverflow || hasHorizontalOverflow,
@@ -180,31 +364,66 @@ async function checkOverflowSingle(markdownPath, browser) {
           overflowHeight: scrollHeight - clientHeight,
           overflowWidth: scrollWidth - clientWidth,
           preview: textContent,
-          dataClass
+          dataClass,
+          boxes
         };
       });
     });
+  });
 
-    await page.close();
-
-    const overflows = results.filter(r => r.hasOverflow);
-    return {
-      file: markdownPath,
-      totalSlides: results.length,
-      overflows
-    };
+  const overflows = results.filter(r => r.hasOverflow);
+  const report = results.map(r => ({
+    file,
+    slide: r.slideNumber,
+    lines: lineRanges[r.slideNumber - 1] || null,
+    overflowPx: r.overflowHeight,
+    overflowWidth: r.overflowWidth,
+    dataClass: r.dataClass,
+    boxes: r.boxes
+  }));
+  return {
+    file,
+    totalSlides: results.length,
+    overflows,
+    report
+  };
+}
 
-  } finally {
-    try {
-      await fsp.rm(tmpDir, { recursive: true, force: true });
-    } catch (err) {}
+/**
+ * ブラウザを検出して起動
+ */
+async function launchBrowser() {
+  const browserInfo = detectInstalledBrowser();
+  if (!browserInfo) {
+    log('❌ 対応ブラウザが見つかりません', 'red');
+    log('以下のいずれかをインストールしてください:', 'yellow');
+    log('  - Google Chrome', 'yellow');
+    log('  - Chromium', 'yellow');
+    log('  - Microsoft Edge', 'yellow');
+    log('  - bunx playwright install chromium', 'yellow');
+    process.exit(1);
   }
+
+  log(`✓ ブラウザ: ${browserInfo.name}`, 'green');
+  log(`  パス: ${browserInfo.path}\n`, 'cyan');
+
+  const puppeteer = await loadPuppeteer();
+  const browser = await puppeteer.launch({
+    headless: 'new',
+    executablePath: browserInfo.path,
+    args: ['--no-sandbox', '--disable-setuid-sandbox']
+  });
+  return { browser, browserInfo };
 }
 
 /**
  * オーバーフローチェック（ファイルまたはディレクトリ）
  */
-async function checkOverflow(targetPath) {
+async function checkOverflow(targetPath, asJson = false) {
+  // --json のときは stdout をレポート専用にする
+  const writeReport = asJson ? process.stdout.write.bind(process.stdout) : null;
+  if (asJson) console.log = console.error;
+
   log(`${colors.bold}Marp Overflow Checker${colors.reset}\n`, 'cyan');
 
   const stat = await fsp.stat(targetPath);
@@ -224,36 +443,33 @@ async function checkOverflow(targetPath) {
     return;
   }
 
-  const browserInfo = detectInstalledBrowser();
-  if (!browserInfo) {
-    log('❌ 対応ブラウザが見つかりません', 'red');
-    log('以下のいずれかをインストールしてください:', 'yellow');
-    log('  - Google Chrome', 'yellow');
-    log('  - Chromium', 'yellow');
-    log('  - Microsoft Edge', 'yellow');
-    log('  - bunx playwright install chromium', 'yellow');
-    process.exit(1);
-  }
-
-  log(`✓ ブラウザ: ${browserInfo.name}`, 'green');
-  log(`  パス: ${browserInfo.path}\n`, 'cyan');
-
-  const puppeteer = await loadPuppeteer();
-  const browser = await puppeteer.launch({
-    headless: 'new',
-    executablePath: browserInfo.path,
-    args: ['--no-sandbox', '--disable-setuid-sandbox']
-  });
+  const Marp = loadMarp();
+  const { browser } = await launchBrowser();
+  const pool = new PagePool(browser, Math.min(DEFAULT_PAGES, files.length));
+  await pool.init();
 
   try {
     let totalSlides = 0;
     let totalOverflows = 0;
-    const allResults = [];
 
-    for (const file of files) {
+    // 全ファイルを並列に計測し、表示はファイル順に行う
+    const allResults = await Promise.all(files.map(file => checkOverflowSingle(file, pool, Marp)));
+
+    if (asJson) {
+      for (const result of allResults) {
+        if (result.error) {
+          writeReport(JSON.stringify({ file: result.file, error: result.error }) + '\n');
+        }
+        for (const record of result.report) {
+          writeReport(JSON.stringify(record) + '\n');
+        }
+      }
+      return;
+    }
+
+    for (const result of allResults) {
+      const file = result.file;
       log(`📄 ${path.basename(file)}`, 'blue');
-      const result = await checkOverflowSingle(file, browser);
-      allResults.push(result);
 
       if (result.error) {
         log(`   エラー: ${result.error}`, 'red');
@@ -343,14 +559,61 @@ async function checkLinks(distDir) {
   }
 }
 
+/**
+ * 常駐モード: stdin から1行ずつリクエストを読み、結果を stdout に1行で返す
+ */
+async function serve(pages) {
+  // stdout はプロトコル専用にする
+  console.log = console.error;
+  const write = obj => process.stdout.write(JSON.stringify(obj) + '\n');
+
+  const Marp = loadMarp();
+  const { browser, browserInfo } = await launchBrowser();
+  const pool = new PagePool(browser, pages);
+  await pool.init();
+  write({ ready: true, browser: browserInfo.name, pages });
+
+  const pending = new Set();
+  const rl = readline.createInterface({ input: process.stdin, terminal: false });
+
+  rl.on('line', line => {
+    if (!line.trim()) return;
+    let request;
+    try {
+      request = JSON.parse(line);
+    } catch (err) {
+      write({ id: null, error: `JSON を解析できません: ${err.message}` });
+      return;
+    }
+    const task = Promise.all((request.files || []).map(target => checkOverflowSingle(target, pool, Marp)))
+      .then(results => write({ id: request.id, results }))
+      .catch(err => write({ id: request.id, error: err.message }))
+      .finally(() => pending.delete(task));
+    pending.add(task);
+  });
+
+  await new Promise(resolve => rl.on('close', resolve));
+  await Promise.all(pending);
+  await browser.close();
+}
+
 // メイン処理
 async function main() {
   const args = process.argv.slice(2);
 
+  if (args[0] === 'serve') {
+    const index = args.indexOf('--pages');
+    const pages = index >= 0 ? parseInt(args[index + 1], 10) : DEFAULT_PAGES;
+    await serve(pages > 0 ? pages : DEFAULT_PAGES);
+    return;
+  }
+
   if (args.length < 2) {
     console.log(`使い方:
   node scripts/check-slides.js overflow <file-or-dir>   # オーバーフロー検出
+  node scripts/check-slides.js overflow --json <file-or-dir>  # JSON Lines で出力
   node scripts/check-slides.js links <dist-dir>          # リンク切れ検出
+  node scripts/check-slides.js serve [--pages N]         # 常駐モード
 
 例:
   node scripts/check-slides.js overflow src/01-intro.md
@@ -366,7 +629,8 @@ async function main() {
   }
 
   const command = args[0];
-  const target = args[1];
+  const asJson = args.includes('--json');
+  const target = args.slice(1).find(a => a !== '--json');
 
   if (!fs.existsSync(target)) {
     log(`❌ パスが見つかりません: ${target}`, 'red');
@@ -375,7 +639,7 @@ async function main() {
 
   switch (command) {
     case 'overflow':
-      await checkOverflow(target);
+      await checkOverflow(target, asJson);
       break;
     case 'links':
       await checkLinks(target);
@@ -386,7 +650,11 @@ async function main() {
   }
 }
 
-main().catch(err => {
-  console.error(err);
-  process.exit(1);
-});
+module.exports = { slideLineRanges };
+
+if (require.main === module) {
+  main().catch(err => {
+    console.error(err);
+    process.exit(1);
+  });
+}
@@ -4,7 +4,11 @@ Marp スライド修正スクリプト（汎用版）
 
 使い方:
   python fix-slides.py add-css <file-or-dir>       # 共通CSSを追加
-  python fix-slides.py auto-font <file-or-dir>     # オーバーフローに応じてフォントサイズ自動調整
+  python fix-slides.py theme <file-or-dir> [--force]  # 共通CSSを共有テーマ（themes/slides.css）に切り替え
+  python fix-slides.py auto-font <file-or-dir>...  # オーバーフローに応じてフォントサイズ自動調整
+  python fix-slides.py report <file-or-dir>        # スライドごとの計測結果を JSON Lines で出力
+
+  auto-font / report に --no-prescreen を付けると、推定による除外をせず全スライドをブラウザで計測する
   python fix-slides.py add-font-class <file> <slide-num> <class>  # 特定スライドにクラス追加
 
 例:
@@ -14,13 +18,21 @@ Marp スライド修正スクリプト（汎用版）
   python fix-slides.py add-font-class src/01-intro.md 5 font-small
 """
 
+import hashlib
+import math
+import os
 import subprocess
 import re
 import sys
 import json
+import unicodedata
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from slide_parser import FENCE_RE, slide_line_ranges  # noqa: E402
+
 # ========================================
 # CSS定義
 # ========================================
@@ -41,40 +53,40 @@ FONT_SIZE_CSS = """
     line-height: 1.4 !important;
   }
 
+  /* 大きめ（10行程度） */
   section[data-class~="font-small"] {
-    font-size: 20px !important;
-    line-height: 1.35 !important;
-    padding: 35px 50px !important;
-  }
-  section[data-class~="font-small"] h2 {
-    font-size: 32px !important;
+    font-size: 24px !important;
+    line-height: 1.3 !important;
   }
-  section[data-class~="font-small"] li {
-    margin-bottom: 0.15em !important;
+  section[data-class~="font-small"] h2, section[data-class~="font-small"] h3 {
+    font-size: 36px !important;
   }
 
+  /* 中程度（12-14行） */
   section[data-class~="font-xsmall"] {
-    font-size: 18px !important;
+    font-size: 21px !important;
     line-height: 1.25 !important;
-    padding: 30px 50px !important;
-  }
-  section[data-class~="font-xsmall"] h2 {
-    font-size: 28px !important;
   }
-  section[data-class~="font-xsmall"] li {
-    margin-bottom: 0.1em !important;
+  section[data-class~="font-xsmall"] h2, section[data-class~="font-xsmall"] h3 {
+    font-size: 32px !important;
   }
 
+  /* やや小さめ（15-17行） */
   section[data-class~="font-xxsmall"] {
-    font-size: 16px !important;
+    font-size: 18px !important;
     line-height: 1.2 !important;
-    padding: 25px 45px !important;
   }
-  section[data-class~="font-xxsmall"] h2 {
-    font-size: 24px !important;
+  section[data-class~="font-xxsmall"] h2, section[data-class~="font-xxsmall"] h3 {
+    font-size: 28px !important;
   }
-  section[data-class~="font-xxsmall"] li {
-    margin-bottom: 0.05em !important;
+
+  /* コンパクト（18行以上） */
+  section[data-class~="font-xxxsmall"] {
+    font-size: 16px !important;
+    line-height: 1.15 !important;
+  }
+  section[data-class~="font-xxxsmall"] h2, section[data-class~="font-xxxsmall"] h3 {
+    font-size: 24px !important;
   }
 """
 
@@ -182,6 +194,10 @@ def add_css_to_file(filepath: Path) -> bool:
     """ファイルにCSSを追加"""
     content = filepath.read_text(encoding='utf-8')
 
+    if front_matter_theme(content) == THEME_NAME:
+        print(f"  ✓ {filepath.name}: 共有テーマ（{THEME_PATH}）で提供済み")
+        return False
+
     # 既に追加済みかチェック
     if 'font-xxsmall' in content and '.highlight-box' in content:
         print(f"  ✓ {filepath.name}: 既に追加済み")
@@ -222,117 +238,847 @@ def add_css_to_file(filepath: Path) -> bool:
     return False
 
 
+# ========================================
+# 共有テーマ
+# ========================================
+
+# ALL_CSS を1つの Marp テーマにまとめ、各ファイルの <style> には差分だけを残す
+THEME_NAME = 'slides'
+THEME_PATH = Path('themes/slides.css')
+
+
+def build_theme_css() -> str:
+    """共有テーマの CSS（default テーマを拡張する）"""
+    return f"/* @theme {THEME_NAME} */\n\n@import 'default';\n{ALL_CSS}"
+
+
+def css_rules(css: str) -> List[Tuple[str, str]]:
+    """[(セレクタ, 宣言)]（空白を正規化し、コメントを除く）"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    return [
+        (' '.join(selector.split()), ' '.join(body.split()))
+        for selector, body in re.findall(r'([^{}]+)\{([^{}]*)\}', css)
+    ]
+
+
+def front_matter_theme(content: str) -> Optional[str]:
+    match = re.match(r'---\n(.*?)\n---', content, re.DOTALL)
+    if not match:
+        return None
+    theme = re.search(r'^theme:\s*(\S+)', match.group(1), re.MULTILINE)
+    return theme.group(1) if theme else None
+
+
+def set_front_matter_theme(content: str, name: str) -> str:
+    match = re.match(r'---\n(.*?)\n---', content, re.DOTALL)
+    if not match:
+        return f"---\nmarp: true\ntheme: {name}\n---\n\n{content}"
+    front = match.group(1)
+    if re.search(r'^theme:', front, re.MULTILINE):
+        front = re.sub(r'^theme:.*$', f'theme: {name}', front, count=1, flags=re.MULTILINE)
+    else:
+        front += f'\ntheme: {name}'
+    return f"---\n{front}\n---" + content[match.end():]
+
+
+def theme_css_for(content: str) -> str:
+    """ファイルが共有テーマを使っていればその CSS（計測キャッシュのキーに含める）"""
+    if front_matter_theme(content) == THEME_NAME and THEME_PATH.exists():
+        return THEME_PATH.read_text(encoding='utf-8')
+    return ''
+
+
+def strip_theme_rules(content: str) -> Tuple[str, int, List[str]]:
+    """<style> からテーマと同じルールを取り除く
+
+    (新しい内容, 削除したルール数, テーマと食い違うセレクタ) を返す。
+    同じセレクタの独自ルールより後ろにある重複は、上書きの順序が変わるので残す。
+    """
+    theme = dict(css_rules(ALL_CSS))
+    removed = 0
+    conflicts = []
+
+    def strip_block(match: re.Match) -> str:
+        nonlocal removed
+        attrs, css = match.group(1), match.group(2)
+        if 'scoped' in attrs:
+            return match.group(0)
+        kept_selectors = set()
+        parts = []
+        last = 0
+        for rule in re.finditer(r'([^{}]+)\{([^{}]*)\}', css):
+            selector = ' '.join(re.sub(r'/\*.*?\*/', '', rule.group(1), flags=re.DOTALL).split())
+            body = ' '.join(rule.group(2).split())
+            if theme.get(selector) == body and selector not in kept_selectors:
+                parts.append(css[last:rule.start()])
+                last = rule.end()
+                removed += 1
+                continue
+            if selector in theme:
+                conflicts.append(selector)
+            kept_selectors.add(selector)
+        parts.append(css[last:])
+        new_css = ''.join(parts)
+        if not re.sub(r'/\*.*?\*/', '', new_css, flags=re.DOTALL).strip():
+            return ''
+        return f"<style{attrs}>{new_css.rstrip()}\n</style>"
+
+    # コードブロック内の <style> は本文なので触らない
+    fences = code_fence_spans(content)
+    new_content = ''
+    last = 0
+    for match in re.finditer(r'<style([^>]*)>(.*?)</style>', content, flags=re.DOTALL):
+        if any(start <= match.start() < end for start, end in fences):
+            continue
+        new_content += content[last:match.start()]
+        replacement = strip_block(match)
+        last = match.end()
+        if not replacement:
+            # 消したブロックの前後の空行は1つにまとめる
+            blank = len(content[last:]) - len(content[last:].lstrip('\n'))
+            before = len(new_content) - len(new_content.rstrip('\n'))
+            replacement = '\n' * min(blank, max(0, 2 - before))
+            last += blank
+        new_content += replacement
+    new_content += content[last:]
+    return new_content, removed, conflicts
+
+
+def code_fence_spans(content: str) -> List[Tuple[int, int]]:
+    """コードブロック（フェンスの行を含む）の文字位置の範囲 [(開始, 終了)]
+
+    フェンスの規則は slide_parser と同じ（閉じフェンスは同じ記号で同じ長さ以上、インデント可）。
+    """
+    spans = []
+    fence = None
+    start = offset = 0
+    for line in content.splitlines(keepends=True):
+        stripped = line.strip()
+        if fence is None:
+            match = FENCE_RE.match(line)
+            if match:
+                fence = match.group(1)
+                start = offset
+        elif stripped.startswith(fence) and not stripped.lstrip(fence[0]):
+            fence = None
+            spans.append((start, offset + len(line)))
+        offset += len(line)
+    if fence is not None:
+        spans.append((start, offset))
+    return spans
+
+
+def write_theme() -> bool:
+    """共有テーマを書き出す（変わったときだけ）"""
+    css = build_theme_css()
+    if THEME_PATH.exists() and THEME_PATH.read_text(encoding='utf-8') == css:
+        return False
+    THEME_PATH.parent.mkdir(parents=True, exist_ok=True)
+    # ビルドではデッキごとに並列で呼ばれるので、書きかけのテーマを読まれないよう置き換える
+    tmp = THEME_PATH.with_name(f".{THEME_PATH.name}.{os.getpid()}.tmp")
+    tmp.write_text(css, encoding='utf-8')
+    os.replace(tmp, THEME_PATH)
+    return True
+
+
+def convert_to_theme(filepath: Path, force: bool = False) -> bool:
+    """ファイルを共有テーマに切り替え、重複した CSS を取り除く"""
+    content = filepath.read_text(encoding='utf-8')
+    new_content, removed, conflicts = strip_theme_rules(content)
+    if conflicts and not force:
+        # 独自の値で上書きしているクラスがあると、テーマの宣言（余白など）が加わって見た目が変わる
+        print(f"  ⚠️ {filepath.name}: テーマと異なるルールがあるため変換しません"
+              f"（{len(conflicts)} 件: {conflicts[0]} など。--force で変換）")
+        return False
+
+    new_content = set_front_matter_theme(new_content, THEME_NAME)
+    if new_content == content:
+        print(f"  - {filepath.name}: 変更なし")
+        return False
+    filepath.write_text(new_content, encoding='utf-8')
+    print(f"  ✓ {filepath.name}: theme: {THEME_NAME}（重複ルール {removed} 件を削除）")
+    return True
+
+
 # ========================================
 # オーバーフロー検出・自動修正
 # ========================================
 
-def get_overflow_info(filepath: Path) -> Dict[int, int]:
-    """check-slides.jsを使ってオーバーフロー情報を取得"""
-    script_dir = Path(__file__).parent
-    check_script = script_dir / 'check-slides.js'
+REPORT_CACHE_PATH = Path('.cache/overflow/report.json')
+REPORT_CACHE_VERSION = 1
+
+CLASS_DIRECTIVE = re.compile(r'<!--\s*_class:\s*(.*?)\s*-->')
+
 
+def split_slides(content: str) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """(全行, 各スライドの行範囲) を返す
+
+    行範囲は1始まり・両端を含み、空のスライドも含む。区切りの規則は slide_parser と同じ
+    （check-slides.js の slideLineRanges() も同じ規則）。
+    """
+    lines = content.split('\n')
+    return lines, slide_line_ranges(lines)
+
+
+def find_global_styles(content: str) -> List[str]:
+    """デッキ全体に効く <style> ブロック（scoped でないもの）"""
+    return [
+        m.group(0) for m in re.finditer(r'<style([^>]*)>.*?</style>', content, re.DOTALL)
+        if 'scoped' not in m.group(1)
+    ]
+
+
+class OverflowReportCache:
+    """スライドごとの計測結果のキャッシュ
+
+    キーはスライド本文と、全スライドの見た目に影響する部分
+    （フロントマターとグローバルな <style>）のハッシュ。
+    """
+
+    def __init__(self, path: Path = REPORT_CACHE_PATH):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        self.dirty = False
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+            if data.get('version') == REPORT_CACHE_VERSION:
+                self.entries = data.get('slides', {})
+        except (OSError, json.JSONDecodeError):
+            pass
+
+    @staticmethod
+    def key(context: str, slide_text: str) -> str:
+        return hashlib.sha256(f"{context}\0{slide_text}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.entries.get(key)
+
+    def put(self, key: str, record: dict):
+        self.entries[key] = {
+            k: record.get(k) for k in ('overflowPx', 'overflowWidth', 'dataClass', 'boxes')
+        }
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps({'version': REPORT_CACHE_VERSION, 'slides': self.entries}), encoding='utf-8')
+        tmp.replace(self.path)
+        self.dirty = False
+
+
+class OverflowChecker:
+    """check-slides.js serve を常駐させ、ブラウザを起動したまま計測する
+
+    最初の計測時に起動し、複数ファイルをまとめて1往復で計測する。
+    使い終わったら close()（または with 文）でブラウザを終了する。
+    """
+
+    def __init__(self, pages: Optional[int] = None):
+        self.pages = pages
+        self.proc: Optional[subprocess.Popen] = None
+        self.next_id = 0
+
+    def _start(self):
+        check_script = Path(__file__).parent / 'check-slides.js'
+        args = ['node', str(check_script), 'serve']
+        if self.pages:
+            args += ['--pages', str(self.pages)]
+        self.proc = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            bufsize=1,
+        )
+        ready = self._read()
+        if not ready.get('ready'):
+            self.close()
+            raise RuntimeError(f"オーバーフロー検出サービスを起動できません: {ready}")
+
+    def _read(self) -> dict:
+        line = self.proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"オーバーフロー検出サービスが終了しました (exit {self.proc.wait()})")
+        return json.loads(line)
+
+    def report(self, targets: List) -> List[List[dict]]:
+        """各ターゲット（パス、または {file, markdown}）のスライドごとのレポート"""
+        if self.proc is None:
+            self._start()
+        self.next_id += 1
+        request = {'id': self.next_id, 'files': targets}
+        self.proc.stdin.write(json.dumps(request, ensure_ascii=False) + '\n')
+        self.proc.stdin.flush()
+
+        response = self._read()
+        if response.get('error'):
+            raise RuntimeError(response['error'])
+
+        reports = []
+        for result in response['results']:
+            if result.get('error'):
+                raise OverflowCheckError(f"{Path(result['file']).name}: {result['error']}")
+            reports.append(result.get('report', []))
+        return reports
+
+    def close(self):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.stdin.close()
+            try:
+                self.proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class OverflowCheckError(RuntimeError):
+    """オーバーフローを計測できなかった（計測できないスライドを「収まる」とはみなさない）"""
+
+
+def run_overflow_report(filepath: Path) -> List[dict]:
+    """check-slides.js overflow --json でファイル全体を計測（1ファイルごとにブラウザを起動）"""
+    check_script = Path(__file__).parent / 'check-slides.js'
     try:
         result = subprocess.run(
-            ['node', str(check_script), 'overflow', str(filepath)],
+            ['node', str(check_script), 'overflow', '--json', str(filepath)],
             capture_output=True,
             text=True,
             timeout=120
         )
-        output = result.stdout + result.stderr
-    except Exception as e:
-        print(f"  ⚠️ オーバーフロー検出エラー: {e}")
-        return {}
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise OverflowCheckError(f"{filepath.name}: check-slides.js を実行できません: {e}") from e
+    if result.returncode != 0:
+        raise OverflowCheckError(
+            f"{filepath.name}: check-slides.js が失敗しました (exit {result.returncode})\n{(result.stdout + result.stderr).strip()[-2000:]}"
+        )
+
+    records = []
+    for line in result.stdout.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if record.get('error'):
+            raise OverflowCheckError(f"{filepath.name}: {record['error']}")
+        records.append(record)
+    return records
+
+
+# ========================================
+# オーバーフロー事前判定（ブラウザを使わない推定）
+# ========================================
+
+# Marp default テーマの値（おおよそ）
+SLIDE_WIDTH = 1280
+SLIDE_HEIGHT = 720
+DEFAULT_FONT_SIZE = 29
+DEFAULT_LINE_HEIGHT = 1.5
+DEFAULT_PADDING = (78.5, 78.5)  # 上下, 左右
+HEADING_SCALE = {1: 1.8, 2: 1.5, 3: 1.3, 4: 1.1, 5: 1.0, 6: 0.9}
+HEADING_LINE_HEIGHT = 1.25
+BLOCK_GAP = 0.55   # 段落・リスト・表の間隔（em）
+CODE_SCALE = 0.8
+
+# 推定の高さがこの割合以下なら、ブラウザで計測せず「収まる」とみなす
+PRESCREEN_RATIO = 0.7
+
+CJK_FONT_CANDIDATES = [
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/fonts-japanese-gothic.ttf',
+    '/usr/share/fonts/opentype/ipaexfont-gothic/ipaexg.ttf',
+    '/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc',
+    'C:/Windows/Fonts/YuGothM.ttc',
+    'C:/Windows/Fonts/meiryo.ttc',
+]
+
+# 推定できない内容（画像・図・スコープ付きスタイルなど）はブラウザで計測する
+UNSUPPORTED_CONTENT = re.compile(r'!\[|<img|<svg|<iframe|<table|<style\s+scoped|```mermaid', re.IGNORECASE)
+
+
+def find_cjk_font() -> Optional[str]:
+    """日本語フォントのパス（見つからなければ None）"""
+    for candidate in CJK_FONT_CANDIDATES:
+        if Path(candidate).exists():
+            return candidate
+    try:
+        result = subprocess.run(['fc-match', '-f', '%{file}', ':lang=ja'],
+                                capture_output=True, text=True, timeout=5)
+        if result.returncode == 0 and Path(result.stdout.strip()).exists():
+            return result.stdout.strip()
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+    return None
+
+
+class TextMeasurer:
+    """文字列の表示幅を測る
+
+    Pillow と日本語フォントがあればフォントのメトリクスを使い、
+    なければ全角 1em・半角 0.55em で近似する。
+    """
+
+    def __init__(self, font_path: Optional[str] = None):
+        self.font_path = font_path
+        self.fonts = {}
+        try:
+            from PIL import ImageFont
+            self.image_font = ImageFont
+        except ImportError:
+            self.image_font = None
+            self.font_path = None
+
+    def width(self, text: str, size: float) -> float:
+        if self.font_path:
+            key = round(size)
+            if key not in self.fonts:
+                self.fonts[key] = self.image_font.truetype(self.font_path, key)
+            return self.fonts[key].getlength(text) * size / key
+        return sum(size if unicodedata.east_asian_width(ch) in 'WF' else size * 0.55 for ch in text)
+
+    def line_count(self, text: str, size: float, width: float) -> int:
+        # 単語・禁則の折り返しで実際は少し早く折り返すので、幅を5%狭く見積もる
+        return max(1, math.ceil(self.width(text, size) / (width * 0.95)))
+
+
+def parse_css_rules(css: str) -> Dict[str, Dict[str, str]]:
+    """'section[data-class~="font-small"] h2' → {'font-size': '32px', ...}"""
+    rules: Dict[str, Dict[str, str]] = {}
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    for selectors, body in re.findall(r'([^{}]+)\{([^{}]*)\}', css):
+        props = dict(
+            (k.strip(), v.replace('!important', '').strip())
+            for k, v in (p.split(':', 1) for p in body.split(';') if ':' in p)
+        )
+        for selector in selectors.split(','):
+            rules.setdefault(' '.join(selector.split()), {}).update(props)
+    return rules
+
+
+def px(value: Optional[str], base: float) -> Optional[float]:
+    if not value:
+        return None
+    match = re.match(r'([\d.]+)(px|em)?', value)
+    if not match:
+        return None
+    number = float(match.group(1))
+    return number * base if match.group(2) == 'em' else number
+
+
+class OverflowEstimator:
+    """フォントのメトリクスと CSS からスライドの高さを推定する"""
+
+    def __init__(self, deck_css: str, measurer: TextMeasurer):
+        # 共有テーマ（add-css で入れる CSS と同じ）を既定値とし、デッキ側の <style> で上書きする
+        self.rules = parse_css_rules(FONT_SIZE_CSS + LAYOUT_CSS + deck_css)
+        self.measurer = measurer
+
+    def metrics(self, font_class: Optional[str]) -> dict:
+        section = dict(self.rules.get('section', {}))
+        headings = {}
+        if font_class:
+            selector = f'section[data-class~="{font_class}"]'
+            section.update(self.rules.get(selector, {}))
+            for level in range(1, 7):
+                rule = self.rules.get(f'{selector} h{level}', {})
+                if 'font-size' in rule:
+                    headings[level] = rule['font-size']
+
+        font_size = px(section.get('font-size'), DEFAULT_FONT_SIZE) or DEFAULT_FONT_SIZE
+        line_height = float(section['line-height']) if re.fullmatch(r'[\d.]+', section.get('line-height', '')) else DEFAULT_LINE_HEIGHT
+        padding = DEFAULT_PADDING
+        if section.get('padding'):
+            values = [px(v, font_size) or 0 for v in section['padding'].split()]
+            padding = (values[0], values[1] if len(values) > 1 else values[0])
+        return {
+            'font_size': font_size,
+            'line_height': line_height,
+            'padding': padding,
+            'headings': {
+                level: px(headings.get(level), font_size) or font_size * scale
+                for level, scale in HEADING_SCALE.items()
+            },
+        }
+
+    def estimate(self, slide_lines: List[str]) -> Optional[Tuple[float, float]]:
+        """(推定の内容の高さ, 使える高さ)。推定できない内容なら None"""
+        text = '\n'.join(slide_lines)
+        if UNSUPPORTED_CONTENT.search(text):
+            return None
+        directive = CLASS_DIRECTIVE.search(text)
+        classes = directive.group(1).split() if directive else []
+        m = self.metrics(next((c for c in classes if c.startswith('font-')), None))
+
+        base = m['font_size']
+        line = base * m['line_height']
+        pad_v, pad_h = m['padding']
+        full_width = SLIDE_WIDTH - pad_h * 2
+        width = full_width
+        height = 0.0
+        columns = 0
+        column_height = 0.0
+        in_code = False
+        in_comment = False
+        in_style = False
+        prev = None
+
+        # HTML コメント（ディレクティブ・ノート）を除く
+        for raw in re.sub(r'<!--.*?-->', '', text, flags=re.DOTALL).split('\n'):
+            stripped = raw.strip()
+            if in_style:
+                in_style = '</style>' not in stripped
+                continue
+            if stripped.startswith('<style'):
+                in_style = '</style>' not in stripped
+                continue
+            if stripped.startswith('```') or stripped.startswith('~~~'):
+                if not in_code:
+                    height += base * BLOCK_GAP + base  # pre の余白
+                in_code = not in_code
+                prev = 'code'
+                continue
+            if in_code:
+                height += base * CODE_SCALE * 1.45
+                continue
+
+            if re.match(r'<div[^>]*class="[^"]*columns-3', stripped):
+                columns, column_height, width = 3, height, (full_width - base * 2) / 3
+                continue
+            if re.match(r'<div[^>]*class="[^"]*columns', stripped):
+                columns, column_height, width = 2, height, (full_width - base * 1.5) / 2
+                continue
+            if stripped == '</div>' and columns:
+                # 列の高さはおおよそ均等になるとみなす
+                height = column_height + (height - column_height) / columns
+                columns, width = 0, full_width
+                continue
+            if not stripped or re.fullmatch(r'</?\w+[^>]*>', stripped):
+                prev = None
+                continue
+
+            content = re.sub(r'\[([^\]]*)\]\([^)]*\)', r'\1', stripped)
+            content = re.sub(r'<[^>]+>|\*\*|__|`', '', content)
+
+            heading = re.match(r'(#{1,6})\s+(.*)', content)
+            item = re.match(r'(\s*)(?:[-*+]|\d+[.)])\s+(.*)', re.sub(r'<[^>]+>|\*\*|__|`', '', raw))
+            if heading:
+                size = m['headings'][len(heading.group(1))]
+                height += size * 0.5 + self.measurer.line_count(heading.group(2), size, width) * size * HEADING_LINE_HEIGHT
+                prev = 'heading'
+            elif item:
+                depth = len(item.group(1).expandtabs(4)) // 2
+                indent = base * 1.5 * (depth + 1)
+                if prev != 'list':
+                    height += base * BLOCK_GAP
+                height += self.measurer.line_count(item.group(2), base, width - indent) * line
+                prev = 'list'
+            elif content.startswith('|'):
+                cells = [c.strip() for c in content.strip('|').split('|')]
+                if all(re.fullmatch(r':?-+:?', c) for c in cells if c):
+                    continue
+                cell_width = width / max(1, len(cells)) - 26
+                rows = max(self.measurer.line_count(c, base, cell_width) for c in cells)
+                if prev != 'table':
+                    height += base * BLOCK_GAP
+                height += rows * line + 13
+                prev = 'table'
+            else:
+                content = content.lstrip('> ')
+                if prev != 'paragraph':
+                    height += base * BLOCK_GAP
+                height += self.measurer.line_count(content, base, width) * line
+                prev = 'paragraph'
+
+        return height, SLIDE_HEIGHT - pad_v * 2
+
+
+def measure_overflows(files: List[Path], checker: Optional[OverflowChecker] = None,
+                      cache: Optional[OverflowReportCache] = None,
+                      prescreen: bool = False) -> Dict[Path, List[dict]]:
+    """各ファイルのスライドごとのレポートを返す
+
+    キャッシュにあるスライドは計測しない。一部のスライドだけ変わったファイルは、
+    フロントマター・<style> と変わったスライドだけのデッキを作って計測する。
+    prescreen=True なら、推定で十分収まるスライドもブラウザに送らない（estimated=True）。
+    """
+    if cache is None:
+        cache = OverflowReportCache()
+    measurer = TextMeasurer(find_cjk_font()) if prescreen else None
+
+    plans = {}
+    targets = {}
+    for path in files:
+        content = path.read_text(encoding='utf-8')
+        lines, ranges = split_slides(content)
+        header = lines[:ranges[0][0] - 1]
+        styles = find_global_styles(content)
+        context = '\n'.join(header + styles + [theme_css_for(content)])
+        keys = [cache.key(context, '\n'.join(lines[s - 1:e])) for s, e in ranges]
+        missing = [i for i, key in enumerate(keys) if cache.get(key) is None]
+
+        estimated = {}
+        if measurer is not None and missing:
+            estimator = OverflowEstimator('\n'.join(styles), measurer)
+            for i in missing:
+                result = estimator.estimate(lines[ranges[i][0] - 1:ranges[i][1]])
+                if result is not None and result[0] <= result[1] * PRESCREEN_RATIO:
+                    estimated[i] = {
+                        'overflowPx': round(result[0] - result[1]),
+                        'overflowWidth': 0,
+                        'dataClass': '',
+                        'boxes': [],
+                    }
+            missing = [i for i in missing if i not in estimated]
+
+        plans[path] = (ranges, keys, missing, estimated)
+        if not missing:
+            continue
+        if checker is not None and len(missing) < len(ranges):
+            slides = ['\n'.join(lines[ranges[i][0] - 1:ranges[i][1]]) for i in missing]
+            markdown = '\n'.join(header + styles) + '\n' + '\n---\n'.join(slides)
+            targets[path] = {'file': str(path), 'markdown': markdown}
+        else:
+            targets[path] = str(path)
+
+    measured: Dict[Path, List[dict]] = {}
+    if targets and checker is not None:
+        try:
+            measured = dict(zip(targets, checker.report(list(targets.values()))))
+        except (OSError, RuntimeError) as e:
+            print(f"⚠️ 常駐チェッカーを使えないため、ファイルごとに計測します: {e}\n")
+            targets = {path: str(path) for path in targets}
+    for path in targets:
+        if path not in measured:
+            measured[path] = run_overflow_report(path)
+
+    results = {}
+    for path, (ranges, keys, missing, estimated) in plans.items():
+        if path in measured:
+            partial = not isinstance(targets[path], str)
+            expected = missing if partial else list(range(len(ranges)))
+            records = measured[path]
+            if partial and len(records) != len(expected):
+                # 変更スライドだけの計測で区切りの解釈が食い違った場合は、ファイル全体を計測し直す
+                print(f"  ⚠️ {path.name}: スライド数が一致しないため、ファイル全体を計測し直します")
+                records = run_overflow_report(path)
+                expected = list(range(len(ranges)))
+            if len(records) != len(expected):
+                # それでも食い違う場合はキャッシュせず、ファイル全体の計測結果をそのまま使う
+                print(f"  ⚠️ {path.name}: スライド数が一致しないためキャッシュしません")
+                results[path] = [dict(r, cached=False, estimated=False) for r in records]
+                continue
+            for i, record in zip(expected, records):
+                cache.put(keys[i], record)
+
+        results[path] = []
+        for i, (start, end) in enumerate(ranges):
+            entry = cache.get(keys[i]) or estimated.get(i)
+            if entry is None:
+                continue
+            results[path].append({
+                'file': str(path),
+                'slide': i + 1,
+                'lines': [start, end],
+                **entry,
+                'cached': i not in missing and i not in estimated,
+                'estimated': i in estimated and cache.get(keys[i]) is None,
+            })
+    return results
+
+
+def overflow_px(report: List[dict]) -> Dict[int, int]:
+    """レポートから {スライド番号: オーバーフロー量(px)}"""
+    return {r['slide']: r['overflowPx'] for r in report if r['overflowPx'] > 0}
+
+
+def get_overflow_info(filepath: Path) -> Dict[int, int]:
+    """check-slides.jsを使ってオーバーフロー情報を取得"""
+    cache = OverflowReportCache()
+    with OverflowChecker() as checker:
+        report = measure_overflows([filepath], checker, cache)[filepath]
+    cache.save()
+    return overflow_px(report)
 
-    overflow_info = {}
-    lines = output.split('\n')
 
-    for i, line in enumerate(lines):
-        # "❌ スライド 5: 150px オーバー" のようなパターンを検出
-        match = re.search(r'スライド (\d+):\s*(\d+)px', line)
-        if match:
-            slide_num = int(match.group(1))
-            overflow_px = int(match.group(2))
-            overflow_info[slide_num] = overflow_px
+def font_class_metrics(css: str) -> Dict[str, Tuple[float, float]]:
+    """CSS で font-size を指定しているフォントクラスの {クラス: (font-size, line-height)}"""
+    metrics = {}
+    for selector, props in parse_css_rules(css).items():
+        match = re.fullmatch(r'section\[data-class~="(font-[\w-]+)"\]', selector)
+        size = px(props.get('font-size'), DEFAULT_FONT_SIZE)
+        if match and size:
+            line_height = props.get('line-height', '')
+            metrics[match.group(1)] = (size, float(line_height) if re.fullmatch(r'[\d.]+', line_height) else DEFAULT_LINE_HEIGHT)
+    return metrics
+
+
+FONT_CLASS_METRICS = font_class_metrics(FONT_SIZE_CSS)
+
+# 実際の font-size が大きい順のフォントクラス（修正時はこの順に1段ずつ小さくする）
+FONT_CLASS_LADDER = sorted(FONT_CLASS_METRICS, key=lambda c: -FONT_CLASS_METRICS[c][0])
+
+# オーバーフローの修正に最初に使う段（font-large などの大きいクラスは見出し用なので使わない）
+FIRST_FIX_CLASS = 'font-small'
+
+# 行送りの比だけ内容が縮むとみなしたうえで残す余裕（画像や余白は縮まない）
+FIT_MARGIN = 0.9
+
+# 計測と修正を繰り返す上限
+MAX_FIX_ROUNDS = 5
 
-    return overflow_info
 
 
 def determine_font_class(overflow_px: int) -> Optional[str]:
-    """オーバーフロー量に応じて適切なフォントクラスを決定"""
+    """オーバーフロー量に応じて適切なフォントクラスを決定（最初の1回の目安）
+
+    内容の高さは行送り（font-size × line-height）に比例するとみなし、
+    既定の行送りとの比で収まる最も大きいクラスを選ぶ（どれでも収まらなければ最小のクラス）。
+    """
     if overflow_px <= 0:
         return None
-    elif overflow_px < 50:
-        return 'font-small'
-    elif overflow_px < 150:
-        return 'font-xsmall'
-    else:
-        return 'font-xxsmall'
+    available = SLIDE_HEIGHT - 2 * DEFAULT_PADDING[0]
+    ratio = available / (available + overflow_px) * FIT_MARGIN
+    default_pitch = DEFAULT_FONT_SIZE * DEFAULT_LINE_HEIGHT
+    candidates = FONT_CLASS_LADDER[FONT_CLASS_LADDER.index(FIRST_FIX_CLASS):]
+    for font_class in candidates:
+        size, line_height = FONT_CLASS_METRICS[font_class]
+        if size * line_height / default_pitch <= ratio:
+            return font_class
+    return candidates[-1]
+
+
+def next_font_class(current: Optional[str], overflow_px: int) -> Optional[str]:
+    """まだはみ出しているスライドに次に試すクラス（これ以上小さくできなければ None）"""
+    if current is None:
+        return determine_font_class(overflow_px)
+    if current in FONT_CLASS_LADDER:
+        index = FONT_CLASS_LADDER.index(current)
+        if index + 1 < len(FONT_CLASS_LADDER):
+            return FONT_CLASS_LADDER[index + 1]
+    return None
 
 
-def apply_font_class_to_slide(filepath: Path, slide_num: int, font_class: str) -> bool:
-    """特定のスライドにフォントクラスを適用"""
-    content = filepath.read_text(encoding='utf-8')
-    lines = content.split('\n')
+def find_class_directive(lines: List[str], start: int, end: int) -> Optional[int]:
+    """スライド（行範囲は1始まり）内の <!-- _class: --> の行番号（0始まり）"""
+    for i in range(start - 1, min(end, len(lines))):
+        if CLASS_DIRECTIVE.search(lines[i]):
+            return i
+    return None
 
-    current_slide = 0
-    modified = False
-    new_lines = []
-    i = 0
-
-    while i < len(lines):
-        line = lines[i]
-
-        if line.strip() == '---':
-            current_slide += 1
-            new_lines.append(line)
-            i += 1
-
-            # 対象スライドの直後に処理
-            if current_slide == slide_num:
-                # 既存の<!-- _class: -->を探す
-                if i < len(lines) and '<!-- _class:' in lines[i]:
-                    # 既存のクラスを更新
-                    existing = lines[i]
-                    if font_class not in existing:
-                        # クラスを追加
-                        new_class = existing.replace('-->', f' {font_class} -->')
-                        new_lines.append(new_class)
-                        modified = True
-                    else:
-                        new_lines.append(existing)
-                    i += 1
-                else:
-                    # 新しいクラスディレクティブを挿入
-                    new_lines.append(f'<!-- _class: {font_class} -->')
-                    modified = True
-            continue
 
-        new_lines.append(line)
-        i += 1
+def current_font_class(lines: List[str], start: int, end: int) -> Optional[str]:
+    """スライドに付いているフォントクラス"""
+    i = find_class_directive(lines, start, end)
+    if i is None:
+        return None
+    classes = CLASS_DIRECTIVE.search(lines[i]).group(1).split()
+    return next((c for c in classes if c.startswith('font-')), None)
 
-    if modified:
-        filepath.write_text('\n'.join(new_lines), encoding='utf-8')
-        return True
-    return False
 
+def set_font_classes(content: str, font_classes: Dict[int, str]) -> str:
+    """{スライド番号: クラス} をまとめて適用した内容を返す
 
-def auto_fix_overflows(filepath: Path) -> int:
-    """オーバーフローを自動検出して修正"""
-    overflow_info = get_overflow_info(filepath)
+    既存のフォントクラスは置き換え、他のクラスは残す。
+    """
+    lines, ranges = split_slides(content)
+    # 行を挿入しても前のスライドの行番号がずれないよう、後ろから処理する
+    for slide_num in sorted(font_classes, reverse=True):
+        if not 1 <= slide_num <= len(ranges):
+            continue
+        start, end = ranges[slide_num - 1]
+        font_class = font_classes[slide_num]
+        i = find_class_directive(lines, start, end)
+        if i is None:
+            lines.insert(start - 1, f'<!-- _class: {font_class} -->')
+            continue
+        match = CLASS_DIRECTIVE.search(lines[i])
+        classes = [c for c in match.group(1).split() if not c.startswith('font-')]
+        directive = f"<!-- _class: {' '.join(classes + [font_class])} -->"
+        lines[i] = lines[i][:match.start()] + directive + lines[i][match.end():]
+    return '\n'.join(lines)
 
-    if not overflow_info:
-        print(f"  ✓ {filepath.name}: オーバーフローなし")
-        return 0
 
-    fixed = 0
-    for slide_num, overflow_px in sorted(overflow_info.items()):
-        font_class = determine_font_class(overflow_px)
-        if font_class:
-            if apply_font_class_to_slide(filepath, slide_num, font_class):
-                print(f"    スライド {slide_num}: {overflow_px}px → {font_class}")
-                fixed += 1
+def apply_font_class_to_slide(filepath: Path, slide_num: int, font_class: str) -> bool:
+    """特定のスライドにフォントクラスを適用"""
+    content = filepath.read_text(encoding='utf-8')
+    new_content = set_font_classes(content, {slide_num: font_class})
+    if new_content == content:
+        return False
+    filepath.write_text(new_content, encoding='utf-8')
+    return True
+
+
+def fix_overflows(files: List[Path], checker: Optional[OverflowChecker] = None,
+                  cache: Optional[OverflowReportCache] = None,
+                  max_rounds: int = MAX_FIX_ROUNDS,
+                  prescreen: bool = True) -> Dict[Path, Dict[int, str]]:
+    """はみ出しがなくなるまで「計測 → クラスを1段小さくする」を繰り返す
+
+    各ラウンドでファイルへの修正は1回の書き込みにまとめる。
+    修正したスライドだけが計測キャッシュから外れるので、次のラウンドではそのスライドだけ計測する。
+    戻り値は {ファイル: {スライド番号: 最終的に適用したクラス}}。
+    """
+    if cache is None:
+        cache = OverflowReportCache()
+    applied: Dict[Path, Dict[int, str]] = {f: {} for f in files}
+    given_up = set()
+    remaining = list(files)
+
+    for round_num in range(1, max_rounds + 1):
+        if not remaining:
+            break
+        reports = measure_overflows(remaining, checker, cache, prescreen)
+        records = [r for f in remaining for r in reports[f]]
+        measured = sum(not r['cached'] and not r['estimated'] for r in records)
+        skipped = sum(r['estimated'] for r in records)
+        print(f"ラウンド {round_num}: {measured} スライドを計測（推定で除外: {skipped}）")
+
+        still_overflowing = []
+        for f in remaining:
+            overflow_info = overflow_px(reports[f])
+            if not overflow_info:
+                continue
+            content = f.read_text(encoding='utf-8')
+            lines, ranges = split_slides(content)
+            changes = {}
+            for slide_num, px in sorted(overflow_info.items()):
+                if slide_num > len(ranges):
+                    continue
+                current = current_font_class(lines, *ranges[slide_num - 1])
+                font_class = next_font_class(current, px)
+                if font_class is None:
+                    if (f, slide_num) not in given_up:
+                        given_up.add((f, slide_num))
+                        print(f"  ⚠️ {f.name} スライド {slide_num}: {current} でも {px}px はみ出し（内容の削減・分割が必要）")
+                    continue
+                changes[slide_num] = font_class
+                print(f"  {f.name} スライド {slide_num}: {px}px → {font_class}")
+            if changes:
+                f.write_text(set_font_classes(content, changes), encoding='utf-8')
+                applied[f].update(changes)
+                still_overflowing.append(f)
+        remaining = still_overflowing
+        cache.save()
+    else:
+        if remaining:
+            print(f"  ⚠️ {max_rounds} ラウンドで収束しませんでした: {', '.join(f.name for f in remaining)}")
+
+    return applied
 
-    return fixed
+
+def auto_fix_overflows(filepath: Path, prescreen: bool = True) -> int:
+    """オーバーフローを自動検出して修正"""
+    with OverflowChecker() as checker:
+        return len(fix_overflows([filepath], checker, prescreen=prescreen)[filepath])
 
 
 # ========================================
@@ -358,30 +1104,61 @@ def cmd_add_css(target: str):
     print(f"\n✅ {updated}/{len(files)} ファイルを更新しました")
 
 
-def cmd_auto_font(target: str):
-    """オーバーフローに応じてフォントサイズを自動調整"""
+def cmd_theme(target: str, force: bool = False):
+    """共有テーマに切り替える"""
     print(f"\n{'='*50}")
-    print("オーバーフロー自動修正")
+    print("共有テーマへの切り替え")
     print(f"{'='*50}\n")
 
+    if write_theme():
+        print(f"✓ テーマを書き出しました: {THEME_PATH}\n")
+
     files = get_md_files(target)
+    updated = sum(convert_to_theme(f, force) for f in files)
+    print(f"\n✅ {updated}/{len(files)} ファイルを切り替えました")
+
+
+def cmd_auto_font(targets: List[str], prescreen: bool = True):
+    """オーバーフローに応じてフォントサイズを自動調整（複数のファイル・ディレクトリをまとめて計測する）"""
+    print(f"\n{'='*50}")
+    print("オーバーフロー自動修正")
+    print(f"{'='*50}\n")
+
+    files = [f for target in targets for f in get_md_files(target)]
     if not files:
         print("対象ファイルがありません")
         return
 
+    # ブラウザを1回だけ起動し、全ファイルをまとめてラウンドごとに計測する
+    with OverflowChecker() as checker:
+        applied = fix_overflows(files, checker, prescreen=prescreen)
+
+    print()
     total_fixed = 0
     for f in files:
-        print(f"📄 {f.name}")
-        fixed = auto_fix_overflows(f)
+        fixed = len(applied[f])
         total_fixed += fixed
         if fixed > 0:
-            print(f"  → {fixed} スライドを修正")
-        print()
+            print(f"📄 {f.name}: {fixed} スライドを修正")
+        else:
+            print(f"📄 {f.name}: 修正なし")
 
     print(f"{'='*50}")
     print(f"✅ 合計 {total_fixed} スライドを修正しました")
 
 
+def cmd_report(target: str, prescreen: bool = True):
+    """スライドごとの計測結果を JSON Lines で出力"""
+    files = get_md_files(target)
+    cache = OverflowReportCache()
+    with OverflowChecker() as checker:
+        reports = measure_overflows(files, checker, cache, prescreen)
+    cache.save()
+    for f in files:
+        for record in reports[f]:
+            print(json.dumps(record, ensure_ascii=False))
+
+
 def cmd_add_font_class(filepath: str, slide_num: int, font_class: str):
     """特定スライドにフォントクラスを追加"""
     path = Path(filepath)
@@ -405,11 +1182,30 @@ def main():
         sys.exit(1)
 
     command = sys.argv[1]
+    # --no-prescreen: 推定による除外をせず、全スライドをブラウザで計測する
+    prescreen = '--no-prescreen' not in sys.argv
+    if not prescreen:
+        sys.argv.remove('--no-prescreen')
+
+    try:
+        run_command(command, prescreen)
+    except OverflowCheckError as e:
+        # 計測できなかったときは「はみ出しなし」とせず失敗として終了する（build.py がノードを失敗にする）
+        print(f"❌ オーバーフローを計測できませんでした: {e}")
+        sys.exit(1)
+
 
+def run_command(command: str, prescreen: bool):
+    """コマンドを実行する"""
     if command == 'add-css':
         cmd_add_css(sys.argv[2])
     elif command == 'auto-font':
-        cmd_auto_font(sys.argv[2])
+        cmd_auto_font(sys.argv[2:], prescreen)
+    elif command == 'theme':
+        force = '--force' in sys.argv
+        cmd_theme(next(a for a in sys.argv[2:] if a != '--force'), force)
+    elif command == 'report':
+        cmd_report(sys.argv[2], prescreen)
     elif command == 'add-font-class':
         if len(sys.argv) < 5:
             print("使い方: python fix-slides.py add-font-class <file> <slide-num> <class>")
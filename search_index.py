@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+スライドビューア用の全文検索インデックス
+
+タイトルとスピーカーノート（本文を変換したものとノートコメント）を正規化し、
+文字バイグラムの転置インデックスをセクションごとに作る。日本語は分かち書きせずに
+バイグラムで引き、英数字も同じ規則で扱うので、単語の途中からでも検索できる。
+
+  {"version": 1, "terms": {"受入": [位置, 重み, 位置, 重み, ...], ...}}
+
+位置はセクション内のスライドの並び（manifest/<name>.json と同じ順）。
+クエリのバイグラムをすべて含むスライドを、重みの合計が大きい順に返す。
+ビューアは同じ正規化・分割を JavaScript で行い、検索を始めたときにインデックスを読み込む。
+
+使い方:
+  python search_index.py 受入基準   # 書き出し済みのインデックスで検索する
+"""
+
+import argparse
+import json
+import re
+import unicodedata
+
+INDEX_VERSION = 1
+
+# フィールドごとの重み（1回出現するごとに加算）
+TITLE_WEIGHT = 10
+NOTES_WEIGHT = 1
+
+# 文字と数字の並び（記号・空白・Markdown の記法で区切る。ビューアの /[\p{L}\p{N}]+/gu と同じ）
+WORD_RE = re.compile(r"[^\W_]+")
+
+
+def normalize(text: str) -> str:
+    """全角英数・半角カナなどを揃えて小文字にする"""
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def terms(text: str) -> list[str]:
+    """文字バイグラムの列（1文字だけの並びはその1文字）"""
+    result = []
+    for word in WORD_RE.findall(normalize(text)):
+        if len(word) == 1:
+            result.append(word)
+        else:
+            result.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return result
+
+
+def build_section_index(documents: list[tuple[str, str]]) -> dict:
+    """[(タイトル, ノート)] からセクションの転置インデックスを作る"""
+    postings: dict[str, dict[int, int]] = {}
+    for position, (title, notes) in enumerate(documents):
+        for weight, text in ((TITLE_WEIGHT, title), (NOTES_WEIGHT, notes)):
+            for term in terms(text):
+                slides = postings.setdefault(term, {})
+                slides[position] = slides.get(position, 0) + weight
+    return {
+        "version": INDEX_VERSION,
+        "terms": {
+            term: [value for item in sorted(slides.items()) for value in item]
+            for term, slides in sorted(postings.items())
+        },
+    }
+
+
+def postings(index: dict, term: str) -> dict[int, int]:
+    """語を含むスライド {位置: 重み}"""
+    if len(term) > 1:
+        flat = index["terms"].get(term, [])
+        return dict(zip(flat[::2], flat[1::2]))
+    # 1文字の語は、その文字を含むバイグラムをまとめて引く
+    found: dict[int, int] = {}
+    for key, flat in index["terms"].items():
+        if term in key:
+            for position, weight in zip(flat[::2], flat[1::2]):
+                found[position] = found.get(position, 0) + weight
+    return found
+
+
+def search(index: dict, query: str) -> list[tuple[int, int]]:
+    """クエリのバイグラムをすべて含むスライド [(位置, スコア)]（スコアの高い順）"""
+    wanted = set(terms(query))
+    if not wanted:
+        return []
+    scores: dict[int, int] | None = None
+    for term in wanted:
+        found = postings(index, term)
+        if not found:
+            return []
+        if scores is None:
+            scores = found
+        else:
+            scores = {pos: score + found[pos] for pos, score in scores.items() if pos in found}
+        if not scores:
+            return []
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def main():
+    from slide_manifest import MANIFEST_PATH, SHARD_DIR
+
+    parser = argparse.ArgumentParser(description="書き出し済みの検索インデックスでスライドを検索する")
+    parser.add_argument("query", help="検索語")
+    args = parser.parse_args()
+
+    index = json.loads((SHARD_DIR / "index.json").read_text(encoding="utf-8"))
+    hits = []
+    for section in index["sections"]:
+        if "search" not in section:
+            continue
+        path = MANIFEST_PATH.parent / section["search"].split("?")[0]
+        for position, score in search(json.loads(path.read_text(encoding="utf-8")), args.query):
+            hits.append((score, section["name"], section["slides"][position]))
+    for score, name, slide in sorted(hits, key=lambda hit: -hit[0]):
+        print(f"  {name} [{slide['index']:3d}] {slide['title']}（スコア {score}）")
+    print(f"\n{len(hits)} 件")
+
+
+if __name__ == "__main__":
+    main()
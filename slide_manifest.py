@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+スライドビューア用 manifest.json の組み立て（全スクリプト共通）
+
+ノートは解析キャッシュを使って変更されたスライドだけ作り直し、
+画像生成の状態（done / failed / pending）は呼び出し側から受け取るか、
+既存のマニフェストから引き継ぐ。WebP / AVIF の派生画像・スプライト・LQIP があればあわせて載せる。
+
+画像の URL には内容ハッシュを ?v= で付け、スライドごとのハッシュを hash に記録する。
+画像を作り直すと URL が変わるので、マニフェスト以外はブラウザに永続的にキャッシュさせてよい。
+
+ビューアはマニフェスト全体ではなく、分割したファイルを必要になったときに読み込む。
+  manifest/index.json          セクション・スライド数・目次用のタイトル（最初に読む）
+  manifest/<name>.json         セクションのスライド（画像 URL など。ノートは含まない）
+  manifest/<name>.notes.json   セクションのスピーカーノート（ノートを開いたときに読む）
+  manifest/<name>.search.json  セクションの全文検索インデックス（検索を始めたときに読む）
+分割ファイルの URL にも内容ハッシュを付けるので、毎回再検証するのは index.json だけでよい。
+manifest.json は画像生成の状態の引き継ぎやスクリプト用に、全体をそのまま書き出す。
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+from atomic_io import write_text_atomic
+from decks import FILES
+from image_variants import VIEWER_DIR, content_hash, manifest_fields, save_hashes, sprite_fields
+from notes_renderer import RENDERER_VERSION, render_notes
+from parse_cache import ParseCache
+from search_index import build_section_index
+
+MANIFEST_PATH = Path("docs/slide-viewer/manifest.json")
+SHARD_DIR = MANIFEST_PATH.parent / "manifest"
+INDEX_VERSION = 1
+
+# 目次を描くために index.json に載せるスライドの項目
+INDEX_FIELDS = ("index", "title", "is_section", "sprite_position")
+
+# 解析キャッシュ上のステージ名（変換ルールが変わったら全スライドを作り直す）
+NOTES_STAGE = f"notes-v{RENDERER_VERSION}"
+
+# ビューアに載せないスライド
+# 今日の学習内容、3つのセッション、AI駆動開発で大切なこと(1/2)(2/2)、質問タイム
+REMOVED_TITLES = [
+    "今日の学習内容",
+    "3つのセッション",
+    "AI駆動開発で大切なこと（1/2）",
+    "AI駆動開発で大切なこと（2/2）",
+    "質問タイム"
+]
+
+
+def slide_id(name: str, index: int) -> str:
+    """スライドID（例: 01-intro/003）"""
+    return f"{name}/{index:03d}"
+
+
+def image_path(name: str, index: int) -> str:
+    """マニフェスト上の画像パス"""
+    return f"images/{name}/slide_{index:03d}.png"
+
+
+def image_fields(image: str) -> dict:
+    """image（内容ハッシュ付きの URL）と hash（画像がまだなければハッシュなし）"""
+    try:
+        digest = content_hash(VIEWER_DIR / image)
+    except FileNotFoundError:
+        return {"image": image}
+    return {"image": f"{image}?v={digest}", "hash": digest}
+
+
+def update_notes(cache: ParseCache, src: str) -> tuple[dict[int, str], int]:
+    """変更されたスライドのノートだけ作り直し、(全ノート, 更新数) を返す"""
+    changed = {slide.index: render_notes(slide) for slide in cache.changed(src, NOTES_STAGE)}
+    if changed:
+        cache.record(src, NOTES_STAGE, changed)
+    return cache.results(src, NOTES_STAGE), len(changed)
+
+
+def load_statuses(path: Path = MANIFEST_PATH) -> dict[str, str]:
+    """既存マニフェストの画像生成状態 {スライドID: 状態}"""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return {
+        slide_id(section["name"], slide["index"]): slide["status"]
+        for section in data
+        for slide in section["slides"]
+        if "status" in slide
+    }
+
+
+def build_manifest(cache: ParseCache, statuses: dict[str, str] | None = None,
+                   verbose: bool = True) -> list[dict]:
+    """全デッキのマニフェストを組み立てる"""
+    if statuses is None:
+        statuses = load_statuses()
+
+    all_slides_data = []
+    for file_info in FILES:
+        name = file_info["name"]
+        slides = cache.slides(file_info["src"])
+        notes, updated = update_notes(cache, file_info["src"])
+        if verbose:
+            print(f"  {name}: スライド数 {len(slides)}（ノート更新: {updated}）")
+
+        file_slides = []
+        documents = []
+        for slide in slides:
+            if slide.title in REMOVED_TITLES:
+                continue
+            image = image_path(name, slide.index)
+            entry = {
+                "index": slide.index,
+                "title": slide.title,
+                **image_fields(image),
+                **manifest_fields(image),
+                "is_section": slide.is_section,
+                "notes": notes[slide.index]
+            }
+            status = statuses.get(slide_id(name, slide.index))
+            if status is not None:
+                entry["status"] = status
+            file_slides.append(entry)
+            documents.append((slide.title, notes[slide.index]))
+
+        all_slides_data.append({
+            "name": name,
+            "title": file_info["title"],
+            **sprite_fields(name),
+            "slides": file_slides,
+            "search": build_section_index(documents),
+        })
+
+    return all_slides_data
+
+
+def compact_json(data) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def shard_manifest(data: list[dict], shard_dir: Path = SHARD_DIR) -> dict[Path, str]:
+    """ビューア用の分割ファイル {パス: 内容}（index.json と、セクションごとのスライド・ノート）"""
+    base = shard_dir.name
+    files = {}
+    sections = []
+    for section in data:
+        name = section["name"]
+        slides = [{k: v for k, v in slide.items() if k != "notes"} for slide in section["slides"]]
+        notes = [slide.get("notes", "") for slide in section["slides"]]
+        shard = compact_json(slides)
+        notes_shard = compact_json(notes)
+        files[shard_dir / f"{name}.json"] = shard
+        files[shard_dir / f"{name}.notes.json"] = notes_shard
+        urls = {
+            "shard": f"{base}/{name}.json?v={text_hash(shard)}",
+            "notes": f"{base}/{name}.notes.json?v={text_hash(notes_shard)}",
+        }
+        if "search" in section:
+            search_shard = compact_json(section["search"])
+            files[shard_dir / f"{name}.search.json"] = search_shard
+            urls["search"] = f"{base}/{name}.search.json?v={text_hash(search_shard)}"
+        sections.append({
+            **{k: v for k, v in section.items() if k not in ("slides", "search")},
+            "count": len(slides),
+            **urls,
+            "slides": [{k: slide[k] for k in INDEX_FIELDS if k in slide} for slide in slides],
+        })
+    files[shard_dir / "index.json"] = compact_json({"version": INDEX_VERSION, "sections": sections})
+    return files
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def write_if_changed(path: Path, text: str) -> bool:
+    if path.exists() and path.read_text(encoding="utf-8") == text:
+        return False
+    write_text_atomic(path, text)
+    return True
+
+
+def write_manifest(data: list[dict], path: Path = MANIFEST_PATH) -> bool:
+    """manifest.json と分割ファイルを、内容が変わったものだけアトミックに書き込む（書き込んだら True）"""
+    # 検索インデックスは分割ファイルにだけ書き出す
+    full = [{k: v for k, v in section.items() if k != "search"} for section in data]
+    changed = write_if_changed(path, json.dumps(full, ensure_ascii=False, indent=2))
+
+    shard_dir = path.parent / SHARD_DIR.name
+    files = shard_manifest(data, shard_dir)
+    # 分割ファイルを先に書き、参照する index.json を最後に差し替える
+    index_path = shard_dir / "index.json"
+    for shard_path, text in sorted(files.items(), key=lambda item: item[0] == index_path):
+        changed |= write_if_changed(shard_path, text)
+
+    # なくなったセクションの分割ファイルを消す
+    for stale in shard_dir.glob("*.json"):
+        if stale not in files:
+            stale.unlink()
+            changed = True
+    # マニフェストを作るときに計算した画像の内容ハッシュを次のビルドに残す
+    save_hashes()
+    return changed
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Marp Markdown のスライドパーサー（全スクリプト共通）
+
+ファイルを先頭から1行ずつ1回だけ走査し、スライドを順に返す。
+- フロントマター、<style> ブロックを読み飛ばす
+- コードブロック内の `---` やコメントはそのまま本文として扱う
+- `<!-- _class: ... -->` などのディレクティブと、`<!-- notes: ... -->` のノートを分けて保持する
+  （どちらでもないコメントは捨てる）
+"""
+
+import re
+from pathlib import Path
+from typing import Iterable, Iterator
+
+# Marp のディレクティブ名（先頭の "_" はそのスライドだけに適用するスコープ指定）
+DIRECTIVES = {
+    "theme", "style", "headingDivider", "size", "math", "title", "description",
+    "author", "image", "keywords", "url", "marp", "lang",
+    "paginate", "header", "footer", "class", "backgroundColor", "backgroundImage",
+    "backgroundPosition", "backgroundRepeat", "backgroundSize", "color", "transition",
+}
+
+HEADING_RE = re.compile(r"^#{1,3}\s+(.+)$")
+SECTION_RE = re.compile(r"^#{1,2}\s+")
+DIRECTIVE_LINE_RE = re.compile(r"^\s*(_?[A-Za-z]+)\s*:\s*(.*?)\s*$")
+FENCE_RE = re.compile(r"^\s*(`{3,}|~{3,})")
+# スピーカーノートの目印（<!-- notes: ... -->、<!-- ノート: ... -->、または目印の次の行から本文）
+NOTES_RE = re.compile(r"^\s*(?:notes?|ノート)\s*?(?:[:：]|\n|$)", re.IGNORECASE)
+
+
+class Slide:
+    """1枚のスライド"""
+
+    __slots__ = (
+        "index", "page", "title", "body", "directives", "notes",
+        "start_line", "end_line", "is_section",
+    )
+
+    def __init__(self, index: int, page: int, title: str, body: str,
+                 directives: dict[str, str], notes: list[str],
+                 start_line: int, end_line: int, is_section: bool):
+        self.index = index            # 空でないスライドの通し番号（1始まり）
+        self.page = page              # Marp 上のページ番号（空スライドも数える）
+        self.title = title
+        self.body = body              # コメントを除いた本文
+        self.directives = directives  # {"_class": "font-small", ...}
+        self.notes = notes            # ノートのコメント（目印を除いた本文）
+        self.start_line = start_line  # ソース上の行範囲（1始まり、両端含む）
+        self.end_line = end_line
+        self.is_section = is_section
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Slide":
+        return cls(**{name: data[name] for name in cls.__slots__})
+
+    def __repr__(self) -> str:
+        return f"Slide({self.index}, {self.title!r}, lines {self.start_line}-{self.end_line})"
+
+
+def parse_comment(text: str) -> dict[str, str] | None:
+    """コメント本文がディレクティブなら {名前: 値} を返す（ノートなら None）"""
+    directives = {}
+    for line in text.strip().splitlines():
+        if not line.strip():
+            continue
+        match = DIRECTIVE_LINE_RE.match(line)
+        if not match or match.group(1).lstrip("_") not in DIRECTIVES:
+            return None
+        directives[match.group(1)] = match.group(2)
+    return directives or None
+
+
+def parse_note(text: str) -> str | None:
+    """コメント本文がノートなら目印を除いた本文を返す（ノートでなければ None）"""
+    match = NOTES_RE.match(text)
+    if match is None:
+        return None
+    return text[match.end():].strip()
+
+
+def iter_slides_lines(lines: Iterable[str]) -> Iterator[Slide]:
+    """行のイテラブルからスライドを1パスで抽出する"""
+    index = 0
+    for page, start_line, end_line, body, directives, notes, title in _iter_pages(lines):
+        text = "\n".join(body).strip()
+        if not text:
+            continue
+        index += 1
+        is_section = bool(SECTION_RE.match(text)) and text.count("\n") + 1 < 5
+        yield Slide(index, page, title or f"スライド {index}", text,
+                    directives, notes, start_line, end_line, is_section)
+
+
+def slide_line_ranges(lines: Iterable[str]) -> list[tuple[int, int]]:
+    """Marp の各ページのソース上の行範囲 [(開始, 終了)]（1始まり、両端含む。空のページも含む）
+
+    check-slides.js の slideLineRanges() は同じ規則で区切る。
+    """
+    return [(start, end) for _, start, end, *_ in _iter_pages(lines)]
+
+
+def _iter_pages(lines: Iterable[str]) -> Iterator[tuple]:
+    """空のページも含め、(ページ番号, 開始行, 終了行, 本文の行, ディレクティブ, ノート, タイトル) を順に返す"""
+    body: list[str] = []
+    directives: dict[str, str] = {}
+    notes: list[str] = []
+    title = None
+    fence = None          # 開いているコードフェンスの記号（``` / ~~~ / ```` など）
+    comment: list[str] | None = None  # 複数行コメントの途中
+    in_style = False
+    in_front_matter = False
+    start_line = 1
+    page = 1
+    lineno = 0
+
+    def take_comment(text: str):
+        parsed = parse_comment(text)
+        if parsed is not None:
+            directives.update(parsed)
+            return
+        note = parse_note(text)
+        if note:
+            notes.append(note)
+
+    for lineno, raw in enumerate(lines, 1):
+        line = raw.rstrip("\r\n")
+
+        # フロントマター
+        if lineno == 1 and line.strip() == "---":
+            in_front_matter = True
+            continue
+        if in_front_matter:
+            if line.strip() == "---":
+                in_front_matter = False
+                start_line = lineno + 1
+            continue
+
+        # コードブロック内はそのまま本文に入れる
+        if fence is not None:
+            body.append(line)
+            if line.strip().startswith(fence) and not line.strip().lstrip(fence[0]):
+                fence = None
+            continue
+
+        # 複数行コメントの続き
+        if comment is not None:
+            end = line.find("-->")
+            if end < 0:
+                comment.append(line)
+                continue
+            comment.append(line[:end])
+            text = "\n".join(comment)
+            comment = None
+            take_comment(text)
+            line = line[end + 3:]
+
+        # <style> ブロック
+        if in_style:
+            if "</style>" in line:
+                in_style = False
+            continue
+        if line.lstrip().startswith("<style"):
+            in_style = "</style>" not in line
+            continue
+
+        # スライド区切り
+        if line.strip() == "---":
+            yield page, start_line, lineno - 1, body, directives, notes, title
+            body, directives, notes, title = [], {}, [], None
+            start_line = lineno + 1
+            page += 1
+            continue
+
+        match = FENCE_RE.match(line)
+        if match:
+            fence = match.group(1)
+            body.append(line)
+            continue
+
+        # 行内のコメントを取り除く（閉じていなければ次の行へ持ち越す）
+        while "<!--" in line:
+            start = line.index("<!--")
+            end = line.find("-->", start + 4)
+            if end < 0:
+                comment = [line[start + 4:]]
+                line = line[:start]
+                break
+            take_comment(line[start + 4:end])
+            line = line[:start] + line[end + 3:]
+
+        if title is None:
+            heading = HEADING_RE.match(line)
+            if heading:
+                title = heading.group(1)
+        body.append(line)
+
+    yield page, start_line, lineno, body, directives, notes, title
+
+
+def iter_slides(filepath: str | Path) -> Iterator[Slide]:
+    """Markdownファイルからスライドを順に抽出する"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        yield from iter_slides_lines(f)
+
+
+def parse_markdown_slides(filepath: str | Path) -> list[Slide]:
+    """Markdownファイルからスライドを抽出する"""
+    return list(iter_slides(filepath))
+
+
+def parse_slides_text(text: str) -> list[Slide]:
+    """文字列からスライドを抽出する"""
+    return list(iter_slides_lines(text.splitlines()))
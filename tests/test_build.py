@@ -0,0 +1,77 @@
+"""build.run_graph の失敗の伝播"""
+
+import contextlib
+import io
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import build  # noqa: E402
+
+
+def fail():
+    raise RuntimeError("失敗")
+
+
+class RunGraphTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(build, "STATE_PATH", Path(tmp.name) / "state.json")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_graph(self, graph: dict) -> bool:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return build.run_graph(graph, jobs=2)
+
+    def test_failure_propagates_through_chain(self):
+        ran = []
+        graph = {
+            "a": build.Node("a", "test", fail),
+            "b": build.Node("b", "test", lambda: ran.append("b"), deps=["a"]),
+            "c": build.Node("c", "test", lambda: ran.append("c"), deps=["b"]),
+        }
+        self.assertFalse(self.run_graph(graph))
+        self.assertEqual(ran, [])
+        self.assertNotIn("a", build.load_state())
+
+    def test_independent_branch_still_runs(self):
+        ran = []
+        graph = {
+            "a": build.Node("a", "test", fail),
+            "b": build.Node("b", "test", lambda: ran.append("b"), deps=["a"]),
+            "x": build.Node("x", "test", lambda: ran.append("x")),
+        }
+        self.assertFalse(self.run_graph(graph))
+        self.assertEqual(ran, ["x"])
+        self.assertIn("x", build.load_state())
+
+    def test_success(self):
+        graph = {
+            "a": build.Node("a", "test", lambda: None),
+            "b": build.Node("b", "test", lambda: None, deps=["a"]),
+        }
+        self.assertTrue(self.run_graph(graph))
+
+
+class GraphTest(unittest.TestCase):
+    def test_single_fix_node_for_all_decks(self):
+        graph = build.build_graph()
+        self.assertEqual([n for n in graph.values() if n.kind == "fix"], [graph["fix"]])
+        self.assertTrue(all(graph[n].deps == ["fix"] for n in graph if n.startswith("html:")))
+
+    def test_glob_inputs_are_expanded_when_fingerprinting(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            node = build.Node("variants", "variants", lambda: None, input_globs=[f"{tmp}/*.png"])
+            before = build.fingerprint(node, {})
+            (Path(tmp) / "slide_001.png").write_bytes(b"png")
+            self.assertNotEqual(build.fingerprint(node, {}), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
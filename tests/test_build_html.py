@@ -0,0 +1,98 @@
+"""build_html の CSS の外部化とデッキのフィンガープリント"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import build_html  # noqa: E402
+
+THEME_CSS = "div#\\:\\$p>svg>foreignObject>section{color:#000}"
+TEMPLATE_CSS = "body{margin:0}"
+
+
+def page(*styles: str) -> str:
+    blocks = "".join(f"<style>{css}</style>" for css in styles)
+    return (f"<!DOCTYPE html><html><head><title>t</title>{blocks}</head>"
+            f'<body><section data-theme="slides"></section><script>"<style>x</style>"</script></body></html>')
+
+
+class ExternalizeStylesTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.docs = Path(tmp.name) / "docs"
+        self.docs.mkdir()
+        for name, value in [("OUTPUT_DIR", self.docs), ("STYLE_DIR", self.docs / "themes")]:
+            patcher = mock.patch.object(build_html, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write(self, name: str, html: str) -> Path:
+        path = self.docs / name
+        path.write_text(html, encoding="utf-8")
+        return path
+
+    def test_decks_share_fingerprinted_css(self):
+        first = self.write("01.html", page(TEMPLATE_CSS, THEME_CSS))
+        second = self.write("02.html", page(TEMPLATE_CSS, THEME_CSS))
+        written = build_html.externalize_styles(first)
+        self.assertEqual(build_html.externalize_styles(second), written)
+        self.assertEqual([path.name.split(".")[0] for path in written], ["marp", "slides"])
+        self.assertEqual(written[1].read_text(encoding="utf-8"), THEME_CSS)
+
+        html = first.read_text(encoding="utf-8")
+        head, body = html.split("</head>")
+        self.assertNotIn("<style>", head)
+        self.assertIn(f'<link rel="stylesheet" href="themes/{written[1].name}">', head)
+        # <head> の外（スクリプト内の文字列など）はそのまま
+        self.assertIn('"<style>x</style>"', body)
+        self.assertTrue(build_html.styles_present(first))
+        # 2回目は何もしない
+        self.assertEqual(build_html.externalize_styles(first), [])
+
+    def test_relative_url_stays_inline(self):
+        css = 'section{background:url("images/bg.png")}'
+        output = self.write("01.html", page(css, TEMPLATE_CSS))
+        written = build_html.externalize_styles(output)
+        self.assertEqual(len(written), 1)
+        self.assertIn(f"<style>{css}</style>", output.read_text(encoding="utf-8"))
+
+    def test_prune_keeps_referenced_css(self):
+        output = self.write("01.html", page(THEME_CSS))
+        [used] = build_html.externalize_styles(output)
+        stale = self.docs / "themes" / "slides.000000000000.css"
+        stale.write_text(THEME_CSS, encoding="utf-8")
+        self.assertEqual(build_html.prune_styles(), 1)
+        self.assertTrue(used.exists())
+        self.assertFalse(stale.exists())
+
+        used.unlink()
+        self.assertFalse(build_html.styles_present(output))
+
+
+class DeckFingerprintTest(unittest.TestCase):
+    def test_theme_options_and_contents(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = Path(tmp.name)
+        src = root / "01.md"
+        src.write_text("# 1\n", encoding="utf-8")
+        themes = root / "themes"
+        with mock.patch.object(build_html, "THEME_DIR", themes):
+            without_theme = build_html.deck_fingerprint(src, "4.0.0")
+            # テーマのディレクトリができると --theme-set が加わる
+            themes.mkdir()
+            with_option = build_html.deck_fingerprint(src, "4.0.0")
+            (themes / "slides.css").write_text("/* @theme slides */", encoding="utf-8")
+            with_theme = build_html.deck_fingerprint(src, "4.0.0")
+            (themes / "slides.css").write_text("/* @theme slides */ section{}", encoding="utf-8")
+            edited = build_html.deck_fingerprint(src, "4.0.0")
+        self.assertEqual(len({without_theme, with_option, with_theme, edited}), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
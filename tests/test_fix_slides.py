@@ -0,0 +1,110 @@
+"""scripts/fix-slides.py のフォントクラスの段とスライドの区切り"""
+
+import importlib.util
+import json
+import shutil
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+spec = importlib.util.spec_from_file_location("fix_slides", ROOT / "scripts" / "fix-slides.py")
+fix_slides = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fix_slides)
+
+
+class FontClassLadderTest(unittest.TestCase):
+    def test_ladder_follows_font_size(self):
+        sizes = [fix_slides.FONT_CLASS_METRICS[c][0] for c in fix_slides.FONT_CLASS_LADDER]
+        self.assertEqual(sizes, sorted(sizes, reverse=True))
+        self.assertEqual(fix_slides.FONT_CLASS_LADDER[-1], "font-xxxsmall")
+
+    def test_next_class_is_smaller(self):
+        for current in fix_slides.FONT_CLASS_LADDER[:-1]:
+            following = fix_slides.next_font_class(current, 10)
+            self.assertLess(fix_slides.FONT_CLASS_METRICS[following][0], fix_slides.FONT_CLASS_METRICS[current][0])
+        self.assertIsNone(fix_slides.next_font_class("font-xxxsmall", 10))
+
+    def test_larger_overflow_never_picks_larger_class(self):
+        self.assertIsNone(fix_slides.determine_font_class(0))
+        ladder = fix_slides.FONT_CLASS_LADDER
+        steps = [ladder.index(fix_slides.determine_font_class(px)) for px in range(1, 1000, 10)]
+        self.assertEqual(steps, sorted(steps))
+        self.assertEqual(fix_slides.determine_font_class(10), "font-small")
+        self.assertEqual(fix_slides.determine_font_class(5000), "font-xxxsmall")
+
+
+class StripThemeRulesTest(unittest.TestCase):
+    def test_code_blocks_are_untouched(self):
+        selector, body = fix_slides.css_rules(fix_slides.ALL_CSS)[0]
+        rule = f"{selector} {{ {body} }}"
+        example = f"````html\n<style>\n{rule}\n</style>\n\n\n\nend\n````"
+        content = f"---\nmarp: true\n---\n\n<style>\n{rule}\n</style>\n\n# 1\n\n{example}\n"
+        new_content, removed, conflicts = fix_slides.strip_theme_rules(content)
+        self.assertEqual((removed, conflicts), (1, []))
+        self.assertEqual(new_content, f"---\nmarp: true\n---\n\n# 1\n\n{example}\n")
+
+
+# 4つ以上のバッククォート、インデントした閉じフェンス、コメントや <style> 内の --- を含むデッキ
+DECK = """---
+marp: true
+---
+
+# 1
+
+````markdown
+```
+---
+```
+````
+
+---
+
+~~~
+---
+  ~~~
+
+<!--
+---
+-->
+<style scoped>
+---
+</style>
+
+---
+
+---
+
+# 4
+"""
+
+
+class SlideRangesTest(unittest.TestCase):
+    def test_follows_slide_parser(self):
+        from slide_parser import iter_slides_lines
+
+        lines, ranges = fix_slides.split_slides(DECK)
+        self.assertEqual(ranges, [(4, 12), (14, 25), (27, 27), (29, 31)])
+        # 空のページ（3枚目）以外は slide_parser の行範囲と一致する
+        slides = list(iter_slides_lines(lines))
+        self.assertEqual([(s.start_line, s.end_line) for s in slides], [ranges[0], ranges[1], ranges[3]])
+
+    @unittest.skipUnless(shutil.which("node"), "node がありません")
+    def test_check_slides_agrees(self):
+        script = (
+            "const { slideLineRanges } = require(process.argv[1]);"
+            "process.stdout.write(JSON.stringify(slideLineRanges(require('fs').readFileSync(0, 'utf-8'))));"
+        )
+        for markdown in [DECK] + [path.read_text(encoding="utf-8") for path in sorted((ROOT / "src").glob("*.md"))]:
+            output = subprocess.run(
+                ["node", "-e", script, str(ROOT / "scripts" / "check-slides.js")],
+                input=markdown, capture_output=True, text=True, check=True,
+            ).stdout
+            self.assertEqual([tuple(r) for r in json.loads(output)], fix_slides.split_slides(markdown)[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+"""generation_journal の追記と fsync"""
+
+import asyncio
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import generation_journal  # noqa: E402
+from generation_journal import DONE, PENDING, GenerationJournal, replay  # noqa: E402
+
+
+class GenerationJournalTest(unittest.IsolatedAsyncioTestCase):
+    async def test_events_are_synced_together(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = GenerationJournal(Path(tmp) / "run.jsonl")
+            with mock.patch.object(generation_journal.os, "fsync") as fsync:
+                for i in range(3):
+                    journal.record(f"01-intro/{i:03d}", PENDING, key="k")
+                # 同時に待っても、まとめて1回だけ fsync する
+                await asyncio.gather(journal.sync(), journal.sync())
+                self.assertEqual(fsync.call_count, 1)
+                journal.record("01-intro/000", DONE, key="k")
+                journal.close()
+                self.assertEqual(fsync.call_count, 2)
+            states = replay(journal.path)
+            self.assertEqual(states["01-intro/000"]["state"], DONE)
+            self.assertEqual(len(states), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""image_variants の派生画像の鮮度"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import image_variants  # noqa: E402
+
+IMAGE = "images/01-intro/slide_001.png"
+
+
+class ManifestFieldsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.viewer = Path(tmp.name)
+        self.section = self.viewer / "images" / "01-intro"
+        self.section.mkdir(parents=True)
+        patcher = mock.patch.object(image_variants, "VIEWER_DIR", self.viewer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.hash_cache = self.viewer / "hashes.json"
+        patcher = mock.patch.object(image_variants, "_hashes", image_variants.HashCache(self.hash_cache))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.png = self.viewer / IMAGE
+
+    def make_derivatives(self):
+        """PNG と派生画像を書き、PNG の内容ハッシュを記録する"""
+        self.png.write_bytes(b"png")
+        image_variants.thumb_path(self.png).write_bytes(b"thumb")
+        for fmt in image_variants.FORMATS:
+            image_variants.variant_path(self.png, fmt, 480).write_bytes(b"variant")
+        image_variants.record_sources(self.section, {self.png.name: image_variants.content_hash(self.png)})
+
+    def test_thumb_without_png(self):
+        # PNG だけが消され、派生画像が残っている
+        self.make_derivatives()
+        self.png.unlink()
+        self.assertEqual(image_variants.manifest_fields(IMAGE), {})
+
+    def test_derivatives_older_than_png_are_current(self):
+        # チェックアウトでは派生画像が PNG より先に書かれることがある
+        self.make_derivatives()
+        past = self.png.stat().st_mtime_ns - 10**10
+        for path in self.section.iterdir():
+            if path != self.png:
+                os.utime(path, ns=(past, past))
+        self.assertTrue(image_variants.is_current(self.png))
+        fields = image_variants.manifest_fields(IMAGE)
+        self.assertEqual(fields["thumb"]["bytes"], 5)
+        self.assertTrue(fields["thumb"]["src"].startswith("images/01-intro/slide_001-thumb.webp?v="))
+        self.assertEqual([width for width, _ in image_variants.existing_variants(self.png, "webp")], [480])
+
+    def test_regenerated_png_makes_derivatives_stale(self):
+        self.make_derivatives()
+        self.png.write_bytes(b"new png")
+        self.assertFalse(image_variants.is_current(self.png))
+        self.assertEqual(image_variants.existing_variants(self.png, "webp"), [])
+        self.assertEqual(image_variants.manifest_fields(IMAGE), {})
+
+    def test_sprite_survives_checkout(self):
+        from PIL import Image
+
+        self.make_derivatives()
+        Image.new("RGB", (240, 135), "white").save(image_variants.thumb_path(self.png), format="WEBP")
+        self.assertTrue(image_variants.build_sprite(self.section))
+        # チェックアウトで更新時刻だけが変わっても、スプライトの座標と LQIP は載ったまま
+        thumb = image_variants.thumb_path(self.png)
+        os.utime(thumb, ns=(1, 1))
+        self.assertFalse(image_variants.build_sprite(self.section))
+        fields = image_variants.manifest_fields(IMAGE)
+        self.assertEqual(fields["sprite_position"], [0, 0])
+        self.assertTrue(fields["lqip"].startswith("data:image/webp;base64,"))
+
+    def test_hashes_persist_across_processes(self):
+        self.png.write_bytes(b"png")
+        digest = image_variants.content_hash(self.png)
+        image_variants.save_hashes()
+        # 次のプロセスでは、更新時刻とサイズが同じなら PNG を読み直さない
+        with mock.patch.object(image_variants, "_hashes", image_variants.HashCache(self.hash_cache)), \
+                mock.patch.object(image_variants, "_hash_file", side_effect=AssertionError("re-hashed")):
+            self.assertEqual(image_variants.content_hash(self.png), digest)
+        self.png.write_bytes(b"new png")
+        with mock.patch.object(image_variants, "_hashes", image_variants.HashCache(self.hash_cache)):
+            self.assertNotEqual(image_variants.content_hash(self.png), digest)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+"""notes_renderer のノートコメント"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from notes_renderer import render_notes  # noqa: E402
+from slide_parser import parse_slides_text  # noqa: E402
+
+DECK = """# タイトル
+
+<!-- _class: font-small -->
+<!-- TODO: 図を差し替える -->
+<!-- notes: 最初に話すこと -->
+<!--
+ノート:
+続けて話すこと
+-->
+
+- 項目
+"""
+
+
+class RenderNotesTest(unittest.TestCase):
+    def test_only_marked_comments_are_notes(self):
+        slide, = parse_slides_text(DECK)
+        self.assertEqual(slide.directives, {"_class": "font-small"})
+        self.assertEqual(slide.notes, ["最初に話すこと", "続けて話すこと"])
+        notes = render_notes(slide)
+        self.assertEqual(notes, "最初に話すこと\n続けて話すこと\n\n・項目")
+        self.assertNotIn("TODO", notes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""preview_server のパスの解決とキャッシュ指定"""
+
+import asyncio
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import preview_server  # noqa: E402
+
+
+class PreviewServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = Path(tmp.name)
+        (root / "slide-viewer").mkdir()
+        (root / "slide-viewer" / "app.js").write_text("console.log(1)", encoding="utf-8")
+        server = preview_server.PreviewServer(root, reload=False, quiet=True)
+        self.tcp = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        self.port = self.tcp.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.tcp.close()
+        await self.tcp.wait_closed()
+
+    async def get(self, target: str) -> tuple[int, dict[str, str]]:
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head = response.split(b"\r\n\r\n", 1)[0].decode("latin-1").split("\r\n")
+        headers = dict(line.split(": ", 1) for line in head[1:])
+        return int(head[0].split()[1]), {name.lower(): value for name, value in headers.items()}
+
+    async def test_null_byte_is_bad_request(self):
+        status, _ = await self.get("/slide-viewer/a%00b")
+        self.assertEqual(status, 400)
+
+    async def test_long_name_is_not_found(self):
+        status, _ = await self.get("/slide-viewer/" + "a" * 300)
+        self.assertEqual(status, 404)
+
+    async def test_versioned_query(self):
+        _, headers = await self.get("/slide-viewer/app.js?v=abc")
+        self.assertEqual(headers["cache-control"], preview_server.IMMUTABLE)
+        _, headers = await self.get("/slide-viewer/app.js?dev=1")
+        self.assertEqual(headers["cache-control"], preview_server.REVALIDATE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+"""rate_limiter.AdaptiveLimiter の同時実行枠"""
+
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rate_limiter import AdaptiveLimiter  # noqa: E402
+
+
+class AdaptiveLimiterTest(unittest.IsolatedAsyncioTestCase):
+    async def test_cancel_while_waiting_for_token_releases_slot(self):
+        limiter = AdaptiveLimiter(requests_per_minute=60, max_concurrency=1)
+        limiter.bucket.tokens = -10  # 次の送信まで10秒待たせる
+
+        async def request():
+            async with limiter:
+                pass
+
+        task = asyncio.create_task(request())
+        await asyncio.sleep(0.01)
+        self.assertEqual(limiter.in_flight, 1)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(limiter.in_flight, 0)
+
+        # 返した枠は次のリクエストが使える
+        limiter.bucket.tokens = 1
+        await asyncio.wait_for(request(), timeout=1)
+        self.assertEqual(limiter.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""watch.WatchDaemon のエラー処理"""
+
+import argparse
+import contextlib
+import io
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import watch  # noqa: E402
+
+
+class WatchDaemonTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        args = argparse.Namespace(images=False, poll=True, debounce=0.01)
+        with mock.patch.object(watch, "ParseCache"), mock.patch.object(watch, "load_statuses", return_value={}):
+            self.daemon = watch.WatchDaemon(args)
+        self.output = io.StringIO()
+        self.enterContext(contextlib.redirect_stdout(self.output))
+        self.paths = sorted(self.daemon.by_path)
+
+    async def test_error_in_one_file_does_not_stop_the_others(self):
+        done = []
+
+        async def process_file(file_info):
+            if file_info is self.daemon.by_path[self.paths[0]]:
+                raise ValueError("解析できません")
+            done.append(file_info["src"])
+
+        self.daemon.process_file = process_file
+        self.daemon.pending.update(self.paths)
+        await self.daemon.process()
+        self.assertEqual(len(done), len(self.paths) - 1)
+        self.assertIn("ValueError: 解析できません", self.output.getvalue())
+
+    async def test_file_missing_during_save_is_retried(self):
+        calls = []
+
+        async def process_file(file_info):
+            calls.append(file_info["src"])
+            if len(calls) == 1:
+                raise FileNotFoundError(file_info["src"])
+
+        self.daemon.process_file = process_file
+        self.daemon.pending.add(self.paths[0])
+        await self.daemon.process()
+        # デバウンス後にもう一度処理される
+        await self.daemon.wake.wait()
+        await self.daemon.process()
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.daemon.retries, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
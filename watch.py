@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+src/*.md の変更を監視し、編集されたスライドだけを作り直す常駐コマンド
+
+使い方:
+  python watch.py              # ノートとマニフェストを更新
+  python watch.py --images     # 画像も再生成（GOOGLE_API_KEY が必要）
+  python watch.py --poll       # inotify を使わずポーリングで監視
+
+保存を検知すると一定時間（--debounce）待ってからまとめて処理する。
+ファイルの差分はスライド単位で取り、変わったスライドのノート・画像と
+マニフェストだけを更新する。
+処理中のエラー（解析・画像生成の失敗など）はファイルごとに表示し、監視は続ける。
+"""
+
+import argparse
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+
+from decks import FILES
+from generation_engine import DEFAULT_CONCURRENCY
+from image_cache import DEFAULT_MAX_AGE_DAYS, DEFAULT_MAX_BYTES
+from parse_cache import ParseCache
+from rate_limiter import DEFAULT_RPM
+from slide_manifest import MANIFEST_PATH, NOTES_STAGE, build_manifest, load_statuses, write_manifest
+
+DEFAULT_DEBOUNCE = 0.3
+POLL_INTERVAL = 0.5
+MAX_RETRIES = 3  # 保存の途中で読めなかったファイルを読み直す回数
+
+# inotify のイベントマスク（<sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """inotify でディレクトリを監視し、対象ファイルの変更を通知する（Linux専用）"""
+
+    def __init__(self, files: list[str], on_change):
+        libc_name = ctypes.util.find_library("c")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify が使えません")
+        self.on_change = on_change
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 に失敗しました")
+
+        # エディタは別名で書いて rename することが多いので、ディレクトリ単位で監視する
+        self.dirs: dict[int, Path] = {}
+        self.files = {Path(f).resolve() for f in files}
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        for directory in {path.parent for path in self.files}:
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch に失敗しました: {directory}")
+            self.dirs[wd] = directory
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        loop.add_reader(self.fd, self._read)
+
+    def _read(self):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, _mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            path = self.dirs.get(wd, Path()) / os.fsdecode(name)
+            if path in self.files:
+                self.on_change(path)
+
+    def close(self, loop: asyncio.AbstractEventLoop):
+        loop.remove_reader(self.fd)
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """mtime を定期的に確認する監視（inotify が使えない環境用）"""
+
+    def __init__(self, files: list[str], on_change, interval: float = POLL_INTERVAL):
+        self.files = [Path(f).resolve() for f in files]
+        self.on_change = on_change
+        self.interval = interval
+        self.mtimes = {path: self._mtime(path) for path in self.files}
+        self.task: asyncio.Task | None = None
+
+    @staticmethod
+    def _mtime(path: Path) -> int | None:
+        try:
+            return path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self.task = loop.create_task(self._poll())
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            for path in self.files:
+                mtime = self._mtime(path)
+                if mtime != self.mtimes[path]:
+                    self.mtimes[path] = mtime
+                    self.on_change(path)
+
+    def close(self, loop: asyncio.AbstractEventLoop):
+        if self.task:
+            self.task.cancel()
+
+
+class WatchDaemon:
+    """変更をまとめて受け取り、スライド単位で差分を処理する"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.parse_cache = ParseCache()
+        self.statuses = load_statuses()
+        self.by_path = {Path(f["src"]).resolve(): f for f in FILES}
+        self.pending: set[Path] = set()
+        self.retries: dict[Path, int] = {}  # 保存の途中で読めなかったファイルの再試行回数
+        self.queued_images = 0
+        self.wake = asyncio.Event()
+        self.timer: asyncio.TimerHandle | None = None
+        self.image_generator = None
+        self.image_cache = None
+
+    # ---- 状態表示 ----
+
+    def status(self, message: str):
+        depth = len(self.pending) + self.queued_images
+        sys.stdout.write(f"\r\x1b[K[watch] {message} | キュー: {depth}")
+        sys.stdout.flush()
+
+    def log(self, message: str):
+        sys.stdout.write(f"\r\x1b[K{message}\n")
+        sys.stdout.flush()
+
+    # ---- イベント ----
+
+    def on_change(self, path: Path):
+        """保存イベント（デバウンスしてから処理する）"""
+        self.pending.add(path)
+        if self.timer:
+            self.timer.cancel()
+        loop = asyncio.get_running_loop()
+        self.timer = loop.call_later(self.args.debounce, self.wake.set)
+        self.status("変更を検知")
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        watcher = None
+        if not self.args.poll:
+            try:
+                watcher = InotifyWatcher([f["src"] for f in FILES], self.on_change)
+                self.log("監視方式: inotify")
+            except (OSError, AttributeError) as e:
+                self.log(f"inotify が使えないためポーリングで監視します: {e}")
+        if watcher is None:
+            watcher = PollingWatcher([f["src"] for f in FILES], self.on_change)
+            self.log(f"監視方式: ポーリング（{POLL_INTERVAL}秒間隔）")
+        watcher.start(loop)
+
+        # 起動時に一度、前回終了後の変更を取り込む
+        self.pending.update(self.by_path)
+        self.wake.set()
+        try:
+            while True:
+                await self.wake.wait()
+                self.wake.clear()
+                await self.process()
+                self.status("待機中")
+        finally:
+            watcher.close(loop)
+
+    # ---- 処理 ----
+
+    async def process(self):
+        """保留中のファイルを1つずつ処理する（失敗してもログを出して監視を続ける）"""
+        while self.pending:
+            path = self.pending.pop()
+            file_info = self.by_path[path]
+            try:
+                await self.process_file(file_info)
+                self.retries.pop(path, None)
+            except FileNotFoundError as e:
+                retries = self.retries.get(path, 0)
+                if not path.exists() or retries >= MAX_RETRIES:
+                    self.retries.pop(path, None)
+                    self.log(f"✗ {file_info['src']}: ファイルを読めません（{e}）")
+                    continue
+                # エディタの保存（一時ファイルに書いて rename）の途中で読むと消えて見える
+                self.retries[path] = retries + 1
+                self.log(f"⚠️ {file_info['src']}: 保存の途中だったため、もう一度処理します")
+                self.on_change(path)
+            except Exception as e:
+                self.log(f"✗ {file_info['src']}: {type(e).__name__}: {e}")
+
+    async def process_file(self, file_info: dict):
+        """1ファイル分の変更を取り込み、マニフェストを更新する"""
+        started = time.perf_counter()
+        self.status(f"処理中: {file_info['src']}")
+
+        self.parse_cache.forget(file_info["src"])
+        changed = self.parse_cache.changed(file_info["src"], NOTES_STAGE)
+        if changed:
+            indices = ", ".join(str(s.index) for s in changed[:10])
+            more = " …" if len(changed) > 10 else ""
+            self.log(f"{file_info['src']}: 変更スライド {len(changed)} 件 [{indices}{more}]")
+
+        if self.args.images:
+            await self.regenerate_images(file_info)
+
+        data = build_manifest(self.parse_cache, self.statuses, verbose=False)
+        if write_manifest(data):
+            elapsed = (time.perf_counter() - started) * 1000
+            self.log(f"✓ マニフェスト更新: {MANIFEST_PATH}（{elapsed:.0f}ms）")
+        self.parse_cache.save()
+
+    async def regenerate_images(self, file_info: dict):
+        """変更されたスライドの画像だけ生成する"""
+        if self.image_generator is None:
+            # API キーが必要なので --images のときだけ読み込む
+            import generate_all_slides
+            from image_cache import ImageCache
+            self.image_generator = generate_all_slides
+            self.image_cache = ImageCache()
+
+        gen = self.image_generator
+        jobs = [
+            job for job in gen.build_jobs(self.parse_cache, [file_info], verbose=False)
+            if not self.image_cache.is_current(gen.job_output_path(job), job["key"])
+        ]
+        if not jobs:
+            return
+
+        self.queued_images = len(jobs)
+        self.status(f"画像生成中: {file_info['name']}")
+        try:
+            await gen.generate_images(jobs, self.args, self.image_cache, quiet=True)
+        finally:
+            self.queued_images = 0
+            for job in jobs:
+                self.statuses[gen.job_id(job)] = job.get("status", "pending")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スライドの変更を監視して差分だけ再生成する")
+    parser.add_argument("--images", action="store_true", help="画像も再生成する（API キーが必要）")
+    parser.add_argument("--poll", action="store_true", help="inotify を使わずポーリングで監視する")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE,
+                        help=f"保存後に待つ秒数（デフォルト: {DEFAULT_DEBOUNCE}）")
+    parser.add_argument("-j", "--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rpm", type=float, default=DEFAULT_RPM)
+    parser.set_defaults(
+        cache_max_age_days=DEFAULT_MAX_AGE_DAYS,
+        cache_max_mb=DEFAULT_MAX_BYTES // (1024 * 1024),
+        optimize_png=False,
+        backend_url=None,
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(WatchDaemon(args).run())
+    except KeyboardInterrupt:
+        print("\n監視を終了しました")
+
+
+if __name__ == "__main__":
+    main()